@@ -1,26 +1,119 @@
 import os
-import re
+import sys
+import json
+import time
+import argparse
+import itertools
+import logging
 import subprocess
+import pickle
+import queue
 import tempfile
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import openpyxl
-from openpyxl.styles import Font, Alignment
-import base64
-import zipfile
-from PIL import Image
-import io
+import threading
 import shutil
 
+# Helpers shared with the backend converter live in bk/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bk"))
+from pandoc_ast import ast_to_latex, ast_tables_to_html
+from docx_reader import ENGINES, load_docx_ast
+import mcq_patterns as patterns
+from mcq_lexer import choose_serial_pattern, iter_mcq_blocks, read_block, standardize_answer
+from image_cache import CACHE_DIR_ENV, DocxMedia, decode_data_url, resolve_images, save_image_blob
+from pg_sink import DATABASE_URL_ENV, copy_to_database
+from mcq_log import LOG_LEVELS, configure_logging, get_logger
+from mcq_metrics import PROFILE_DIR_ENV, collect_metrics, current_metrics
+from pandoc_cache import PANDOC_CACHE_DIR_ENV
+from block_manifest import BlockManifest
+
+log = get_logger("converter")
+
+# tkinter and openpyxl are imported on first use (load_tk, load_openpyxl): the
+# batch command never opens a window, and Parquet, Arrow or database output
+# never builds a workbook
+tk = filedialog = messagebox = ttk = None
+openpyxl = WriteOnlyCell = Font = Alignment = NamedStyle = get_column_letter = None
+
+
+def load_tk():
+    """Import tkinter for the GUI."""
+    global tk, filedialog, messagebox, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+
+
+def load_openpyxl():
+    """Import the parts of openpyxl the workbook writer uses."""
+    global openpyxl, WriteOnlyCell, Font, Alignment, NamedStyle, get_column_letter
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, NamedStyle
+    from openpyxl.utils import get_column_letter
+
+
+class ConversionError(Exception):
+    """Raised when pandoc output cannot be turned into MCQ rows."""
+
+
+class ConversionCancelled(Exception):
+    """Raised by a progress callback to stop the conversion in progress."""
+
+
+# Output formats of the converter and their file extensions; see DocxToExcelConverter.write_output
+OUTPUT_FORMATS = {"xlsx": ".xlsx", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+class MCQRecord:
+    """
+    One parsed question, from build_mcq_row to the writers. The *_img fields
+    hold the media member of an image while parsing and its base64 data URL
+    once resolve_images has run; records can be indexed by field name for it.
+    """
+
+    __slots__ = ("serial", "question", "question_img", "topic", "difficulty", "board",
+                 "option_a", "option_a_img", "option_b", "option_b_img",
+                 "option_c", "option_c_img", "option_d", "option_d_img",
+                 "answer", "explanation", "explanation_img", "hint", "hint_img")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, ""))
+        if fields:
+            raise TypeError(f"Unknown MCQRecord fields: {', '.join(fields)}")
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def fields(self):
+        """The record as a dict of its fields."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"MCQRecord(serial={self.serial!r}, question={self.question[:30]!r})"
+
+
 class DocxToExcelPandocGUI:
+    # How often the window checks the conversion thread for progress, in milliseconds
+    POLL_MS = 100
+
     def __init__(self, master):
         self.master = master
         self.master.title("Docx to Excel (with Pandoc)")
 
+        # Progress and outcome events from the conversion thread, and its cancel flag
+        self.events = queue.Queue()
+        self.cancel_requested = threading.Event()
+        self.status = tk.StringVar()
+
         # StringVars for user inputs
         self.docx_path = tk.StringVar()
         self.excel_path = tk.StringVar()
         self.preserve_equations = tk.BooleanVar(value=True)
+        self.native_reader = tk.BooleanVar(value=False)
+        self.external_images = tk.BooleanVar(value=False)
+        self.incremental = tk.BooleanVar(value=False)
 
         # New StringVars for metadata
         self.class_name = tk.StringVar()
@@ -71,10 +164,37 @@ class DocxToExcelPandocGUI:
         equations_cb.grid(row=5, column=1, padx=5, pady=5, sticky="w")
         self.add_tooltip(equations_cb, "When checked, keeps equations in LaTeX format ($...$). Uncheck to attempt conversion to Unicode.")
 
-        # Row 6: Convert button
-        convert_btn = tk.Button(self.master, text="Convert & Save", command=self.on_convert_click, width=20)
-        convert_btn.grid(row=6, column=1, pady=15)
-        self.add_tooltip(convert_btn, "Convert the Word document to Excel with MCQs")
+        # Row 6: Reader engine
+        native_cb = tk.Checkbutton(self.master, text="Use the built-in Word reader (faster, no Pandoc)",
+                      variable=self.native_reader)
+        native_cb.grid(row=6, column=1, padx=5, pady=5, sticky="w")
+        self.add_tooltip(native_cb, "Reads the document directly instead of running Pandoc. Falls back to Pandoc if the document cannot be read.")
+
+        # Row 7: Image output
+        images_cb = tk.Checkbutton(self.master, text="Save images as files next to the Excel file",
+                      variable=self.external_images)
+        images_cb.grid(row=7, column=1, padx=5, pady=5, sticky="w")
+        self.add_tooltip(images_cb, "Writes each image once to a <name>_images folder and puts its file path in the cell "
+                                    "instead of the base64 image. Keeps the workbook small.")
+
+        # Row 8: Incremental conversion
+        incremental_cb = tk.Checkbutton(self.master, text="Only re-parse the questions changed since the last conversion",
+                      variable=self.incremental)
+        incremental_cb.grid(row=8, column=1, padx=5, pady=5, sticky="w")
+        self.add_tooltip(incremental_cb, "Keeps the parsed questions in a <name>_manifest.json next to the Excel file "
+                                         "and reuses those of unchanged questions when converting the document again.")
+
+        # Row 9: Convert and Cancel buttons
+        self.convert_btn = tk.Button(self.master, text="Convert & Save", command=self.on_convert_click, width=20)
+        self.convert_btn.grid(row=9, column=1, pady=15)
+        self.add_tooltip(self.convert_btn, "Convert the Word document to Excel with MCQs")
+        self.cancel_btn = tk.Button(self.master, text="Cancel", command=self.on_cancel_click, state=tk.DISABLED)
+        self.cancel_btn.grid(row=9, column=2, padx=5, pady=15)
+
+        # Row 10: Progress of the conversion
+        self.progress_bar = ttk.Progressbar(self.master, orient="horizontal", mode="determinate", maximum=100)
+        self.progress_bar.grid(row=10, column=0, columnspan=3, padx=5, pady=(0, 5), sticky="we")
+        tk.Label(self.master, textvariable=self.status).grid(row=11, column=0, columnspan=3, padx=5, pady=(0, 10))
 
     def browse_docx(self):
         file_path = filedialog.askopenfilename(
@@ -90,7 +210,8 @@ class DocxToExcelPandocGUI:
     def browse_excel(self):
         file_path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=[("Excel Files", "*.xlsx"), ("All Files", "*.*")]
+            filetypes=[("Excel Files", "*.xlsx"), ("Parquet Files", "*.parquet"), ("Arrow Files", "*.arrow"),
+                       ("All Files", "*.*")]
         )
         if file_path:
             self.excel_path.set(file_path)
@@ -107,75 +228,123 @@ class DocxToExcelPandocGUI:
             messagebox.showerror("Error", "Please specify the Excel output file.")
             return
 
-        # Extract images from the docx file
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                print(f"Created temporary directory: {tmpdir}")
-                # Extract DOCX contents (it's a ZIP file)
-                images_dir = os.path.join(tmpdir, "media")
-                os.makedirs(images_dir, exist_ok=True)
-                
-                # Extract images from DOCX
-                self.extract_images_from_docx(docx_file, images_dir)
-                print(f"Extracted images to {images_dir}")
-                
-                # Convert docx -> .tex using pandoc
-                tex_path = os.path.join(tmpdir, "converted.tex")
-                cmd = ["pandoc", docx_file, "-o", tex_path]
-                print(f"Running pandoc command: {' '.join(cmd)}")
-                result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-                print(f"Pandoc conversion completed. Output file: {tex_path}")
-                
-                if not os.path.exists(tex_path) or os.path.getsize(tex_path) == 0:
-                    print("Error: Generated .tex file is empty or doesn't exist.")
-                    messagebox.showerror("Conversion Error", 
-                                        "Pandoc failed to generate a proper .tex file. This might be due to formatting issues in your Word document.")
-                    return
-
-                # Also create an HTML version for web display
-                html_path = os.path.join(tmpdir, "converted.html")
-                html_cmd = ["pandoc", docx_file, "-o", html_path]
-                print(f"Running pandoc HTML command: {' '.join(html_cmd)}")
-                html_result = subprocess.run(html_cmd, check=True, capture_output=True, text=True)
-                
-                # Extract tables from the HTML for web display
-                tables_html = self.extract_tables_from_html(html_path)
-                print(f"Extracted {len(tables_html)} tables from the document")
-                
-                # Save tables to HTML file
-                if tables_html:
-                    tables_output_path = os.path.splitext(excel_file)[0] + "_tables.html"
-                    with open(tables_output_path, "w", encoding="utf-8") as f:
-                        f.write("<html><head><title>Extracted Tables</title>")
-                        f.write("<style>table {border-collapse: collapse; width: 100%; margin-bottom: 20px;}")
-                        f.write("th, td {border: 1px solid #ddd; padding: 8px; text-align: left;}")
-                        f.write("th {background-color: #f2f2f2;}</style></head><body>")
-                        f.write("<h1>Tables Extracted from Document</h1>")
-                        for i, table_html in enumerate(tables_html):
-                            f.write(f"<h2>Table {i+1}</h2>")
-                            f.write(table_html)
-                        f.write("</body></html>")
-                    print(f"Saved {len(tables_html)} tables to {tables_output_path}")
-
-                # Parse the generated .tex for MCQs in the desired structure
-                mcq_data = self.parse_latex_for_mcqs(tex_path, images_dir)
-                
-        except FileNotFoundError:
-            messagebox.showerror("Pandoc Error", "pandoc not found. Please install pandoc.")
-            return
-        except subprocess.CalledProcessError as e:
-            print(f"Pandoc command failed with error: {e}")
-            print(f"Error output: {e.stderr}")
-            messagebox.showerror("Pandoc Error", f"Pandoc failed to convert:\n{e}\n\nStderr: {e.stderr}")
+        self.cancel_requested = threading.Event()
+        converter = DocxToExcelConverter(
+            preserve_equations=self.preserve_equations.get(),
+            class_name=self.class_name.get().strip(),
+            subject_name=self.subject_name.get().strip(),
+            chapter_name=self.chapter_name.get().strip(),
+            engine="native" if self.native_reader.get() else "pandoc",
+            external_images=self.external_images.get(),
+            progress=self.report_progress,
+            incremental=self.incremental.get(),
+        )
+
+        # The conversion runs on a worker thread; the window polls its events
+        self.convert_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.progress_bar.config(mode="indeterminate", value=0)
+        self.progress_bar.start(15)
+        self.status.set("Reading the document...")
+        worker = threading.Thread(target=self.convert, args=(converter, docx_file, excel_file), daemon=True)
+        worker.start()
+        self.master.after(self.POLL_MS, self.poll_conversion, converter, excel_file)
+
+    def on_cancel_click(self):
+        self.cancel_requested.set()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.status.set("Cancelling...")
+
+    def report_progress(self, questions, fraction):
+        """Progress callback of the converter, called on the worker thread after each question."""
+        if self.cancel_requested.is_set():
+            raise ConversionCancelled()
+        self.events.put(("progress", (questions, fraction)))
+
+    def convert(self, converter, docx_file, excel_file):
+        """
+        Convert docx_file to excel_file with converter on the worker thread,
+        ending with one (outcome, value) event for finish_conversion.
+        """
+        with collect_metrics(docx_file, engine=converter.engine) as metrics:
+            try:
+                mcq_rows = converter.parse_docx(docx_file, excel_file)
+                # The document is converted when the first row is requested
+                first_row = next(mcq_rows, None)
+            except ConversionCancelled:
+                self.events.put(("cancelled", None))
+                return
+            except Exception as e:
+                self.events.put(("failed", e))
+                return
+
+            if first_row is None:
+                self.events.put(("empty", None))
+                return
+
+            # Create Excel file & write data
+            try:
+                mcq_count = converter.write_output(itertools.chain([first_row], mcq_rows), excel_file)
+            except ConversionCancelled:
+                self.events.put(("cancelled", None))
+                return
+            except Exception as e:
+                self.events.put(("write_failed", e))
+                return
+            log.info("Metrics: %s", json.dumps(metrics.report(), ensure_ascii=False))
+            self.events.put(("done", mcq_count))
+
+    def poll_conversion(self, converter, excel_file):
+        """Apply the worker's progress events; hand its outcome to finish_conversion."""
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                self.master.after(self.POLL_MS, self.poll_conversion, converter, excel_file)
+                return
+            if kind != "progress":
+                break
+            questions, fraction = value
+            if str(self.progress_bar.cget("mode")) != "determinate":
+                self.progress_bar.stop()
+                self.progress_bar.config(mode="determinate")
+            self.progress_bar.config(value=fraction * 100)
+            if not self.cancel_requested.is_set():
+                self.status.set(f"{questions} MCQs parsed")
+
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate", value=0)
+        self.convert_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.status.set("")
+        self.finish_conversion(kind, value, converter, excel_file)
+
+    def finish_conversion(self, kind, value, converter, excel_file):
+        """Report the outcome of a conversion in message boxes, on the Tk thread."""
+        if kind == "cancelled":
+            # Parquet and Arrow files are written as the rows arrive; do not leave a truncated one
+            if converter.output_format(excel_file) != "xlsx" and os.path.exists(excel_file):
+                os.remove(excel_file)
+            self.status.set("Conversion cancelled.")
             return
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            messagebox.showerror("Error", f"Unexpected error during processing:\n{e}")
+
+        if kind == "failed":
+            e = value
+            if isinstance(e, ConversionError):
+                messagebox.showerror("Conversion Error", str(e))
+            elif isinstance(e, FileNotFoundError):
+                messagebox.showerror("Pandoc Error", "pandoc not found. Please install pandoc.")
+            elif isinstance(e, subprocess.CalledProcessError):
+                log.error("Pandoc command failed with error: %s", e)
+                log.error("Error output: %s", e.stderr)
+                messagebox.showerror("Pandoc Error", f"Pandoc failed to convert:\n{e}\n\nStderr: {e.stderr}")
+            else:
+                log.error("Unexpected error during processing", exc_info=e)
+                messagebox.showerror("Error", f"Unexpected error during processing:\n{e}")
             return
 
-        if not mcq_data:
-            print("No MCQs were detected in the document.")
+        if kind == "empty":
+            log.warning("No MCQs were detected in the document.")
             error_msg = (
                 "No MCQs found in the document. Please ensure your document follows one of these patterns:\n\n"
                 "Pattern 1 (General MCQ):\n"
@@ -210,83 +379,173 @@ class DocxToExcelPandocGUI:
             messagebox.showinfo("No MCQs", error_msg)
             return
 
-        # Create Excel file & write data
+        if kind == "write_failed":
+            log.error("Failed to create Excel file", exc_info=value)
+            messagebox.showerror("Excel Error", f"Failed to create Excel file:\n{value}")
+            return
+
+        mcq_count = value
+        message = f"{mcq_count} MCQs saved to: {excel_file}"
+        if converter.tables_found:
+            tables_output_path = os.path.splitext(excel_file)[0] + "_tables.html"
+            message += f"\n{converter.tables_found} tables extracted to: {tables_output_path}"
+        if converter.external_images:
+            message += f"\nImages saved to: {converter.images_folder(excel_file)}"
+            
+        messagebox.showinfo("Success", message)
+        
+        # Open the Excel file
+        if converter.output_format(excel_file) != "xlsx":
+            return
         try:
-            self.write_to_excel(mcq_data, excel_file)
+            os.startfile(excel_file)
+        except AttributeError:
+            # For non-Windows systems
+            import platform
+            if platform.system() == 'Darwin':  # macOS
+                subprocess.call(('open', excel_file))
+            else:  # Linux and other Unix-like
+                subprocess.call(('xdg-open', excel_file))
+        except Exception:
+            # If opening fails, just inform the user where the file is
+            pass
+
+    def add_tooltip(self, widget, text):
+        """Add tooltip to a widget when mouse hovers over it"""
+        def show_tooltip(event=None):
+            x, y, _, _ = widget.bbox("insert")
+            x += widget.winfo_rootx() + 25
+            y += widget.winfo_rooty() + 25
             
-            message = f"{len(mcq_data)} MCQs saved to Excel file: {excel_file}"
-            if hasattr(self, 'tables_found') and self.tables_found:
-                tables_output_path = os.path.splitext(excel_file)[0] + "_tables.html"
-                message += f"\n{self.tables_found} tables extracted to: {tables_output_path}"
-                
-            messagebox.showinfo("Success", message)
+            # Create a toplevel window
+            self.tooltip = tk.Toplevel(widget)
+            # Avoid window manager decorations
+            self.tooltip.wm_overrideredirect(True)
+            self.tooltip.wm_geometry(f"+{x}+{y}")
             
-            # Open the Excel file
-            try:
-                os.startfile(excel_file)
-            except AttributeError:
-                # For non-Windows systems
-                import platform
-                if platform.system() == 'Darwin':  # macOS
-                    subprocess.call(('open', excel_file))
-                else:  # Linux and other Unix-like
-                    subprocess.call(('xdg-open', excel_file))
-            except Exception:
-                # If opening fails, just inform the user where the file is
-                pass
+            label = tk.Label(self.tooltip, text=text, justify=tk.LEFT,
+                            background="#ffffe0", relief=tk.SOLID, borderwidth=1,
+                            font=("Arial", "9", "normal"))
+            label.pack(ipadx=5, ipady=5)
+            
+        def hide_tooltip(event=None):
+            if hasattr(self, "tooltip"):
+                self.tooltip.destroy()
                 
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            messagebox.showerror("Excel Error", f"Failed to create Excel file:\n{e}")
-            return
+        widget.bind("<Enter>", show_tooltip)
+        widget.bind("<Leave>", hide_tooltip)
 
-    def extract_images_from_docx(self, docx_file, output_dir):
-        """Extract images from the DOCX file (which is a ZIP archive)"""
-        try:
-            with zipfile.ZipFile(docx_file, 'r') as zip_ref:
-                # Find all image files in the archive
-                for file_info in zip_ref.infolist():
-                    if file_info.filename.startswith('word/media/'):
-                        # Extract the image file
-                        image_data = zip_ref.read(file_info.filename)
-                        # Get just the filename part
-                        image_filename = os.path.basename(file_info.filename)
-                        # Save to the output directory
-                        with open(os.path.join(output_dir, image_filename), 'wb') as img_file:
-                            img_file.write(image_data)
-        except Exception as e:
-            messagebox.showwarning("Image Extraction", f"Error extracting images: {e}")
-
-    def image_to_base64(self, image_path):
-        """Convert an image file to base64 string"""
-        try:
-            if not os.path.exists(image_path):
-                return ""
+
+class DocxToExcelConverter:
+    """
+    The docx -> MCQ -> Excel pipeline without any Tk dependencies, so it can be
+    driven both by the GUI and by the headless batch command.
+
+    Images are encoded on image_workers processes (default: one per CPU core)
+    while the questions are parsed. With external_images, write_to_excel saves
+    them to a folder next to the workbook and the cells hold their file paths.
+
+    progress, if given, is called as progress(questions, fraction) after each
+    question is parsed, with the number parsed so far and the share of the
+    .tex file read. It may raise (e.g. ConversionCancelled) to stop the
+    conversion.
+
+    With incremental, the records of the question blocks are kept in a
+    <name>_manifest.json next to the output (see bk/block_manifest.py), and
+    converting the document again only parses the blocks that changed.
+    """
+
+    # MCQRecord fields holding an image: a media member while parsing, a base64 data URL once resolved
+    IMAGE_FIELDS = ["question_img", "option_a_img", "option_b_img", "option_c_img", "option_d_img",
+                    "explanation_img", "hint_img"]
+
+    # Version of the records build_mcq_row makes, part of the manifest settings;
+    # bump it when a change to the parser changes the records of the same block
+    RECORD_VERSION = 2
+
+    def __init__(self, preserve_equations=True, class_name="", subject_name="", chapter_name="", engine="pandoc",
+                 image_workers=None, external_images=False, progress=None, incremental=False):
+        self.preserve_equations = preserve_equations
+        self.incremental = incremental
+        self.progress = progress
+        self.engine = engine
+        self.image_workers = image_workers
+        self.external_images = external_images
+        self.class_name = class_name
+        self.subject_name = subject_name
+        self.chapter_name = chapter_name
+        self.tables_found = 0
+
+    def parse_docx(self, docx_file, excel_file):
+        """
+        Read the Word document with the selected engine (pandoc or the native
+        reader in bk/docx_reader.py) and yield the parsed MCQ rows. Tables found in the document are written next to excel_file as
+        <name>_tables.html.
+
+        This is a generator: the document is read when the first row is
+        requested, and the temporary directory holding the .tex file and the
+        document's archive (open for reading its images) are kept until the
+        rows are exhausted.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log.debug("Created temporary directory: %s", tmpdir)
+
+            # Read the document once (pandoc or the native reader) and render
+            # both the .tex text and the tables from its AST
+            metrics = current_metrics()
+            with metrics.stage("read"):
+                ast = load_docx_ast(docx_file, self.engine)
+            log.info("Document conversion completed.")
+
+            with metrics.stage("latex"):
+                latex_text = ast_to_latex(ast)
+                if not latex_text.strip():
+                    log.error("Generated .tex file is empty.")
+                    raise ConversionError("Pandoc failed to generate a proper .tex file. "
+                                          "This might be due to formatting issues in your Word document.")
+                tex_path = os.path.join(tmpdir, "converted.tex")
+                with open(tex_path, "w", encoding="utf-8") as f:
+                    f.write(latex_text)
+            metrics.count("tex_bytes", os.path.getsize(tex_path))
+
+            # Extract tables for web display
+            with metrics.stage("tables"):
+                tables_html = self.extract_tables_from_ast(ast)
+            log.info("Extracted %d tables from the document", len(tables_html))
             
-            # Open the image and resize if needed
-            with Image.open(image_path) as img:
-                # Optionally resize large images
-                max_size = (800, 600)  # Maximum dimensions
-                if img.width > max_size[0] or img.height > max_size[1]:
-                    img.thumbnail(max_size, Image.LANCZOS)
-                
-                # Convert to base64
-                buffer = io.BytesIO()
-                # Determine the format based on the file extension
-                format_ext = os.path.splitext(image_path)[1].lower().lstrip('.')
-                if format_ext not in ['jpg', 'jpeg', 'png', 'gif']:
-                    format_ext = 'png'  # Default to PNG for unknown formats
-                
-                # Save to buffer
-                img.save(buffer, format=format_ext.upper())
-                img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                
-                # Create data URL
-                return f"data:image/{format_ext};base64,{img_str}"
-        except Exception as e:
-            print(f"Error converting image to base64: {e}")
-            return ""
+            # Save tables to HTML file
+            if tables_html:
+                tables_output_path = os.path.splitext(excel_file)[0] + "_tables.html"
+                with open(tables_output_path, "w", encoding="utf-8") as f:
+                    f.write("<html><head><title>Extracted Tables</title>")
+                    f.write("<style>table {border-collapse: collapse; width: 100%; margin-bottom: 20px;}")
+                    f.write("th, td {border: 1px solid #ddd; padding: 8px; text-align: left;}")
+                    f.write("th {background-color: #f2f2f2;}</style></head><body>")
+                    f.write("<h1>Tables Extracted from Document</h1>")
+                    for i, table_html in enumerate(tables_html):
+                        f.write(f"<h2>Table {i+1}</h2>")
+                        f.write(table_html)
+                    f.write("</body></html>")
+                log.info("Saved %d tables to %s", len(tables_html), tables_output_path)
+
+            manifest = None
+            if self.incremental:
+                manifest = BlockManifest(self.manifest_file(excel_file), self.manifest_settings())
+
+            # Parse the generated .tex for MCQs in the desired structure, reading the
+            # images it references from the DOCX (a ZIP file)
+            with DocxMedia(docx_file) as media:
+                log.info("Found %d images in the document", len(media))
+                yield from self.iter_latex_mcqs(tex_path, media, manifest)
+
+    @staticmethod
+    def manifest_file(output_file):
+        """The manifest of an incremental conversion to output_file: <name>_manifest.json."""
+        return os.path.splitext(output_file)[0] + "_manifest.json"
+
+    def manifest_settings(self):
+        """The options a manifest's records depend on; a manifest written with others is not reused."""
+        return {"records": self.RECORD_VERSION, "preserve_equations": self.preserve_equations}
 
     # ---------------------------------------------------------------------
     # Helper Methods
@@ -309,8 +568,7 @@ class DocxToExcelPandocGUI:
         equations = []
         
         # Find and protect $...$ expressions
-        eq_pattern = re.compile(r'(\$+)(.*?)(\1)', re.DOTALL)
-        eq_matches = eq_pattern.findall(text)
+        eq_matches = patterns.DOLLAR_EQUATION.findall(text)
         
         for i, match in enumerate(eq_matches):
             delim, content, _ = match
@@ -319,11 +577,10 @@ class DocxToExcelPandocGUI:
             protected_text = protected_text.replace(f"{delim}{content}{delim}", placeholder)
 
         # Regex to find bracket blocks like: {[}some text{]}
-        bracket_pattern = re.compile(r'\{\[}(.*?)\{]}')
-        matches = bracket_pattern.findall(protected_text)  # list of contents inside {[}...{]}
+        matches = patterns.BRACKET_TOKEN.findall(protected_text)  # list of contents inside {[}...{]}
 
         # Remove them from the original line so they're not in the question text
-        base_text = bracket_pattern.sub('', protected_text).strip()
+        base_text = patterns.BRACKET_TOKEN.sub('', protected_text).strip()
 
         # Now parse each bracket's content to see if it starts with "টপিক:"
         for m in matches:
@@ -341,7 +598,7 @@ class DocxToExcelPandocGUI:
 
         return base_text, board_institute, topic
 
-    def parse_latex_for_mcqs(self, latex_file, images_dir):
+    def iter_latex_mcqs(self, latex_file, media, manifest=None):
         """
         Reads the LaTeX line by line, searching for the structure of both pattern types:
 
@@ -372,381 +629,215 @@ class DocxToExcelPandocGUI:
             [Hint: {Hint}]
             [Explaination: {Explanation}]
 
-        Returns a list of rows for the final spreadsheet.
+        Yields an MCQRecord for the final spreadsheet, one per question as soon as its
+        block has been read and its images encoded, so only a few questions are
+        held in memory at a time. The images are read from media (the DocxMedia of
+        the document) and encoded on a process pool (see resolve_images in
+        bk/image_cache.py) while the following questions are parsed. With a
+        BlockManifest, unchanged blocks reuse the records of the previous run.
         """
+        metrics = current_metrics()
+        rows = metrics.iterate("parse", self.iter_parsed_rows(latex_file, media, manifest))
+        yield from metrics.iterate("images", resolve_images(rows, self.IMAGE_FIELDS, media, self.image_workers))
 
-        with open(latex_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        # Print first few lines for debugging
-        print("First few lines of the latex file:")
-        for i, line in enumerate(lines[:10]):
-            print(f"Line {i+1}: {line.strip()}")
-
-        # Regex for "Serial. question" - Bengali numerals
-        re_question_bn = re.compile(r'^([০-৯]+)[.,)।]\s*(.*)', re.UNICODE)
-        # Regex for "Serial. question" - English numerals
-        re_question_en = re.compile(r'^(\d+)[.,)।]\s*(.*)', re.UNICODE)
-        # Regex for options: "ক. ..."
-        re_option = re.compile(r'^([ক-ঘ])[.)]\s+(.*)$', re.UNICODE)
-        # Regex for answer: "উত্তরঃ ..."
-        re_answer = re.compile(r'^উত্তর[:ঃ]\s+(.*)$', re.UNICODE)
-        # Regex for explanation: "[Explaination: ...]"
-        re_explanation = re.compile(r'\[Explaination:\s+(.*?)(?:\]|$)', re.UNICODE)
-        # Regex for hint: "[Hint: ...]"
-        re_hint = re.compile(r'\[Hint:\s+(.*?)(?:\]|$)', re.UNICODE)
-        
-        # Updated regex patterns for topic, difficulty, and board/institute
-        # Regex for difficulty: "[Easy]", "[Medium]", "[Hard]", or any text in brackets
-        re_difficulty = re.compile(r'\[(Easy|Medium|Hard|.*?Difficulty.*?)\]', re.UNICODE | re.IGNORECASE)
-        # Regex for board/institute: "[Board-Year]" or any text containing "Board" in brackets
-        re_board = re.compile(r'\[(.*?(?:Board|Institute|Reference).*?)\]', re.UNICODE | re.IGNORECASE)
-        # Regex for topic: "[টপিক: ...]" or any text starting with "Topic:" in brackets
-        re_topic = re.compile(r'\[(?:টপিক[:ঃ]|Topic:)\s+(.*?)(?:\]|$)', re.UNICODE | re.IGNORECASE)
-        # Alternative topic pattern (just in brackets)
-        re_topic_alt = re.compile(r'\[(.*?(?:Topic|Subject|Chapter).*?)\]', re.UNICODE | re.IGNORECASE)
-        
-        # Updated specific pattern for Bengali topics - with non-greedy matching to get full content
-        re_topic_bengali = re.compile(r'\[টপিক[:ঃ]\s+([\s\S]*?)\]', re.UNICODE)
-        
-        # Regex for image inclusion
-        re_image = re.compile(r'\\includegraphics(?:\[.*?\])?\{(.*?)\}')
-        # Regex for multiple choice statements (i, ii, iii)
-        re_statement = re.compile(r'(?:^|\n)\s*(i{1,3})\.\s*(.*?)(?=$|\n\s*i{1,3}\.|\n\s*নিচের)', re.UNICODE | re.DOTALL)
-        # Regex for "নিচের কোনটি সঠিক?" to detect Pattern 2
-        re_which_correct = re.compile(r'নিচের\s+কোনটি\s+সঠিক\s*\?', re.UNICODE)
-
-        mcq_data = []
-
-        # First pass: collect all lines into a single text
-        full_text = " ".join([line.strip() for line in lines if line.strip()])
-        
-        # Print first 100 characters for debugging
-        print(f"Full text first 100 chars: {full_text[:100]}")
-        
-        # Search for Bengali numerals in the text to confirm they exist
-        bengali_digits_pattern = re.compile(r'[০-৯]+')
-        bengali_matches = bengali_digits_pattern.findall(full_text)
-        if bengali_matches:
-            print(f"Found Bengali digits in text: {', '.join(bengali_matches[:10])}")
-        else:
-            print("No Bengali digits found in the text")
-        
-        # More robust pattern for Bengali serial numbers with various separators
-        bengali_serial_pattern = r'(?:^|\s)([০-৯]+)[\.|\,|\)|।|:|\\]?[\s]*'
-        
-        # Try pattern matching with Bengali digits first (priority)
-        mcq_blocks = re.split(bengali_serial_pattern, full_text)
-        
-        # If no MCQs found or very few, try with English digits
-        if len(mcq_blocks) <= 3:  # Only the original text or just one MCQ found
-            print("Few or no Bengali digit MCQs found, trying with English digits...")
-            mcq_blocks = re.split(r'(?:^|\s)(\d+)[\.|\,|\)|।|:|\\]?[\s]*', full_text)
-        
-        # If still no MCQs found, try with even more flexible pattern
-        if len(mcq_blocks) <= 3:
-            print("Still few or no MCQs found, trying with an even more flexible pattern...")
-            # This pattern allows for more variations in separators and spacing
-            combined_pattern = r'(?:^|\s)([০-৯\d]+)[\.|\,|\)|।|:|\\]?[\s]*'
-            mcq_blocks = re.split(combined_pattern, full_text)
-        
-        print(f"Found {(len(mcq_blocks)-1)//2} potential MCQ blocks")
-        
-        # Debug first block if available
-        if len(mcq_blocks) > 2:
-            print(f"First MCQ serial: {mcq_blocks[1]}")
-            print(f"First MCQ content (first 100 chars): {mcq_blocks[2][:100]}...")
-        
-        # Check if any of the serial numbers are Bengali digits
+    def iter_parsed_rows(self, latex_file, media, manifest=None):
+        """
+        Yield the MCQRecords of the .tex file with the media members, not yet
+        encoded, in their image fields. The manifest, if given, is saved once
+        the whole file has been read.
+        """
+        metrics = current_metrics()
+        serial_pattern = choose_serial_pattern(latex_file)
         bengali_serials = 0
         english_serials = 0
-        for i in range(1, len(mcq_blocks), 2):
-            if i < len(mcq_blocks):
-                if re.match(r'[০-৯]+', mcq_blocks[i]):
+        questions = 0
+        tex_size = os.path.getsize(latex_file) or 1
+
+        with open(latex_file, "r", encoding="utf-8") as f:
+            for serial_number, question_text in iter_mcq_blocks(f, serial_pattern):
+                if patterns.BENGALI_DIGITS.match(serial_number):
                     bengali_serials += 1
-                elif re.match(r'\d+', mcq_blocks[i]):
+                elif patterns.ENGLISH_DIGITS.match(serial_number):
                     english_serials += 1
-        
-        print(f"Detected {bengali_serials} Bengali serial numbers and {english_serials} English serial numbers")
-        
-        # Process each MCQ block
-        i = 1
-        while i < len(mcq_blocks):
-            # Get serial number and question text
-            serial_number = mcq_blocks[i]
-            question_text = mcq_blocks[i+1] if i+1 < len(mcq_blocks) else ""
-            
-            # Skip if no question text
-            if not question_text.strip():
-                i += 2
-                continue
-                
-            print(f"Processing MCQ with serial: {serial_number}")
-            
-            # Check if it's a Bengali serial number and display equivalent English number
-            if re.match(r'[০-৯]+', serial_number):
-                # Convert Bengali digits to English
-                english_serial = ''
-                bengali_to_english = {'০':'0', '১':'1', '২':'2', '৩':'3', '৪':'4', 
-                                     '৫':'5', '৬':'6', '৭':'7', '৮':'8', '৯':'9'}
-                for digit in serial_number:
-                    english_serial += bengali_to_english.get(digit, digit)
-                print(f"  Bengali serial {serial_number} = English serial {english_serial}")
-            
-            # Reset variables for new MCQ
-            board_institute = ""
-            topic = ""
-            difficulty = ""
-            question_img = ""
-            options = {"ক": "", "খ": "", "গ": "", "ঘ": ""}
-            options_img = {"ক": "", "খ": "", "গ": "", "ঘ": ""}
-            answer = ""
-            explanation = ""
-            explanation_img = ""
-            hint = ""
-            hint_img = ""
-            is_pattern2 = False
-            
-            # Check if it's Pattern 2 (has multiple choice statements)
-            if re_which_correct.search(question_text):
-                is_pattern2 = True
-                print(f"MCQ {serial_number} is Pattern 2 (multiple choice)")
-            
-            # Extract images from question text
-            img_matches = re_image.findall(question_text)
-            if img_matches:
-                for img_path in img_matches:
-                    # Extract just the filename part
-                    img_filename = os.path.basename(img_path)
-                    # Construct full path to the extracted image
-                    full_img_path = os.path.join(images_dir, img_filename)
-                    
-                    if os.path.exists(full_img_path):
-                        question_img = self.image_to_base64(full_img_path)
-                        # Once we have a question image, we can break
-                        break
-                
-                # Remove image references from text
-                question_text = re_image.sub('', question_text)
-            
-            # Extract topic from the question text - try both patterns
-            # First try the Bengali-specific pattern
-            topic_match = re_topic_bengali.search(question_text)
-            if topic_match:
-                topic = topic_match.group(1).strip()
-                print(f"Found topic (Bengali pattern): {topic}")
-            else:
-                # Try general topic pattern
-                topic_match = re_topic.search(question_text)
-                if topic_match:
-                    topic = topic_match.group(1).strip()
-                    print(f"Found topic (primary pattern): {topic}")
+
+                if manifest is None:
+                    row = self.build_mcq_row(serial_number, question_text, media)
                 else:
-                    # Try alternative topic pattern
-                    topic_alt_match = re_topic_alt.search(question_text)
-                    if topic_alt_match:
-                        topic = topic_alt_match.group(1).strip()
-                        print(f"Found topic (alternative pattern): {topic}")
-            
-            # Extract difficulty from the question text
-            difficulty_match = re_difficulty.search(question_text)
-            if difficulty_match:
-                difficulty = difficulty_match.group(1).strip()
-                print(f"Found difficulty: {difficulty}")
-            
-            # Extract board/institute from the question text
-            board_match = re_board.search(question_text)
-            if board_match:
-                board_institute = board_match.group(1).strip()
-                print(f"Found board/institute: {board_institute}")
-            
-            # Extract hint from the question text
-            hint_match = re_hint.search(question_text)
-            if hint_match:
-                hint = hint_match.group(1).strip()
-                print(f"Found hint of length: {len(hint)}")
-                
-                # Look for images in the hint text
-                hint_img_matches = re_image.findall(hint)
-                if hint_img_matches:
-                    for img_path in hint_img_matches:
-                        img_filename = os.path.basename(img_path)
-                        full_img_path = os.path.join(images_dir, img_filename)
-                        
-                        if os.path.exists(full_img_path):
-                            hint_img = self.image_to_base64(full_img_path)
-                            break
-                    
-                    # Remove image references from hint
-                    hint = re_image.sub('', hint)
-            
-            # Extract explanation from the question text
-            explanation_match = re_explanation.search(question_text)
-            if explanation_match:
-                explanation = explanation_match.group(1).strip()
-                print(f"Found explanation of length: {len(explanation)}")
-                
-                # Look for images in the explanation text
-                exp_img_matches = re_image.findall(explanation)
-                if exp_img_matches:
-                    for img_path in exp_img_matches:
-                        img_filename = os.path.basename(img_path)
-                        full_img_path = os.path.join(images_dir, img_filename)
-                        
-                        if os.path.exists(full_img_path):
-                            explanation_img = self.image_to_base64(full_img_path)
-                            break
-                    
-                    # Remove image references from explanation
-                    explanation = re_image.sub('', explanation)
-            
-            # Try to find options with two different patterns
-            option_found = False
-            for option_letter in ["ক", "খ", "গ", "ঘ"]:
-                # Pattern 1: Look for options like "ক. Option text"
-                option_pattern1 = re.compile(rf"{option_letter}\.\s+(.*?)(?=\s+[ক-ঘ]\.|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", re.DOTALL)
-                option_match = option_pattern1.search(question_text)
-                
-                # Pattern 2: Look for options like "ক) Option text" or "ক অপশন টেক্সট"
-                if not option_match:
-                    option_pattern2 = re.compile(rf"{option_letter}[\)।\s]\s*(.*?)(?=\s+[ক-ঘ][\)।\s]|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", re.DOTALL)
-                    option_match = option_pattern2.search(question_text)
-                
-                if option_match:
-                    option_found = True
-                    option_text = option_match.group(1).strip()
-                    print(f"Found option {option_letter}: {option_text[:20]}...")
-                    
-                    # Look for images in the option text
-                    opt_img_matches = re_image.findall(option_text)
-                    if opt_img_matches:
-                        for img_path in opt_img_matches:
-                            img_filename = os.path.basename(img_path)
-                            full_img_path = os.path.join(images_dir, img_filename)
-                            
-                            if os.path.exists(full_img_path):
-                                options_img[option_letter] = self.image_to_base64(full_img_path)
-                                break
-                        
-                        # Remove image references from option text
-                        option_text = re_image.sub('', option_text)
-                    
-                    options[option_letter] = option_text
-            
-            # Skip this MCQ if no options found
-            if not option_found:
-                print(f"Warning: No options found for MCQ {serial_number}, skipping")
-                i += 2
-                continue
-            
-            # Extract answer from the question text - try multiple patterns
-            answer_match = re.search(r'উত্তর[:ঃ]\s+(.*?)(?=\s+\[|$)', question_text)
-            if not answer_match:
-                answer_match = re.search(r'[Aa]nswer[:ঃ]\s+(.*?)(?=\s+\[|$)', question_text)
-            
-            if answer_match:
-                answer = answer_match.group(1).strip()
-                print(f"Found answer: {answer}")
-            else:
-                print(f"Warning: No answer found for MCQ {serial_number}")
-            
-            # Clean up the question text by removing extracted parts
-            cleaned_question = question_text
-            # Remove topic - both patterns
-            cleaned_question = re.sub(r'\[(?:টপিক[:ঃ]|Topic:)\s+.*?\]', '', cleaned_question, flags=re.IGNORECASE)
-            cleaned_question = re.sub(r'\[(.*?(?:Topic|Subject|Chapter).*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-            # Remove difficulty
-            cleaned_question = re.sub(r'\[(Easy|Medium|Hard|.*?Difficulty.*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-            # Remove board/institute
-            cleaned_question = re.sub(r'\[(.*?(?:Board|Institute|Reference).*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-            # Remove options
-            for option_letter in ["ক", "খ", "গ", "ঘ"]:
-                cleaned_question = re.sub(rf"{option_letter}[.)]\s+.*?(?=\s+[ক-ঘ][.)]|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", '', cleaned_question, flags=re.DOTALL)
-            # Remove answer
-            cleaned_question = re.sub(r'উত্তর[:ঃ]\s+.*?(?=\s+\[|$)', '', cleaned_question)
-            cleaned_question = re.sub(r'[Aa]nswer[:ঃ]\s+.*?(?=\s+\[|$)', '', cleaned_question)
-            # Remove hint
-            cleaned_question = re.sub(r'\[Hint:\s+.*?\]', '', cleaned_question)
-            # Remove explanation
-            cleaned_question = re.sub(r'\[Explaination:\s+.*?\]', '', cleaned_question)
-            # Remove the "নিচের কোনটি সঠিক?" text for pattern 2
-            if is_pattern2:
-                cleaned_question = re.sub(r'নিচের\s+কোনটি\s+সঠিক\s*\?', '', cleaned_question)
-            
-            # Clean up any excessive whitespace
-            if is_pattern2:
-                # For pattern 2, preserve newlines but replace multiple spaces with single space
-                cleaned_question = re.sub(r' +', ' ', cleaned_question).strip()
-                # Make sure there are no more than 2 consecutive newlines
-                cleaned_question = re.sub(r'\n{3,}', '\n\n', cleaned_question)
-            else:
-                # For pattern 1, replace all whitespace with single space
-                cleaned_question = re.sub(r'\s+', ' ', cleaned_question).strip()
-            
-            # Update question text with the cleaned version
-            question_text = cleaned_question
-            print(f"Cleaned question (first 50 chars): {question_text[:50]}...")
-            
-            # Process equations based on user preference
-            if self.preserve_equations.get():
-                # Keep the $ symbols but clean up LaTeX commands that may cause issues
-                question_text = self.clean_latex_commands(question_text)
-                topic = self.clean_latex_commands(topic)
-                board_institute = self.clean_latex_commands(board_institute)
-                hint = self.clean_latex_commands(hint)
-                explanation = self.clean_latex_commands(explanation)
-                for k in options.keys():
-                    options[k] = self.clean_latex_commands(options[k])
-            else:
-                # Convert LaTeX equations to Unicode
-                question_text = self.convert_inline_equations_to_unicode(question_text)
-                topic = self.convert_inline_equations_to_unicode(topic)
-                board_institute = self.convert_inline_equations_to_unicode(board_institute)
-                hint = self.convert_inline_equations_to_unicode(hint)
-                explanation = self.convert_inline_equations_to_unicode(explanation)
-                for k in options.keys():
-                    options[k] = self.convert_inline_equations_to_unicode(options[k])
-            
-            # Convert Bengali answer to English (ক -> A, খ -> B, etc.)
-            option_map = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
-            answer_eng = ""
-            for bn_letter in answer:
-                if bn_letter in option_map:
-                    answer_eng += option_map[bn_letter]
-            
-            # If we successfully mapped the answer, use it; otherwise keep original
-            if answer_eng:
-                answer = answer_eng
-            
-            # Add the MCQ to our data
-            mcq_data.append([
-                serial_number.strip(),      # Serial as a temp ID
-                question_text.strip(),      # Question
-                question_img,               # Question image base64
-                topic.strip(),              # Topic
-                difficulty.strip(),         # Difficulty level
-                board_institute.strip(),    # Board/Institute
-                options["ক"].strip(),       # Option A
-                options_img["ক"],           # Option A image base64
-                options["খ"].strip(),       # Option B
-                options_img["খ"],           # Option B image base64
-                options["গ"].strip(),       # Option C
-                options_img["গ"],           # Option C image base64
-                options["ঘ"].strip(),       # Option D
-                options_img["ঘ"],           # Option D image base64
-                answer.strip(),             # Answer
-                explanation.strip(),        # Explanation
-                explanation_img,            # Explanation image base64
-                hint.strip(),               # Hint
-                hint_img                    # Hint image base64
-            ])
-
-            print(f"Successfully added MCQ {serial_number} to dataset")
-            
-            # Move to the next block
-            i += 2
+                    row = self.reuse_mcq_row(manifest, serial_number, question_text, media)
+                if row is not None:
+                    metrics.count("questions")
+                    questions += 1
+                    if self.progress is not None:
+                        # The text layer reads ahead in chunks, so this is approximate
+                        self.progress(questions, min(f.buffer.tell() / tex_size, 1.0))
+                    yield row
+                else:
+                    metrics.count("skipped_blocks")
+
+        log.info("Detected %d Bengali serial numbers and %d English serial numbers", bengali_serials, english_serials)
+        if manifest is not None:
+            log.info("Reused %d of %d questions from %s", manifest.reused, questions, manifest.path)
+            manifest.save()
+
+    def reuse_mcq_row(self, manifest, serial_number, question_text, media):
+        """
+        build_mcq_row through a BlockManifest: the record of a block the previous
+        run parsed is copied from the manifest, unless an image it refers to is
+        no longer in the document.
+        """
+        key = manifest.key(serial_number, question_text)
+        if key in manifest:
+            fields = manifest.reuse(key)
+            if fields is None:
+                return None
+            if all(media.find(fields[field]) for field in self.IMAGE_FIELDS if fields[field]):
+                manifest.reused += 1
+                current_metrics().count("reused_questions")
+                return MCQRecord(**fields)
+
+        row = self.build_mcq_row(serial_number, question_text, media)
+        manifest.store(key, None if row is None else row.fields())
+        return row
+
+    def parse_latex_for_mcqs(self, latex_file, media):
+        """Parse the whole .tex file and return the list of MCQRecords (see iter_latex_mcqs)."""
+        return list(self.iter_latex_mcqs(latex_file, media))
+
+    def build_mcq_row(self, serial_number, question_text, media):
+        """
+        Build the MCQRecord for one question block, or None if it has no options.
+        Image fields hold the media member of the image; resolve_images encodes them.
+        """
+        # Skip if no question text
+        if not question_text.strip():
+            return None
+
+        debug = log.isEnabledFor(logging.DEBUG)
+        log.debug("Processing MCQ with serial: %s", serial_number)
+
+        # Check if it's a Bengali serial number and display equivalent English number
+        if debug and patterns.BENGALI_DIGITS.match(serial_number):
+            # Convert Bengali digits to English
+            english_serial = ''
+            bengali_to_english = {'০':'0', '১':'1', '২':'2', '৩':'3', '৪':'4', 
+                                 '৫':'5', '৬':'6', '৭':'7', '৮':'8', '৯':'9'}
+            for digit in serial_number:
+                english_serial += bengali_to_english.get(digit, digit)
+            log.debug("  Bengali serial %s = English serial %s", serial_number, english_serial)
+
+        # Read every field of the block in one pass
+        block = read_block(question_text)
+        is_pattern2 = block["is_pattern2"]
+        if is_pattern2:
+            log.debug("MCQ %s is Pattern 2 (multiple choice)", serial_number)
+
+        # The first image of the document referenced anywhere in the block becomes the
+        # question image; hint, explanation and option images are not split out
+        question_img = ""
+        for img_path in block["images"]:
+            member = media.find(img_path)
+            if member:
+                question_img = member
+                break
+
+        topic = block["topic"]
+        difficulty = block["difficulty"]
+        board_institute = block["board"]
+        hint = block["hint"]
+        hint_img = ""
+        explanation = block["explanation"]
+        explanation_img = ""
+        if debug:
+            if topic:
+                log.debug("Found topic: %s", topic)
+            if difficulty:
+                log.debug("Found difficulty: %s", difficulty)
+            if board_institute:
+                log.debug("Found board/institute: %s", board_institute)
+            if hint:
+                log.debug("Found hint of length: %d", len(hint))
+            if explanation:
+                log.debug("Found explanation of length: %d", len(explanation))
+
+        # Skip this MCQ if no options found
+        if not block["options"]:
+            log.warning("No options found for MCQ %s, skipping", serial_number)
+            return None
+
+        options = {}
+        options_img = {}
+        for option_letter in patterns.OPTION_LETTERS:
+            options[option_letter] = block["options"].get(option_letter, "")
+            options_img[option_letter] = ""
+            if debug and option_letter in block["options"]:
+                log.debug("Found option %s: %s...", option_letter, options[option_letter][:20])
+
+        answer = block["answer"]
+        if answer:
+            log.debug("Found answer: %s", answer)
+        else:
+            log.warning("No answer found for MCQ %s", serial_number)
+
+        question_text = block["question"]
+        if debug:
+            log.debug("Cleaned question (first 50 chars): %s...", question_text[:50])
+
+        # Process equations based on user preference
+        with current_metrics().stage("cleanup"):
+            question_text = self.clean_equations(question_text)
+            topic = self.clean_equations(topic)
+            board_institute = self.clean_equations(board_institute)
+            hint = self.clean_equations(hint)
+            explanation = self.clean_equations(explanation)
+            for k in options.keys():
+                options[k] = self.clean_equations(options[k])
+
+        # Convert Bengali answer to English (ক -> A, খ -> B, etc.)
+        option_map = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
+        answer_eng = ""
+        for bn_letter in answer:
+            if bn_letter in option_map:
+                answer_eng += option_map[bn_letter]
+
+        # If we successfully mapped the answer, use it; otherwise keep original
+        if answer_eng:
+            answer = answer_eng
+
+        # Add the MCQ to our data
+        record = MCQRecord(
+            serial=serial_number.strip(),           # Serial as a temp ID
+            question=question_text.strip(),
+            question_img=question_img,
+            topic=topic.strip(),
+            difficulty=difficulty.strip(),
+            board=board_institute.strip(),
+            option_a=options["ক"].strip(),
+            option_a_img=options_img["ক"],
+            option_b=options["খ"].strip(),
+            option_b_img=options_img["খ"],
+            option_c=options["গ"].strip(),
+            option_c_img=options_img["গ"],
+            option_d=options["ঘ"].strip(),
+            option_d_img=options_img["ঘ"],
+            answer=answer.strip(),
+            explanation=explanation.strip(),
+            explanation_img=explanation_img,
+            hint=hint.strip(),
+            hint_img=hint_img,
+        )
+
+        log.debug("Successfully added MCQ %s to dataset", serial_number)
+        return record
 
-        return mcq_data
+    def clean_equations(self, text):
+        """
+        Clean the equations of a field as preserve_equations asks: keep the $
+        symbols but clean up LaTeX commands that may cause issues
+        (clean_latex_commands), or convert the equations to Unicode.
+        """
+        if self.preserve_equations:
+            return self.clean_latex_commands(text)
+        return self.convert_inline_equations_to_unicode(text)
 
     def clean_latex_commands(self, text):
         """
@@ -757,67 +848,61 @@ class DocxToExcelPandocGUI:
         text = text.replace(r'$\neq$', '__SPECIAL_NEQ__')
         
         # Replace LaTeX equation delimiters \( and \) with $ signs
-        text = re.sub(r'\\(\(|\))', '$', text)
+        text = patterns.MATH_PAREN_DELIMITER.sub('$', text)
         
         # Fix adjacent $ signs (might happen with $$ in the middle)
-        text = re.sub(r'\${2,}', '$', text)
+        text = patterns.REPEATED_DOLLARS.sub('$', text)
         
         # Handle specific case for system of equations with braces (like in the example image)
         # $\left.\ \begin{matrix}-\frac{1}{2}x+y&=-1\\x-2y&=2\\\end{matrix}\right\}$
-        system_pattern = r'\\left\.\s*\\begin\{matrix\}(.*?)\\end\{matrix\}\\right\\}'
-        if re.search(system_pattern, text, re.DOTALL):
+        if patterns.BRACE_EQUATION_SYSTEM.search(text):
             # Keep this format as is - it's already in the desired linear format with braces
             pass
         else:
             # Handle other LaTeX for system of equations in linear format
             # Convert any matrix or array environment to linear equations
-            text = re.sub(r'\\left\\{.*?\\begin\{(matrix|array).*?\}(.*?)\\end\{\1.*?\}', 
-                         lambda m: self.linearize_equation_system(m.group(2)), text, flags=re.DOTALL)
+            text = patterns.MATRIX_EQUATION_SYSTEM.sub(lambda m: self.linearize_equation_system(m.group(2)), text)
         
         # Handle common LaTeX environments that might be in the text but preserve their content
-        text = re.sub(r'\\begin\{(equation|align|gather|eqnarray)\*?\}(.*?)\\end\{\1\*?\}', 
-                     lambda m: f'${m.group(2).strip()}$', text, flags=re.DOTALL)
+        text = patterns.EQUATION_ENVIRONMENT.sub(lambda m: f'${m.group(2).strip()}$', text)
         
         # Clean up some excessive whitespace in equations
-        text = re.sub(r'\$\s+', '$', text)
-        text = re.sub(r'\s+\$', '$', text)
+        text = patterns.SPACE_AFTER_DOLLAR.sub('$', text)
+        text = patterns.SPACE_BEFORE_DOLLAR.sub('$', text)
         
         # Handle the specific case from the example
         # For example: $\frac{a_{1}}{a_{2}} = \frac{b_{1}}{b_{2}} $\neq$ \frac{c_{1}}{c_{2}}$
-        text = re.sub(r'\$([^$]*?) \$\\neq\$ ([^$]*?)\$', r'$\1 \\neq \2$', text)
+        text = patterns.SPLIT_NEQ.sub(r'$\1 \\neq \2$', text)
         
         # Remove \textbf and similar LaTeX markup tags
-        text = re.sub(r'\\textbf\{([^}]*?)\}', r'\1', text)
-        text = re.sub(r'\\textit\{([^}]*?)\}', r'\1', text)
-        text = re.sub(r'\\emph\{([^}]*?)\}', r'\1', text)
+        text = patterns.TEXTBF.sub(r'\1', text)
+        text = patterns.TEXTIT.sub(r'\1', text)
+        text = patterns.EMPH.sub(r'\1', text)
         
         # Remove extra brackets around normal text
-        text = re.sub(r'\{\[}([^{}\[\]]*?)\{\]}', r'\1', text)
-        text = re.sub(r'\textbf\{\{([^{}]*?)\}\}', r'\1', text)
+        text = patterns.BRACKETED_TEXT.sub(r'\1', text)
+        text = patterns.TAB_TEXTBF_BRACES.sub(r'\1', text)
         
         # Handle the specific bracket pattern from the example
         # \textbf{{[}}টপিক\textbf{:} ... \textbf{{]}}
-        text = re.sub(r'\\textbf\{\{\[}}(.*?)\\textbf\{\{\]}}', r'[\1]', text)
-        text = re.sub(r'\\textbf\{:\}', r':', text)
-        text = re.sub(r'\\textbf\{\?}', r'?', text)
+        text = patterns.TEXTBF_BRACKETS.sub(r'[\1]', text)
+        text = patterns.TEXTBF_COLON.sub(r':', text)
+        text = patterns.TEXTBF_QUESTION.sub(r'?', text)
         
         # Remove extra brackets that might interfere with equation display
-        text = re.sub(r'\{\\\[}(.*?)\{\\\]}', r'\1', text)
-        text = re.sub(r'\{\\(.*?)\\}', r'\1', text)
+        text = patterns.ESCAPED_BRACKETS.sub(r'\1', text)
+        text = patterns.BRACED_COMMAND.sub(r'\1', text)
         
         # Restore protected special commands
         text = text.replace('__SPECIAL_NEQ__', r'\neq')
         
         # Clean up slashes before and after equation delimiters
         # Remove unnecessary backslashes and forward slashes before $
-        text = re.sub(r'[\/\\]+\s*\$', ' $', text)
+        text = patterns.SLASHES_BEFORE_DOLLAR.sub(' $', text)
         # Remove unnecessary backslashes and forward slashes after $
-        text = re.sub(r'\$\s*[\/\\]+', '$ ', text)
+        text = patterns.SLASHES_AFTER_DOLLAR.sub('$ ', text)
         
         # Add spaces before and after every equation if not already present
-        # First, find all equation patterns (text between $ signs)
-        equation_pattern = re.compile(r'(\$[^$]+?\$)')
-        
         # Function to add spaces only if needed
         def add_spaces_to_eq(match):
             eq = match.group(1)
@@ -827,10 +912,10 @@ class DocxToExcelPandocGUI:
             return f"{prefix}{eq}{suffix}"
             
         # Apply the spacing function
-        text = equation_pattern.sub(add_spaces_to_eq, text)
+        text = patterns.INLINE_EQUATION.sub(add_spaces_to_eq, text)
         
         # Fix any cases where we might have added too many spaces
-        text = re.sub(r'\s{2,}', ' ', text)
+        text = patterns.REPEATED_WHITESPACE.sub(' ', text)
         
         return text.strip()
         
@@ -844,12 +929,12 @@ class DocxToExcelPandocGUI:
         Output: -\frac{1}{2}x+y=-1, x-2y=2
         """
         # Replace newline markers with commas
-        linear = re.sub(r'\\\\', ', ', matrix_content)
+        linear = matrix_content.replace('\\\\', ', ')
         
         # Replace alignment markers with appropriate symbols
-        linear = re.sub(r'&=', '=', linear)
-        linear = re.sub(r'&<', '<', linear)
-        linear = re.sub(r'&>', '>', linear)
+        linear = linear.replace('&=', '=')
+        linear = linear.replace('&<', '<')
+        linear = linear.replace('&>', '>')
         
         return linear
 
@@ -857,13 +942,11 @@ class DocxToExcelPandocGUI:
         """
         Finds $...$ or $$...$$ blocks in 'text' and converts the inside to naive Unicode.
         """
-        pattern = re.compile(r'(\${1,2})(.*?)(\1)', re.DOTALL)
-
         def replacer(m):
             eq_content = m.group(2).strip()
             return self.convert_latex_to_unicode(eq_content)
 
-        return pattern.sub(replacer, text)
+        return patterns.UNICODE_EQUATION.sub(replacer, text)
 
     def convert_latex_to_unicode(self, eq_text):
         """
@@ -886,14 +969,12 @@ class DocxToExcelPandocGUI:
             eq_text = eq_text.replace(latex_g, uni_g)
 
         # x^2 -> x²
-        eq_text = re.sub(
-            r'([A-Za-z0-9])\^([A-Za-z0-9])',
+        eq_text = patterns.SUPERSCRIPT.sub(
             lambda m: m.group(1) + self.to_superscript(m.group(2)),
             eq_text
         )
         # x_2 -> x₂
-        eq_text = re.sub(
-            r'([A-Za-z0-9])_([A-Za-z0-9])',
+        eq_text = patterns.SUBSCRIPT.sub(
             lambda m: m.group(1) + self.to_subscript(m.group(2)),
             eq_text
         )
@@ -927,89 +1008,211 @@ class DocxToExcelPandocGUI:
         }
         return subs.get(char, '_' + char)
 
+    # Shared cell styles of the workbook (see add_excel_styles); "equation" cells hold $ signs
+    HEADER_STYLE = "MCQ Header"
+    WRAPPED_STYLE = "MCQ Text"
+    WRAPPED_EQUATION_STYLE = "MCQ Text Equation"
+    EQUATION_STYLE = "MCQ Equation"
+
+    # Spreadsheet columns (1-based) wrapped as text, and the image columns, which get a fixed width
+    WRAPPED_COLUMNS = {7, 9, 11, 13, 15, 18, 20}
+    SHEET_IMAGE_COLUMNS = {8, 10, 12, 14, 16, 19, 21}
+    # Text columns that preserve_dollar_signs keeps Excel from reading as formulas: the wrapped ones and the answer
+    FORMULA_GUARD_COLUMNS = WRAPPED_COLUMNS | {17}
+
+    # Columns of the spreadsheet (and of the other row-based outputs)
+    SHEET_HEADER = [
+        "QuestionID",
+        "Serial",
+        "Class",
+        "Subject",
+        "Chapter",
+        "Topic",
+        "Question",
+        "Ques_img",
+        "OptionA",
+        "OptionA_IMG",
+        "OptionB",
+        "OptionB_IMG",
+        "OptionC",
+        "OptionC_IMG",
+        "OptionD",
+        "OptionD_IMG",
+        "Answer",
+        "Explaination",
+        "Explaination_IMG",
+        "Hint",
+        "Hint_img",
+        "Difficulty_level",
+        "Reference_Board/Institute",
+        "Reference"
+    ]
+
+    # Rows per Arrow record batch (and Parquet row group) in write_to_parquet
+    ARROW_BATCH_ROWS = 1024
+
+    @staticmethod
+    def output_format(output_file):
+        """The OUTPUT_FORMATS key for an output file name, by extension; xlsx unless it is .parquet or .arrow."""
+        extension = os.path.splitext(output_file)[1].lower()
+        for output_format, format_extension in OUTPUT_FORMATS.items():
+            if extension == format_extension:
+                return output_format
+        return "xlsx"
+
+    def write_output(self, mcq_data, output_file):
+        """Write the MCQ rows with write_to_excel or write_to_parquet, depending on the extension of output_file."""
+        with current_metrics().stage("write"):
+            if self.output_format(output_file) == "xlsx":
+                return self.write_to_excel(mcq_data, output_file)
+            return self.write_to_parquet(mcq_data, output_file)
+
     def write_to_excel(self, mcq_data, excel_file):
-        """Create a new Excel file and write MCQs data to it with the specified columns."""
-        # Create a new workbook and select the active worksheet
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "MCQs"
-
-        # Define header based on the requested columns
-        header = [
-            "QuestionID",
-            "Serial",
-            "Class",
-            "Subject",
-            "Chapter",
-            "Topic",
-            "Question",
-            "Ques_img",
-            "OptionA",
-            "OptionA_IMG",
-            "OptionB",
-            "OptionB_IMG",
-            "OptionC",
-            "OptionC_IMG",
-            "OptionD",
-            "OptionD_IMG",
-            "Answer",
-            "Explaination",
-            "Explaination_IMG",
-            "Hint",
-            "Hint_img",
-            "Difficulty_level",
-            "Reference_Board/Institute",
-            "Reference"
-        ]
-
-        # Write header row
-        for col_num, column_title in enumerate(header, 1):
-            cell = ws.cell(row=1, column=col_num, value=column_title)
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
+        """
+        Create a new Excel file and write MCQs data to it with the specified columns.
+        mcq_data can be any iterable of rows, such as the parse_docx generator;
+        returns the number of rows written.
+
+        The workbook is written in openpyxl's write-only mode, one row at a time
+        with shared named styles. Column widths are measured as the rows are
+        prepared; since the widths come before the rows in the sheet, the
+        prepared rows wait in an anonymous temporary file rather than in memory.
+
+        With external_images, each distinct image is written once to the
+        images_folder of the workbook, named by the SHA-256 of its bytes, and
+        the image cells hold its path relative to the workbook instead of the
+        base64 data URL.
+        """
+        load_openpyxl()
+
+        # Longest value in each column so far, for the column widths
+        max_lengths = [len(column_title) for column_title in self.SHEET_HEADER]
+
+        # Folder the images are saved to when they are kept out of the cells
+        images_folder = self.images_folder(excel_file) if self.external_images else None
+
+        spool = tempfile.TemporaryFile()
+        row_count = 0
+        for new_row_data in self.iter_sheet_rows(mcq_data, images_folder):
+            new_row_data = self.excel_row(new_row_data)
+            row_count += 1
+            # Measure the row for the column widths and set it aside until all rows are measured
+            for col_idx, cell_value in enumerate(new_row_data):
+                if cell_value and len(str(cell_value)) > max_lengths[col_idx]:
+                    max_lengths[col_idx] = len(str(cell_value))
+            pickle.dump(new_row_data, spool, pickle.HIGHEST_PROTOCOL)
+
+        with spool:
+            # Create a new write-only workbook
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("MCQs")
+            self.add_excel_styles(wb)
+
+            # Auto-adjust column widths based on content, with a fixed width for image columns
+            for col_idx, max_length in enumerate(max_lengths, 1):
+                if col_idx in self.SHEET_IMAGE_COLUMNS:
+                    width = 30
+                else:
+                    width = (max_length + 2) if max_length < 50 else 50
+                ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+            # Write header row
+            ws.append([self.styled_cell(ws, column_title, self.HEADER_STYLE) for column_title in self.SHEET_HEADER])
 
+            # Write data rows
+            spool.seek(0)
+            for _ in range(row_count):
+                ws.append(self.excel_cells(ws, pickle.load(spool)))
+
+            # Save the workbook
+            wb.save(excel_file)
+        return row_count
+
+    def write_to_parquet(self, mcq_data, output_file):
+        """
+        Write MCQs data to a Parquet file, or an Arrow IPC file if output_file
+        ends in .arrow, with the same columns as write_to_excel. Text columns
+        are strings and the image columns hold the image bytes (null when
+        there is no image). Rows are written ARROW_BATCH_ROWS at a time;
+        returns the number of rows written. Needs pyarrow.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet and Arrow output need pyarrow (pip install pyarrow)") from e
+
+        image_indexes = {col_num - 1 for col_num in self.SHEET_IMAGE_COLUMNS}
+        schema = pa.schema([(column_title, pa.binary() if col_idx in image_indexes else pa.string())
+                            for col_idx, column_title in enumerate(self.SHEET_HEADER)])
+        if self.output_format(output_file) == "arrow":
+            writer = pa.ipc.new_file(output_file, schema)
+        else:
+            writer = pq.ParquetWriter(output_file, schema)
+
+        columns = [[] for _ in self.SHEET_HEADER]
+        row_count = 0
+        with writer:
+            for new_row_data in self.iter_sheet_rows(mcq_data):
+                row_count += 1
+                for col_idx, value in enumerate(new_row_data):
+                    if col_idx in image_indexes:
+                        image = decode_data_url(value) if value else None
+                        value = image[1] if image else None
+                    columns[col_idx].append(value)
+                if len(columns[0]) == self.ARROW_BATCH_ROWS:
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+                    columns = [[] for _ in self.SHEET_HEADER]
+            if columns[0]:
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+        return row_count
+
+    def copy_to_database(self, mcq_data, database_url=None):
+        """
+        Load MCQs data straight into the questions table of database_url
+        (default $DATABASE_URL) with one COPY, without writing a workbook
+        (see bk/pg_sink.py). Returns the number of rows loaded.
+        """
+        with current_metrics().stage("write"):
+            return copy_to_database(self.database_records(mcq_data), database_url)
+
+    def database_records(self, mcq_data):
+        """
+        The records copy_to_database loads: the sheet rows as dicts keyed by
+        SHEET_HEADER, with the answer cleaned like the options first, so that
+        an answer given as an option's equation is loaded as its letter (as
+        in bk/docx_to_mcq.py --to-database).
+        """
+        records = (MCQRecord(**dict(record.fields(), answer=self.clean_equations(record.answer)))
+                   for record in mcq_data)
+        for row in self.iter_sheet_rows(records):
+            yield dict(zip(self.SHEET_HEADER, row))
+
+    def iter_sheet_rows(self, mcq_data, images_folder=None):
+        """
+        Yield the values of each MCQRecord in SHEET_HEADER order, with the answer
+        standardized and the LaTeX escaped, for every output format; only the
+        workbook guards values against Excel formulas (see excel_row). With
+        images_folder, the images are saved there and the image columns hold
+        references to the files (see image_file_reference).
+        """
         # Get metadata values that will apply to all rows
-        class_value = self.class_name.get().strip()
-        subject_value = self.subject_name.get().strip()
-        chapter_value = self.chapter_name.get().strip()
-
-        # Write data rows - map the data to the new structure
-        for row_num, row_data in enumerate(mcq_data, 2):
-            # Debug information: print each row's data structure
-            print(f"Row {row_num-1} data: Serial={row_data[0]}, Topic={row_data[3]}, " + 
-                  f"Difficulty={row_data[4]}, Reference={row_data[5]}")
-            
-            # Data is now in format:
-            # [0:serial, 1:question, 2:question_img, 3:topic, 4:difficulty, 5:board_inst, 
-            #  6:option_a, 7:option_a_img, 8:option_b, 9:option_b_img, 10:option_c, 11:option_c_img, 
-            #  12:option_d, 13:option_d_img, 14:answer, 15:explanation, 16:explanation_img, 
-            #  17:hint, 18:hint_img]
-            
-            # Extract data
-            serial_number = row_data[0]
-            question_text = row_data[1]
-            question_img = row_data[2]
-            topic = row_data[3]
-            difficulty = row_data[4]
-            board_institute = row_data[5]
-            option_a = row_data[6]
-            option_a_img = row_data[7]
-            option_b = row_data[8]
-            option_b_img = row_data[9]
-            option_c = row_data[10]
-            option_c_img = row_data[11]
-            option_d = row_data[12]
-            option_d_img = row_data[13]
-            answer = row_data[14]
-            explanation = row_data[15]
-            explanation_img = row_data[16]
-            hint = row_data[17]
-            hint_img = row_data[18]
+        class_value = self.class_name.strip()
+        subject_value = self.subject_name.strip()
+        chapter_value = self.chapter_name.strip()
+
+        # Prepare data rows - map the records to the sheet columns
+        debug = log.isEnabledFor(logging.DEBUG)
+        for row_num, record in enumerate(mcq_data, 2):
+            # Debug information: log each row's data structure
+            if debug:
+                log.debug("Row %d data: Serial=%s, Topic=%s, Difficulty=%s, Reference=%s",
+                          row_num - 1, record.serial, record.topic, record.difficulty, record.board)
             
             # For the answer column, ensure math expressions have $ delimiters
             # First standardize the answer format
-            options_dict = {"ক": option_a, "খ": option_b, "গ": option_c, "ঘ": option_d}
-            standardized_answer = self.standardize_answer(answer, options_dict)
+            options_dict = {"ক": record.option_a, "খ": record.option_b, "গ": record.option_c, "ঘ": record.option_d}
+            standardized_answer = self.standardize_answer(record.answer, options_dict)
             
             # Then ensure math equations have proper $ delimiters
             final_answer = self.ensure_equation_delimiters(standardized_answer)
@@ -1017,100 +1220,93 @@ class DocxToExcelPandocGUI:
             # Ensure LaTeX commands have proper backslash escaping
             final_answer = self.ensure_latex_escaped(final_answer)
             
-            # Process other fields that might contain equations
-            question_text = self.ensure_latex_escaped(question_text)
-            option_a = self.ensure_latex_escaped(option_a)
-            option_b = self.ensure_latex_escaped(option_b)
-            option_c = self.ensure_latex_escaped(option_c)
-            option_d = self.ensure_latex_escaped(option_d)
-            explanation = self.ensure_latex_escaped(explanation)
-            hint = self.ensure_latex_escaped(hint)
+            # Process other fields that might contain equations (write_to_excel
+            # then preserves their $ signs for Excel, see excel_row)
+            text = self.ensure_latex_escaped
             
-            # Finally preserve $ signs for Excel (only add ' where absolutely necessary)
-            final_answer = self.preserve_dollar_signs(final_answer)
-            question_text = self.preserve_dollar_signs(question_text)
-            option_a = self.preserve_dollar_signs(option_a)
-            option_b = self.preserve_dollar_signs(option_b)
-            option_c = self.preserve_dollar_signs(option_c)
-            option_d = self.preserve_dollar_signs(option_d)
-            explanation = self.preserve_dollar_signs(explanation)
-            hint = self.preserve_dollar_signs(hint)
+            if debug:
+                log.debug("Original answer: %s", record.answer)
+                log.debug("Standardized answer: %s", standardized_answer)
+                log.debug("Final answer with delimiters and escaped LaTeX: %s", final_answer)
             
-            print(f"Original answer: {answer}")
-            print(f"Standardized answer: {standardized_answer}")
-            print(f"Final answer with delimiters and escaped LaTeX: {final_answer}")
-            
-            # Create row for Excel with all columns - use a dictionary for clarity
-            # This approach makes it harder to accidentally extract code fragments
-            excel_row = {
-                "QuestionID": f"Q{serial_number}",
-                "Serial": serial_number,
-                "Class": class_value,
-                "Subject": subject_value,
-                "Chapter": chapter_value,
-                "Topic": topic,
-                "Question": question_text,
-                "Ques_img": question_img,
-                "OptionA": option_a,
-                "OptionA_IMG": option_a_img,
-                "OptionB": option_b,
-                "OptionB_IMG": option_b_img,
-                "OptionC": option_c,
-                "OptionC_IMG": option_c_img,
-                "OptionD": option_d,
-                "OptionD_IMG": option_d_img,
-                "Answer": final_answer,
-                "Explaination": explanation, 
-                "Explaination_IMG": explanation_img,
-                "Hint": hint,
-                "Hint_img": hint_img,
-                "Difficulty_level": difficulty,
-                "Reference_Board/Institute": board_institute,
-                "Reference": ""                  # leave empty
-            }
-            
-            # Convert dictionary to ordered list matching header
-            new_row_data = [excel_row[col] for col in header]
-            
-            # Write the row to the worksheet
-            for col_num, cell_value in enumerate(new_row_data, 1):
-                # Set the cell value directly without modification
-                cell = ws.cell(row=row_num, column=col_num, value=cell_value)
-                
-                # Special handling for text cells that may contain equations ($ signs)
-                if isinstance(cell_value, str) and '$' in cell_value:
-                    # Don't add quotes - just set the number format to text
-                    cell.number_format = '@'
-                
-                # Apply wrapping to text columns
-                if col_num in [7, 9, 11, 13, 15, 18, 20]:  # Text columns
-                    cell.alignment = Alignment(wrap_text=True, vertical='top')
-
-        # Auto-adjust column widths based on content (except for image columns)
-        for col_idx, col in enumerate(ws.columns, 1):
-            # Skip image columns for width adjustment
-            if col_idx in [8, 10, 12, 14, 16, 19, 21]:
-                continue
-                
-            max_length = 0
-            column = col[0].column_letter  # Get the column letter
-            for cell in col:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2) if max_length < 50 else 50
-            ws.column_dimensions[column].width = adjusted_width
-            
-        # Set fixed width for image columns
-        image_columns = [8, 10, 12, 14, 16, 19, 21]
-        for col_idx in image_columns:
-            col_letter = openpyxl.utils.get_column_letter(col_idx)
-            ws.column_dimensions[col_letter].width = 30
-
-        # Save the workbook
-        wb.save(excel_file)
+            # Row for Excel with all columns, in SHEET_HEADER order
+            new_row_data = [
+                f"Q{record.serial}",        # QuestionID
+                record.serial,              # Serial
+                class_value,                # Class
+                subject_value,              # Subject
+                chapter_value,              # Chapter
+                record.topic,               # Topic
+                text(record.question),      # Question
+                record.question_img,        # Ques_img
+                text(record.option_a),      # OptionA
+                record.option_a_img,        # OptionA_IMG
+                text(record.option_b),      # OptionB
+                record.option_b_img,        # OptionB_IMG
+                text(record.option_c),      # OptionC
+                record.option_c_img,        # OptionC_IMG
+                text(record.option_d),      # OptionD
+                record.option_d_img,        # OptionD_IMG
+                final_answer,               # Answer
+                text(record.explanation),   # Explaination
+                record.explanation_img,     # Explaination_IMG
+                text(record.hint),          # Hint
+                record.hint_img,            # Hint_img
+                record.difficulty,          # Difficulty_level
+                record.board,               # Reference_Board/Institute
+                "",                         # Reference: leave empty
+            ]
+
+            if images_folder:
+                for col_num in self.SHEET_IMAGE_COLUMNS:
+                    new_row_data[col_num - 1] = self.image_file_reference(new_row_data[col_num - 1], images_folder)
+
+            yield new_row_data
+
+    @staticmethod
+    def images_folder(excel_file):
+        """The folder next to excel_file that external images are saved to: <name>_images."""
+        return os.path.splitext(excel_file)[0] + "_images"
+
+    @staticmethod
+    def image_file_reference(data_url, images_folder):
+        """Save the image of a data URL to images_folder and return its path relative to the workbook."""
+        name = save_image_blob(data_url, images_folder) if data_url else ""
+        return f"{os.path.basename(images_folder)}/{name}" if name else ""
+
+    def add_excel_styles(self, wb):
+        """Register the named cell styles write_to_excel uses with the workbook."""
+        wrapped = Alignment(wrap_text=True, vertical='top')
+        wb.add_named_style(NamedStyle(self.HEADER_STYLE, font=Font(bold=True), alignment=Alignment(horizontal='center')))
+        wb.add_named_style(NamedStyle(self.WRAPPED_STYLE, alignment=wrapped))
+        # Cells with equations are stored as text, without adding quotes
+        wb.add_named_style(NamedStyle(self.WRAPPED_EQUATION_STYLE, alignment=wrapped, number_format='@'))
+        wb.add_named_style(NamedStyle(self.EQUATION_STYLE, number_format='@'))
+
+    @staticmethod
+    def styled_cell(ws, value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    def excel_row(self, row_values):
+        """A row of iter_sheet_rows for the workbook, with preserve_dollar_signs applied to FORMULA_GUARD_COLUMNS."""
+        return [self.preserve_dollar_signs(value) if col_num in self.FORMULA_GUARD_COLUMNS else value
+                for col_num, value in enumerate(row_values, 1)]
+
+    def excel_cells(self, ws, row_values):
+        """The cells of one spreadsheet row; only cells that need a style are wrapped in a WriteOnlyCell."""
+        cells = []
+        for col_num, cell_value in enumerate(row_values, 1):
+            # Special handling for text cells that may contain equations ($ signs)
+            equation = isinstance(cell_value, str) and '$' in cell_value
+            # Apply wrapping to text columns
+            if col_num in self.WRAPPED_COLUMNS:
+                style = self.WRAPPED_EQUATION_STYLE if equation else self.WRAPPED_STYLE
+            else:
+                style = self.EQUATION_STYLE if equation else None
+            cells.append(self.styled_cell(ws, cell_value, style) if style else cell_value)
+        return cells
         
     def preserve_dollar_signs(self, text):
         """Ensure $ signs are preserved in Excel by using proper formatting"""
@@ -1167,52 +1363,8 @@ class DocxToExcelPandocGUI:
             answer: The original answer text
             options: Dictionary of options {"ক": "option_a_text", "খ": "option_b_text", etc.}
         """
-        # Clean the answer
-        clean_answer = answer.strip()
-        
-        # Check if the answer is already A, B, C, D
-        if clean_answer in ['A', 'B', 'C', 'D']:
-            return clean_answer
-            
-        # Map Bengali option letters to English letters
-        option_map = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
-        
-        # Check if answer is a Bengali letter and convert
-        if clean_answer in option_map:
-            return option_map[clean_answer]
-            
-        # Try to find a match between the answer text and any option content
-        for option_letter, option_text in options.items():
-            if option_text and clean_answer == option_text.strip():
-                return option_map.get(option_letter, option_letter)
-                
-        # If we get here, no match was found, return the original answer
-        return clean_answer
-
-    def add_tooltip(self, widget, text):
-        """Add tooltip to a widget when mouse hovers over it"""
-        def show_tooltip(event=None):
-            x, y, _, _ = widget.bbox("insert")
-            x += widget.winfo_rootx() + 25
-            y += widget.winfo_rooty() + 25
-            
-            # Create a toplevel window
-            self.tooltip = tk.Toplevel(widget)
-            # Avoid window manager decorations
-            self.tooltip.wm_overrideredirect(True)
-            self.tooltip.wm_geometry(f"+{x}+{y}")
-            
-            label = tk.Label(self.tooltip, text=text, justify=tk.LEFT,
-                            background="#ffffe0", relief=tk.SOLID, borderwidth=1,
-                            font=("Arial", "9", "normal"))
-            label.pack(ipadx=5, ipady=5)
-            
-        def hide_tooltip(event=None):
-            if hasattr(self, "tooltip"):
-                self.tooltip.destroy()
-                
-        widget.bind("<Enter>", show_tooltip)
-        widget.bind("<Leave>", hide_tooltip)
+        # Shared with bk/pg_sink.py, which loads the same letters into the database
+        return standardize_answer(answer, options)
 
     def ensure_latex_escaped(self, text):
         """
@@ -1223,7 +1375,6 @@ class DocxToExcelPandocGUI:
             return text
             
         # Find all equations ($ delimited content)
-        equation_pattern = re.compile(r'\$(.*?)\$')
         
         def format_latex_equation(match):
             eq_content = match.group(1)
@@ -1256,124 +1407,283 @@ class DocxToExcelPandocGUI:
             return '$' + eq_content.strip() + '$'
             
         # Apply formatting to each equation in the text
-        return equation_pattern.sub(format_latex_equation, text)
+        return patterns.DOLLAR_CONTENT.sub(format_latex_equation, text)
 
-    def extract_tables_from_html(self, html_file):
+    def extract_tables_from_ast(self, ast):
         """
-        Extract tables from HTML file generated by pandoc
+        Extract tables from the pandoc JSON AST of the document
         Returns a list of HTML table elements as strings
         """
-        with open(html_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-            
-        # Simple table extraction using regex
-        table_pattern = re.compile(r'<table[^>]*>(.*?)</table>', re.DOTALL)
-        tables = table_pattern.findall(html_content)
+        tables = ast_tables_to_html(ast)
         
         # Save the number of tables found for reporting
         self.tables_found = len(tables)
         
-        # Process each table to ensure it has proper HTML structure
-        processed_tables = []
-        for table_content in tables:
-            # Ensure the table has proper HTML
-            table_html = f"<table class='extracted-table'>{table_content}</table>"
-            processed_tables.append(table_html)
-            
-        return processed_tables
+        return [f"<table class='extracted-table'>{table_content}</table>" for table_content in tables]
 
 
-def convert_docx_tables_to_html(docx_file, output_html=None):
+def convert_docx_tables_to_html(docx_file, output_html=None, ast=None, engine="pandoc"):
     """
     Standalone function to extract tables from Word documents and convert them to HTML
     
     Args:
         docx_file: Path to the Word document
         output_html: Optional path for the HTML output file
+        ast: Optional pandoc JSON AST of docx_file, to avoid reading it again
+        engine: "pandoc" or "native", used when ast is not given
         
     Returns:
         HTML string containing all tables from the document
     """
-    import os
-    import subprocess
-    import re
-    import tempfile
-    
-    # Create temp directory for processing
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Run pandoc to convert DOCX to HTML
-        html_path = os.path.join(tmpdir, "temp.html")
-        cmd = ["pandoc", docx_file, "-o", html_path]
+    try:
+        if ast is None:
+            ast = load_docx_ast(docx_file, engine)
+        tables = ast_tables_to_html(ast)
         
-        try:
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            
-            # Read the generated HTML
-            with open(html_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-                
-            # Extract tables using regex
-            table_pattern = re.compile(r'<table[^>]*>(.*?)</table>', re.DOTALL)
-            tables = table_pattern.findall(html_content)
-            
-            if not tables:
-                print("No tables found in the document")
-                return None
-                
-            # Create a complete HTML document with the tables
-            output_html_content = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>Tables from Word Document</title>
-                <style>
-                    body { font-family: Arial, sans-serif; margin: 20px; }
-                    h1 { color: #333; }
-                    table { border-collapse: collapse; width: 100%; margin-bottom: 30px; }
-                    th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-                    th { background-color: #f2f2f2; font-weight: bold; }
-                    tr:nth-child(even) { background-color: #f9f9f9; }
-                    .table-container { margin-bottom: 40px; }
-                </style>
-            </head>
-            <body>
-                <h1>Tables Extracted from Word Document</h1>
-            """
+        if not tables:
+            log.info("No tables found in the document")
+            return None
             
-            for i, table_content in enumerate(tables):
-                output_html_content += f"""
-                <div class="table-container">
-                    <h2>Table {i+1}</h2>
-                    <table>{table_content}</table>
-                </div>
-                """
-                
-            output_html_content += """
-            </body>
-            </html>
+        # Create a complete HTML document with the tables
+        output_html_content = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>Tables from Word Document</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                h1 { color: #333; }
+                table { border-collapse: collapse; width: 100%; margin-bottom: 30px; }
+                th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+                th { background-color: #f2f2f2; font-weight: bold; }
+                tr:nth-child(even) { background-color: #f9f9f9; }
+                .table-container { margin-bottom: 40px; }
+            </style>
+        </head>
+        <body>
+            <h1>Tables Extracted from Word Document</h1>
+        """
+        
+        for i, table_content in enumerate(tables):
+            output_html_content += f"""
+            <div class="table-container">
+                <h2>Table {i+1}</h2>
+                <table>{table_content}</table>
+            </div>
             """
             
-            # Save to output file if specified
-            if output_html:
-                with open(output_html, 'w', encoding='utf-8') as f:
-                    f.write(output_html_content)
-                print(f"Saved {len(tables)} tables to {output_html}")
-                
-            return output_html_content
+        output_html_content += """
+        </body>
+        </html>
+        """
+        
+        # Save to output file if specified
+        if output_html:
+            with open(output_html, 'w', encoding='utf-8') as f:
+                f.write(output_html_content)
+            log.info("Saved %d tables to %s", len(tables), output_html)
             
-        except subprocess.CalledProcessError as e:
-            print(f"Error running pandoc: {e}")
-            return None
-        except Exception as e:
-            print(f"Error processing document: {e}")
-            return None
+        return output_html_content
+        
+    except subprocess.CalledProcessError as e:
+        log.error("Error running pandoc: %s", e)
+        return None
+    except Exception as e:
+        log.error("Error processing document: %s", e)
+        return None
+
+
+
+# ---------------------------------------------------------------------
+# Headless batch conversion
+# ---------------------------------------------------------------------
+
+def find_docx_files(input_dir, recursive=False):
+    """Return the sorted .docx files in input_dir, skipping Word lock files (~$...)."""
+    docx_files = []
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        for filename in filenames:
+            if filename.lower().endswith(".docx") and not filename.startswith("~$"):
+                docx_files.append(os.path.join(dirpath, filename))
+        if not recursive:
+            break
+    return sorted(docx_files)
+
+
+def convert_one_docx(docx_file, excel_file, options, to_database=False, database_url=None):
+    """
+    Convert a single document for the batch command, to excel_file or, with
+    to_database, into the questions table of database_url. Runs inside a
+    worker process, so it never raises; failures are reported in the
+    returned entry, and the stage timings and counters of a converted
+    document in its "metrics" (see bk/mcq_metrics.py).
+    """
+    start = time.perf_counter()
+    entry = {"docx": docx_file, "excel": excel_file, "mcqs": 0, "tables": 0, "seconds": 0.0, "error": ""}
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(excel_file)), exist_ok=True)
+        converter = DocxToExcelConverter(**options)
+        with collect_metrics(docx_file, engine=converter.engine) as metrics:
+            mcq_rows = converter.parse_docx(docx_file, excel_file)
+            first_row = next(mcq_rows, None)
+            if first_row is not None and to_database:
+                entry["mcqs"] = converter.copy_to_database(itertools.chain([first_row], mcq_rows), database_url)
+            elif first_row is not None:
+                entry["mcqs"] = converter.write_output(itertools.chain([first_row], mcq_rows), excel_file)
+            else:
+                entry["error"] = "No MCQs found in the document"
+        entry["tables"] = converter.tables_found
+        entry["metrics"] = metrics.report()
+    except FileNotFoundError as e:
+        if e.filename == "pandoc":
+            entry["error"] = "pandoc not found. Please install pandoc."
+        else:
+            entry["error"] = str(e)
+    except subprocess.CalledProcessError as e:
+        entry["error"] = f"Pandoc failed to convert: {e.stderr}"
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
 
 
-def main():
+def run_batch(input_dir, output_dir=None, jobs=None, recursive=False, options=None, output_format="xlsx",
+              to_database=False, database_url=None):
+    """
+    Convert every .docx in input_dir over a pool of worker processes (one per
+    core by default), writing one workbook (or Parquet/Arrow file, see
+    OUTPUT_FORMATS) per input, or with to_database loading each document into
+    the questions table of database_url, and a batch_summary.json report.
+    Returns the list of per-document summary entries.
+    """
+    options = options or {}
+    output_dir = output_dir or input_dir
+    docx_files = find_docx_files(input_dir, recursive)
+    if not docx_files:
+        log.error("No .docx files found in %s", input_dir)
+        return []
+
+    jobs = jobs or os.cpu_count() or 1
+    log.info("Converting %d documents with %d worker(s)", len(docx_files), jobs)
+
+    summary = []
+    start = time.perf_counter()
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    # The workers log at the level configure_logging left in the environment
+    with ProcessPoolExecutor(max_workers=jobs, initializer=configure_logging) as pool:
+        futures = []
+        for docx_file in docx_files:
+            relative = os.path.relpath(docx_file, input_dir)
+            excel_file = os.path.join(output_dir, os.path.splitext(relative)[0] + OUTPUT_FORMATS[output_format])
+            futures.append(pool.submit(convert_one_docx, docx_file, excel_file, options, to_database, database_url))
+
+        for future in as_completed(futures):
+            entry = future.result()
+            summary.append(entry)
+            status = entry["error"] or f"{entry['mcqs']} MCQs"
+            log.info("[%d/%d] %s: %s (%ss)", len(summary), len(docx_files), entry['docx'], status, entry['seconds'])
+
+    summary.sort(key=lambda entry: entry["docx"])
+    elapsed = time.perf_counter() - start
+    report = {
+        "input_dir": os.path.abspath(input_dir),
+        "output_dir": os.path.abspath(output_dir),
+        "jobs": jobs,
+        "documents": len(summary),
+        "failed": sum(1 for entry in summary if entry["error"]),
+        "mcqs": sum(entry["mcqs"] for entry in summary),
+        "seconds": round(elapsed, 3),
+        "files": summary,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, "batch_summary.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    log.info("Converted %d/%d documents, %d MCQs in %.1fs. Summary saved to %s",
+             report['documents'] - report['failed'], report['documents'], report['mcqs'], elapsed, report_path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert MCQ Word documents to Excel. Opens the GUI when no command is given.")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=None,
+                        help="Log messages at this level and above to stderr (default: $MCQ_LOG_LEVEL or INFO; "
+                             "DEBUG reports every question)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Convert every .docx in a directory without the GUI")
+    batch_parser.add_argument("input_dir", help="Directory containing the .docx files")
+    batch_parser.add_argument("-j", "--jobs", type=int, default=None,
+                              help="Number of worker processes (default: one per CPU core)")
+    batch_parser.add_argument("-o", "--output-dir", default=None,
+                              help="Where to write the workbooks (default: next to each input)")
+    batch_parser.add_argument("-r", "--recursive", action="store_true", help="Also convert documents in subdirectories")
+    batch_parser.add_argument("--class", dest="class_name", default="", help="Class applied to all questions")
+    batch_parser.add_argument("--subject", dest="subject_name", default="", help="Subject applied to all questions")
+    batch_parser.add_argument("--chapter", dest="chapter_name", default="", help="Chapter applied to all questions")
+    batch_parser.add_argument("--unicode-equations", action="store_true",
+                              help="Convert equations to Unicode instead of keeping linear LaTeX")
+    batch_parser.add_argument("--engine", choices=ENGINES, default="pandoc",
+                              help="Read documents with pandoc (default) or the built-in reader, "
+                                   "which falls back to pandoc on documents it cannot read")
+    batch_parser.add_argument("--image-cache", metavar="DIR", default=None,
+                              help=f"Keep encoded images in DIR and reuse them across runs (default: ${CACHE_DIR_ENV})")
+    batch_parser.add_argument("--pandoc-cache", metavar="DIR", default=None,
+                              help=f"Keep pandoc's output in DIR and reuse it for identical documents (default: ${PANDOC_CACHE_DIR_ENV})")
+    batch_parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="xlsx",
+                              help="Write Excel workbooks (default), Parquet files or Arrow IPC files; "
+                                   "Parquet and Arrow store the images as binary columns and need pyarrow")
+    batch_parser.add_argument("--to-database", action="store_true",
+                              help="Load each document into the questions table with one COPY instead of "
+                                   "writing workbooks; needs psycopg")
+    batch_parser.add_argument("--database-url", default=None,
+                              help=f"PostgreSQL database for --to-database (default: ${DATABASE_URL_ENV})")
+    batch_parser.add_argument("--profile", metavar="DIR", default=None,
+                              help=f"Profile each document with cProfile into DIR/<document>.prof (default: ${PROFILE_DIR_ENV})")
+    batch_parser.add_argument("--image-files", action="store_true",
+                              help="Save images to a <name>_images folder next to each workbook and "
+                                   "store their paths in the cells instead of base64 data")
+    batch_parser.add_argument("--incremental", action="store_true",
+                              help="Keep the parsed questions in a <name>_manifest.json next to each output and "
+                                   "only parse the questions that changed when converting a document again")
+
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    if args.command == "batch":
+        if not os.path.isdir(args.input_dir):
+            parser.error(f"{args.input_dir} is not a directory")
+        if args.image_cache:
+            # Inherited by the worker processes
+            os.environ[CACHE_DIR_ENV] = os.path.abspath(args.image_cache)
+        if args.pandoc_cache:
+            os.environ[PANDOC_CACHE_DIR_ENV] = os.path.abspath(args.pandoc_cache)
+        if args.profile:
+            os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.profile)
+        options = {
+            "preserve_equations": not args.unicode_equations,
+            "class_name": args.class_name,
+            "subject_name": args.subject_name,
+            "chapter_name": args.chapter_name,
+            "engine": args.engine,
+            # Every worker process converts a document, so each encodes its own images
+            "image_workers": 1,
+            "external_images": args.image_files,
+            "incremental": args.incremental,
+        }
+        summary = run_batch(args.input_dir, args.output_dir, args.jobs, args.recursive, options, args.output_format,
+                            args.to_database, args.database_url)
+        sys.exit(1 if not summary or any(entry["error"] for entry in summary) else 0)
+
+    load_tk()
     root = tk.Tk()
     app = DocxToExcelPandocGUI(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the DOCX -> MCQ conversion pipeline.
+
+    python benchmark_mcq.py engines [docx_file ...] [--repeat N]
+    python benchmark_mcq.py parse [--questions N] [--repeat N]
+    python benchmark_mcq.py suite [--sizes 100,1000,10000] [--equations F] [--images F]
+                                  [--pattern2 F] [--repeat N] [--save FILE] [--compare FILE]
+    python benchmark_mcq.py generate OUTPUT(.tex|.docx) [--questions N] [--equations F] [--images F]
+    python benchmark_mcq.py startup [--repeat N] [--top N]
+
+engines   Reads each document with pandoc and with the native reader
+          (docx_reader.py), timing the read on its own and the whole
+          process_docx_file call, and checks both engines extract the same
+          MCQs. Defaults to the sample chapter document next to this script.
+parse     Times parse_latex_for_mcqs on a synthetic LaTeX document of
+          N Bengali MCQs (1000 by default) and reports the cost per question.
+suite     Times each stage on its own, for synthetic documents of each size
+          (100 to 50,000 questions):
+            parse      reading the question blocks (parse_latex_for_mcqs
+                       without its image stage)
+            cleanup    clean_latex_commands on every field of every question
+            images     encode_image (image_cache.py) on every distinct image
+            excel      DocxToExcelConverter.write_to_excel (../MCQ2XLXS.py)
+          --save stores the results as JSON; --compare checks them against
+          saved results and exits with status 1 if a stage got slower by
+          more than --tolerance.
+generate  Writes a synthetic document, as LaTeX or as a Word document that
+          pandoc and the native reader can read.
+startup   Times importing docx_to_mcq (what the Node backend spawns) and
+          ../MCQ2XLXS.py in fresh interpreters with python -X importtime,
+          lists the slowest imports and whether tkinter, openpyxl or Pillow
+          were loaded, which neither should do at startup.
+
+The synthetic documents follow the layout of the chapter documents: Bengali
+serials, topic brackets, optional difficulty, board, hint and explanation,
+Pattern 1 and Pattern 2 questions (--pattern2 is the share of the latter),
+equations in a share of the questions (--equations) and an image in a share
+of them (--images), drawn from a few distinct images.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageDraw
+
+from docx_reader import ENGINES, load_docx_ast, text_inlines
+from docx_to_mcq import clean_latex_commands, iter_parsed_mcqs, parse_latex_for_mcqs, process_docx_file
+from image_cache import DocxMedia, encode_image
+from mcq_lexer import choose_serial_pattern, iter_mcq_blocks, read_block
+from mcq_log import configure_logging
+from pandoc_ast import ast_to_latex
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DOCX = os.path.join(SCRIPT_DIR, "AFS AP-Jan SSC  Genral Math  Chapter 12 MCQ done by MOHOMMAD HASAN.docx")
+
+BENGALI_DIGITS = str.maketrans("0123456789", "০১২৩৪৫৬৭৮৯")
+SYNTHETIC_TOPICS = ["সরল সহসমীকরণ", "গুরুত্বপূর্ণ তথ্য ও সমাধান যোগ্যতা সংক্রান্ত", "লেখচিত্রের সাহায্যে সমাধান"]
+SYNTHETIC_BOARDS = ["[Dhaka Board-2019]", "[Rajshahi Board-2022]", "[Reference: Test Paper]", ""]
+SYNTHETIC_DIFFICULTIES = ["[Easy]", "[Medium]", "[Hard]", ""]
+
+# Distinct images the synthetic questions draw from, and their size in pixels
+SYNTHETIC_IMAGES = 16
+SYNTHETIC_IMAGE_SIZE = (1000, 750)
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+# Modules the startup benchmark imports, and the directory it imports them from
+STARTUP_MODULES = [("docx_to_mcq", SCRIPT_DIR), ("MCQ2XLXS", os.path.dirname(SCRIPT_DIR))]
+# Modules that should only be loaded once they are needed
+HEAVY_MODULES = ["tkinter", "openpyxl", "PIL"]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence anything the converters print while timing them."""
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            yield
+
+
+def time_call(func, repeat):
+    """Call func repeat times and return (best, mean) seconds and the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with quiet():
+            result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.mean(timings), result
+
+
+# ---------------------------------------------------------------------
+# Synthetic documents
+# ---------------------------------------------------------------------
+#
+# A document is a list of paragraphs, and a paragraph a list of pieces:
+#   ("text", str)      plain text
+#   ("bold", str)      bold text
+#   ("math", tokens)   an inline equation; tokens are strings, or
+#                      ("frac", numerator, denominator)
+#   ("image", name)    a picture, one of the synthetic_images
+# which render both to a pandoc AST (and from it to LaTeX, as the converters
+# do) and to the XML of a Word document.
+
+def synthetic_paragraphs(count, seed=0, equations=1.0, images=0.0, pattern2=0.25):
+    """The paragraphs of a synthetic document of count MCQs (see the module docstring)."""
+    rng = random.Random(seed)
+    paragraphs = []
+    for serial in range(1, count + 1):
+        a, b, c = rng.randint(2, 9), rng.randint(2, 9), rng.randint(10, 99)
+        with_math = rng.random() < equations
+        equation = ("math", [f"{a}x + {b}y = {c}"]) if with_math else ("text", f"{a}x + {b}y = {c}")
+        stem = [("text", f"{str(serial).translate(BENGALI_DIGITS)}. ")]
+        if rng.random() < images:
+            stem.append(("image", f"image{rng.randrange(SYNTHETIC_IMAGES) + 1}.png"))
+
+        body = []
+        if rng.random() < pattern2:
+            stem += [equation, ("text", " সমীকরণটির ক্ষেত্রে")]
+            body.append([("text", "i. সমীকরণটি সরল")])
+            body.append([("text", "ii. "), ("math", [f"x = {a}"]) if with_math else ("text", f"x = {a}"),
+                         ("text", " হলে y এর একটি মান পাওয়া যায়")])
+            body.append([("text", "iii. লেখচিত্র একটি সরলরেখা")])
+            body.append([("text", "নিচের কোনটি সঠিক"), ("bold", "?")])
+            options = [[("text", text)] for text in ["i ও ii", "i ও iii", "ii ও iii", "i, ii ও iii"]]
+        else:
+            stem += [equation, ("text", " হলে x এর মান কত?")]
+            if with_math:
+                options = [[("math", [("frac", str(c), str(a))])], [("math", [str(a + b)])],
+                           [("math", [str(c - b)])], [("text", "কোনোটিই নয়")]]
+            else:
+                options = [[("text", f"{c}/{a}")], [("text", str(a + b))], [("text", str(c - b))],
+                           [("text", "কোনোটিই নয়")]]
+
+        paragraphs.append(stem)
+        paragraphs.extend(body)
+        paragraphs.append([("text", f"[টপিক: {rng.choice(SYNTHETIC_TOPICS)}]")])
+        for extra in (rng.choice(SYNTHETIC_DIFFICULTIES), rng.choice(SYNTHETIC_BOARDS)):
+            if extra:
+                paragraphs.append([("text", extra)])
+        for letter, option in zip(["ক", "খ", "গ", "ঘ"], options):
+            paragraphs.append([("text", f"{letter}. ")] + option)
+        paragraphs.append([("text", "উত্তর: ")] + rng.choice(options))
+        if rng.random() < 0.5:
+            paragraphs.append([("text", "[Hint: "), equation, ("text", " থেকে y অপসারণ কর]")])
+        if rng.random() < 0.5:
+            solution = ("math", ["x = ", ("frac", f"{c} - {b}y", str(a))]) if with_math \
+                else ("text", f"x = ({c} - {b}y)/{a}")
+            paragraphs.append([("text", "[Explaination: পক্ষান্তর করে "), solution, ("text", "]")])
+    return paragraphs
+
+
+def synthetic_images(seed=0):
+    """The PNG bytes of the SYNTHETIC_IMAGES distinct images, by file name."""
+    rng = random.Random(seed)
+    width, height = SYNTHETIC_IMAGE_SIZE
+    images = {}
+    for n in range(1, SYNTHETIC_IMAGES + 1):
+        img = Image.new("RGB", SYNTHETIC_IMAGE_SIZE, "white")
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            points = [rng.randrange(width), rng.randrange(height), rng.randrange(width), rng.randrange(height)]
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.line(points, fill=color, width=rng.randint(1, 6))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        images[f"image{n}.png"] = buffer.getvalue()
+    return images
+
+
+def math_tex(tokens):
+    return "".join(token if isinstance(token, str) else f"\\frac{{{token[1]}}}{{{token[2]}}}"
+                   for token in tokens)
+
+
+def synthetic_ast(paragraphs):
+    """The pandoc JSON AST of a synthetic document, as pandoc would read its Word version."""
+    blocks = []
+    for paragraph in paragraphs:
+        inlines = []
+        for kind, value in paragraph:
+            if kind == "text":
+                inlines.extend(text_inlines(value))
+            elif kind == "bold":
+                inlines.append({"t": "Strong", "c": text_inlines(value)})
+            elif kind == "math":
+                inlines.append({"t": "Math", "c": [{"t": "InlineMath"}, math_tex(value)]})
+            elif kind == "image":
+                inlines.append({"t": "Image", "c": [["", [], []], [], [f"media/{value}", ""]]})
+        blocks.append({"t": "Para", "c": inlines})
+    return {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": blocks}
+
+
+def synthetic_latex(count, seed=0, equations=1.0, images=0.0, pattern2=0.25):
+    """
+    Build the LaTeX the converters produce for a synthetic document of count
+    MCQs: Bengali serials, topic brackets, inline math, both question
+    patterns, and optional board, difficulty, hint and explanation.
+    """
+    return ast_to_latex(synthetic_ast(synthetic_paragraphs(count, seed, equations, images, pattern2)))
+
+
+DOCX_NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"'
+)
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+DOCX_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+IMAGE_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+def docx_text(text, bold=False):
+    props = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f'<w:r>{props}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+
+
+def docx_math(tokens):
+    # Equation editor runs hold no spaces; pandoc spaces the operators itself
+    run = lambda text: f"<m:r><m:t>{escape(text.replace(' ', ''))}</m:t></m:r>"
+    parts = []
+    for token in tokens:
+        if isinstance(token, str):
+            parts.append(run(token))
+        else:
+            _, numerator, denominator = token
+            parts.append(f"<m:f><m:num>{run(numerator)}</m:num><m:den>{run(denominator)}</m:den></m:f>")
+    return f"<m:oMath>{''.join(parts)}</m:oMath>"
+
+
+def docx_image(rel_id, picture_id):
+    # 1.25in x 0.9375in, in EMU
+    cx, cy = 1143000, 857250
+    return (
+        f'<w:r><w:drawing><wp:inline><wp:extent cx="{cx}" cy="{cy}"/>'
+        f'<wp:docPr id="{picture_id}" name="Picture {picture_id}"/>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{picture_id}" name="Picture {picture_id}"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+        '</a:graphicData></a:graphic></wp:inline></w:drawing></w:r>'
+    )
+
+
+def write_synthetic_docx(path, paragraphs, images):
+    """Write a synthetic document (see synthetic_paragraphs) as a Word document with its images."""
+    used = sorted({value for paragraph in paragraphs for kind, value in paragraph if kind == "image"})
+    rel_ids = {name: f"rIdImage{n}" for n, name in enumerate(used, 1)}
+
+    body = []
+    picture_id = 0
+    for paragraph in paragraphs:
+        runs = []
+        for kind, value in paragraph:
+            if kind in ("text", "bold"):
+                runs.append(docx_text(value, bold=kind == "bold"))
+            elif kind == "math":
+                runs.append(docx_math(value))
+            elif kind == "image":
+                picture_id += 1
+                runs.append(docx_image(rel_ids[value], picture_id))
+        body.append(f"<w:p>{''.join(runs)}</w:p>")
+
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document {DOCX_NAMESPACES}><w:body>{"".join(body)}</w:body></w:document>')
+    relationships = "".join(f'<Relationship Id="{rel_id}" Type="{IMAGE_RELATIONSHIP}" Target="media/{name}"/>'
+                            for name, rel_id in rel_ids.items())
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        docx.writestr("_rels/.rels", DOCX_PACKAGE_RELS)
+        docx.writestr("word/document.xml", document)
+        docx.writestr("word/_rels/document.xml.rels",
+                      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                      f"{relationships}</Relationships>")
+        for name in used:
+            # PNGs are already compressed
+            docx.writestr(f"word/media/{name}", images[name], zipfile.ZIP_STORED)
+
+
+def write_synthetic_inputs(tmpdir, count, seed=0, equations=1.0, images=0.0, pattern2=0.25):
+    """Write the .tex and .docx of a synthetic document into tmpdir and return their paths."""
+    paragraphs = synthetic_paragraphs(count, seed, equations, images, pattern2)
+    latex_file = os.path.join(tmpdir, "converted.tex")
+    with open(latex_file, "w", encoding="utf-8") as f:
+        f.write(ast_to_latex(synthetic_ast(paragraphs)))
+    docx_file = os.path.join(tmpdir, "synthetic.docx")
+    write_synthetic_docx(docx_file, paragraphs, synthetic_images(seed) if images > 0 else {})
+    return latex_file, docx_file
+
+
+# ---------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------
+
+def question_fields(latex_file):
+    """The raw text of every field clean_latex_commands cleans, for each question of the .tex file."""
+    fields = []
+    with open(latex_file, "r", encoding="utf-8") as f:
+        for _serial, text in iter_mcq_blocks(f, choose_serial_pattern(latex_file)):
+            block = read_block(text)
+            if block["options"]:
+                fields.append([block["question"], block["topic"], block["board"], block["hint"],
+                               block["explanation"], *block["options"].values()])
+    return fields
+
+
+def load_desktop_converter():
+    """DocxToExcelConverter from ../MCQ2XLXS.py, or None if it cannot be imported here (e.g. no tkinter)."""
+    sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+    try:
+        from MCQ2XLXS import DocxToExcelConverter
+    except ImportError as e:
+        print(f"  excel: skipped, MCQ2XLXS.py cannot be imported ({e})")
+        return None
+    return DocxToExcelConverter
+
+
+def bench_stages(questions, repeat, seed=0, equations=1.0, images=0.0, pattern2=0.25):
+    """Time each suite stage on a synthetic document (see the module docstring); returns one result dict per stage."""
+    results = []
+
+    def record(name, items, best, mean):
+        results.append({"benchmark": name, "questions": questions, "items": items,
+                        "best": round(best, 6), "mean": round(mean, 6)})
+        per_item = best * 1e6 / items if items else 0.0
+        print(f"  {name:<8} {items:>7} items  best {best * 1000:>10.1f}ms  mean {mean * 1000:>10.1f}ms  "
+              f"{per_item:>9.1f}us per item")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex_file, docx_file = write_synthetic_inputs(tmpdir, questions, seed, equations, images, pattern2)
+        with DocxMedia(docx_file) as media:
+            best, mean, mcqs = time_call(lambda: list(iter_parsed_mcqs(latex_file, media)), repeat)
+            record("parse", len(mcqs), best, mean)
+
+            fields = question_fields(latex_file)
+            best, mean, _ = time_call(
+                lambda: [[clean_latex_commands(text) for text in texts] for texts in fields], repeat)
+            record("cleanup", len(fields), best, mean)
+
+            blobs = [(member, media.read(member)) for member in sorted(media.members.values())]
+            if blobs:
+                best, mean, _ = time_call(lambda: [encode_image(data, member) for member, data in blobs], repeat)
+                record("images", len(blobs), best, mean)
+
+            converter_class = load_desktop_converter()
+            if converter_class is not None:
+                converter = converter_class(image_workers=1)
+                with quiet():
+                    rows = converter.parse_latex_for_mcqs(latex_file, media)
+                excel_file = os.path.join(tmpdir, "synthetic.xlsx")
+                best, mean, _ = time_call(lambda: converter.write_to_excel(rows, excel_file), repeat)
+                record("excel", len(rows), best, mean)
+    return results
+
+
+def bench_parse(questions, repeat):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex_file, docx_file = write_synthetic_inputs(tmpdir, questions)
+        with DocxMedia(docx_file) as media:
+            best, mean, mcqs = time_call(lambda: parse_latex_for_mcqs(latex_file, media), repeat)
+    print(f"parse_latex_for_mcqs: {len(mcqs)} of {questions} synthetic MCQs parsed")
+    print(f"  best {best * 1000:.1f}ms ({best * 1e6 / questions:.1f}us per question), "
+          f"mean {mean * 1000:.1f}ms ({mean * 1e6 / questions:.1f}us per question)")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare_results(results, baseline_file, tolerance):
+    """
+    Print each result next to the matching one (same stage and size) of a
+    saved run; returns the number that are slower than it by more than
+    tolerance (a fraction, e.g. 0.1 for 10%).
+    """
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(entry["benchmark"], entry["questions"]): entry for entry in baseline["results"]}
+
+    print(f"\nCompared with {baseline_file} ({baseline.get('revision') or 'unknown revision'}, "
+          f"{baseline.get('created', '')}):")
+    regressions = 0
+    for entry in results:
+        before = previous.get((entry["benchmark"], entry["questions"]))
+        if before is None or not before["best"]:
+            continue
+        ratio = entry["best"] / before["best"]
+        status = ""
+        if ratio > 1 + tolerance:
+            status = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 - tolerance:
+            status = "  faster"
+        print(f"  {entry['benchmark']:<8} {entry['questions']:>6} questions  "
+              f"{before['best'] * 1000:>10.1f}ms -> {entry['best'] * 1000:>10.1f}ms  x{ratio:.2f}{status}")
+    return regressions
+
+
+def run_suite(sizes, repeat, seed, equations, images, pattern2, save=None, compare=None, tolerance=0.1):
+    parameters = {"seed": seed, "equations": equations, "images": images, "pattern2": pattern2, "repeat": repeat}
+    print(f"Synthetic documents: {equations:.0%} with equations, {images:.0%} with an image, "
+          f"{pattern2:.0%} Pattern 2; best and mean of {repeat} runs")
+    results = []
+    for questions in sizes:
+        print(f"{questions} questions")
+        results.extend(bench_stages(questions, repeat, seed, equations, images, pattern2))
+
+    if save:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {save}")
+
+    if compare:
+        return 1 if compare_results(results, compare, tolerance) else 0
+    return 0
+
+
+def generate(output, questions, seed, equations, images, pattern2):
+    paragraphs = synthetic_paragraphs(questions, seed, equations, images, pattern2)
+    if output.lower().endswith(".docx"):
+        write_synthetic_docx(output, paragraphs, synthetic_images(seed) if images > 0 else {})
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(ast_to_latex(synthetic_ast(paragraphs)))
+    print(f"Wrote {questions} synthetic MCQs to {output}")
+
+
+def bench_engines(docx_files, repeat):
+    print(f"{'document':<40} {'engine':<8} {'read best':>10} {'read mean':>10} {'total best':>11} {'MCQs':>5}")
+    for docx_file in docx_files:
+        name = os.path.basename(docx_file)
+        name = name if len(name) <= 40 else name[:37] + "..."
+        results = {}
+        for engine in ENGINES:
+            read_best, read_mean, _ = time_call(lambda: load_docx_ast(docx_file, engine), repeat)
+            total_best, _, result = time_call(lambda: process_docx_file(docx_file, "", "", engine), repeat)
+            results[engine] = result
+            mcqs = len(result.get("mcqs", []))
+            print(f"{name:<40} {engine:<8} {read_best * 1000:>8.1f}ms {read_mean * 1000:>8.1f}ms "
+                  f"{total_best * 1000:>9.1f}ms {mcqs:>5}")
+
+        pandoc_mcqs = results["pandoc"].get("mcqs", [])
+        native_mcqs = results["native"].get("mcqs", [])
+        differing = sum(1 for a, b in zip(pandoc_mcqs, native_mcqs) if a != b)
+        differing += abs(len(pandoc_mcqs) - len(native_mcqs))
+        print(f"{'':<40} {differing} of {len(pandoc_mcqs)} MCQs differ between engines")
+
+
+def import_times(module, cwd):
+    """
+    Import module in a fresh interpreter with -X importtime; returns
+    {module name: (self, cumulative)} in microseconds.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def bench_startup(repeat, top):
+    for module, cwd in STARTUP_MODULES:
+        runs = [import_times(module, cwd) for _ in range(repeat)]
+        cumulative = [times[module][1] for times in runs]
+        best = runs[cumulative.index(min(cumulative))]
+        print(f"import {module}: best {min(cumulative) / 1000:.1f}ms, "
+              f"mean {statistics.mean(cumulative) / 1000:.1f}ms of {repeat} runs")
+
+        loaded = [name for name in HEAVY_MODULES if name in best]
+        print(f"  heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+        print("  slowest imports (self time):")
+        for name, (own, total) in sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+            print(f"    {own / 1000:>7.1f}ms  {name} ({total / 1000:.1f}ms with its imports)")
+
+
+def fraction(value):
+    value = float(value)
+    if not 0.0 <= value <= 1.0:
+        raise argparse.ArgumentTypeError(f"{value} is not between 0 and 1")
+    return value
+
+
+def sizes(value):
+    try:
+        counts = [int(size) for size in value.split(",") if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a comma-separated list of question counts")
+    if not counts or min(counts) < 1:
+        raise argparse.ArgumentTypeError("question counts must be positive")
+    return counts
+
+
+def add_synthetic_options(parser):
+    parser.add_argument("--equations", type=fraction, default=1.0,
+                        help="Share of questions with equations (default: 1.0)")
+    parser.add_argument("--images", type=fraction, default=0.2,
+                        help="Share of questions with an image (default: 0.2)")
+    parser.add_argument("--pattern2", type=fraction, default=0.25,
+                        help="Share of Pattern 2 questions (default: 0.25)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the DOCX -> MCQ conversion pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    engines_parser = subparsers.add_parser("engines", help="Compare the pandoc and native DOCX readers")
+    engines_parser.add_argument("docx_files", nargs="*", default=[SAMPLE_DOCX],
+                                help="Documents to read (default: the sample chapter)")
+    engines_parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+
+    parse_parser = subparsers.add_parser("parse", help="Time the MCQ parser on a synthetic document")
+    parse_parser.add_argument("--questions", type=int, default=1000,
+                              help="Number of synthetic MCQs (default: 1000)")
+    parse_parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+
+    suite_parser = subparsers.add_parser("suite", help="Time each conversion stage on synthetic documents")
+    suite_parser.add_argument("--sizes", type=sizes, default=DEFAULT_SIZES,
+                              help="Comma-separated question counts (default: 100,1000,10000; up to 50000)")
+    suite_parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (default: 3)")
+    add_synthetic_options(suite_parser)
+    suite_parser.add_argument("--save", metavar="FILE", help="Save the results as JSON")
+    suite_parser.add_argument("--compare", metavar="FILE", help="Compare with results saved by --save")
+    suite_parser.add_argument("--tolerance", type=float, default=0.1,
+                              help="Slowdown --compare tolerates, as a fraction (default: 0.1)")
+
+    generate_parser = subparsers.add_parser("generate", help="Write a synthetic .tex or .docx document")
+    generate_parser.add_argument("output", help="Output file; a .docx name writes a Word document, else LaTeX")
+    generate_parser.add_argument("--questions", type=int, default=1000,
+                                 help="Number of synthetic MCQs (default: 1000)")
+    add_synthetic_options(generate_parser)
+
+    startup_parser = subparsers.add_parser("startup", help="Time importing the converters with -X importtime")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Runs per module (default: 5)")
+    startup_parser.add_argument("--top", type=int, default=10,
+                                help="Number of slowest imports to list (default: 10)")
+
+    args = parser.parse_args(argv)
+    # Per-question warnings would only slow the runs down
+    configure_logging("ERROR")
+
+    if args.command == "engines":
+        bench_engines(args.docx_files, args.repeat)
+    elif args.command == "parse":
+        bench_parse(args.questions, args.repeat)
+    elif args.command == "suite":
+        return run_suite(args.sizes, args.repeat, args.seed, args.equations, args.images, args.pattern2,
+                         args.save, args.compare, args.tolerance)
+    elif args.command == "generate":
+        generate(args.output, args.questions, args.seed, args.equations, args.images, args.pattern2)
+    elif args.command == "startup":
+        bench_startup(args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Per-document manifest of parsed question blocks, for incremental re-conversion.
+
+Re-converting a chapter after editing a few of its questions used to parse
+and clean up every one of its blocks again. A manifest maps the SHA-256 of
+each question block (its serial and LaTeX text) to the record it produced,
+with the image fields still holding the names of the images in the
+document; a re-run looks every block up and only parses the blocks that
+changed. Images need no entries of their own: resolve_images encodes them
+through the content-addressed cache in image_cache.py, so unchanged images
+are not encoded again either.
+
+A manifest is a JSON file
+
+    {"version": 1, "settings": {...}, "blocks": {key: fields, or null for a block without a question}}
+
+and is only reused when its settings (the converter options and record
+version it was written with) match; saving it keeps the blocks of the
+latest run only.
+"""
+import hashlib
+import json
+
+from image_cache import write_atomically
+from mcq_log import get_logger
+
+log = get_logger("manifest")
+
+MANIFEST_VERSION = 1
+
+
+class BlockManifest:
+    """The records of a document's question blocks by content hash, from the previous run and this one."""
+
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.previous = self.load()
+        self.blocks = {}
+        # Records the converter took from the previous run
+        self.reused = 0
+
+    @staticmethod
+    def key(serial_number, question_text):
+        return hashlib.sha256(f"{serial_number}\0{question_text}".encode("utf-8")).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != self.settings:
+            log.info("Manifest %s was written with other settings; parsing every question", self.path)
+            return {}
+        return manifest.get("blocks", {})
+
+    def __contains__(self, key):
+        return key in self.previous
+
+    def reuse(self, key):
+        """The fields (or None) the previous run stored for key, kept for the next run."""
+        fields = self.blocks[key] = self.previous[key]
+        return fields
+
+    def store(self, key, fields):
+        self.blocks[key] = fields
+
+    def save(self):
+        manifest = {"version": MANIFEST_VERSION, "settings": self.settings, "blocks": self.blocks}
+        try:
+            write_atomically(self.path, json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            log.warning("Could not write manifest %s: %s", self.path, e)
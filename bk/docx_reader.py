@@ -0,0 +1,600 @@
+"""
+Native DOCX reader that builds a pandoc-compatible JSON AST without pandoc.
+
+The reader streams word/document.xml straight out of the docx zip and
+understands the parts of WordprocessingML that question banks use:
+paragraphs and runs (bold, italic, underline, strike, super/subscript),
+line breaks and tabs, tables, images (through the document relationships)
+and OMML equations, which are converted to the same linear LaTeX pandoc
+produces (``\\frac{a}{b}``, ``x_{1}``, ``a + b = c``).
+
+The returned dict has the same shape as ``pandoc -t json`` output for those
+elements, so ast_to_latex and ast_tables_to_html in pandoc_ast.py render it
+unchanged. Lists, footnotes, comments and text boxes are not interpreted;
+use the pandoc engine (the default) for documents that rely on them.
+"""
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+from pandoc_ast import run_pandoc_ast
+from mcq_log import get_logger
+
+log = get_logger("docx_reader")
+
+
+ENGINES = ("pandoc", "native")
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+M_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+V_NS = "urn:schemas-microsoft-com:vml"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+def m(tag):
+    return f"{{{M_NS}}}{tag}"
+
+
+NO_ATTR = ["", [], []]
+
+# Wrappers whose children are read as if they were inline in the paragraph
+INLINE_CONTAINERS = {w("hyperlink"), w("smartTag"), w("ins"), w("customXml"), w("fldSimple"), w("dir"), w("bdo")}
+
+CELL_ALIGNMENTS = {"center": "AlignCenter", "right": "AlignRight", "end": "AlignRight",
+                   "left": "AlignLeft", "start": "AlignLeft", "both": "AlignDefault"}
+
+# Run formatting, outermost first, and the pandoc inline each one maps to
+RUN_FORMATS = [("b", "Strong"), ("i", "Emph"), ("u", "Underline"), ("strike", "Strikeout"),
+               ("sup", "Superscript"), ("sub", "Subscript")]
+
+# ---------------------------------------------------------------------
+# OMML -> LaTeX
+# ---------------------------------------------------------------------
+
+# Operators are written with a space on each side, like pandoc's texmath
+MATH_OPERATORS = {
+    "+": "+", "-": "-", "\u2212": "-", "=": "=", "<": "<", ">": ">",
+    "\u2260": "\\neq", "\u2264": "\\leq", "\u2265": "\\geq", "\u00b1": "\\pm", "\u2213": "\\mp",
+    "\u00d7": "\\times", "\u00f7": "\\div", "\u22c5": "\\cdot", "\u00b7": "\\cdot",
+    "\u2248": "\\approx", "\u2261": "\\equiv", "\u221d": "\\propto", "\u223c": "\\sim", "\u2245": "\\cong",
+    "\u2192": "\\rightarrow", "\u2190": "\\leftarrow", "\u21d2": "\\Rightarrow", "\u21d4": "\\Leftrightarrow",
+    "\u2208": "\\in", "\u2209": "\\notin", "\u2282": "\\subset", "\u2286": "\\subseteq",
+    "\u222a": "\\cup", "\u2229": "\\cap", "\u2234": "\\therefore", "\u2235": "\\because",
+}
+
+MATH_SYMBOLS = {
+    "\u03b1": "\\alpha", "\u03b2": "\\beta", "\u03b3": "\\gamma", "\u03b4": "\\delta", "\u03b5": "\\varepsilon",
+    "\u03b8": "\\theta", "\u03bb": "\\lambda", "\u03bc": "\\mu", "\u03c0": "\\pi", "\u03c1": "\\rho",
+    "\u03c3": "\\sigma", "\u03c4": "\\tau", "\u03c6": "\\varphi", "\u03c9": "\\omega", "\u0394": "\\Delta",
+    "\u03a3": "\\Sigma", "\u03a9": "\\Omega", "\u03a0": "\\Pi", "\u0398": "\\Theta",
+    "\u221e": "\\infty", "\u00b0": "{^\\circ}", "\u2220": "\\angle", "\u22a5": "\\perp", "\u2225": "\\parallel",
+    "\u25b3": "\\bigtriangleup", "\u2032": "'", "\u2026": "\\ldots", "\u2205": "\\varnothing",
+    "\u2200": "\\forall", "\u2203": "\\exists", "\u2202": "\\partial", "\u2207": "\\nabla",
+    "{": "\\{", "}": "\\}", "%": "\\%", "#": "\\#", "&": "\\&", "$": "\\$",
+}
+
+NARY_COMMANDS = {"\u2211": "\\sum", "\u220f": "\\prod", "\u222b": "\\int", "\u222c": "\\iint",
+                 "\u222d": "\\iiint", "\u222e": "\\oint", "\u22c3": "\\bigcup", "\u22c2": "\\bigcap"}
+
+ACCENT_COMMANDS = {"\u0302": "\\hat", "\u0304": "\\bar", "\u0305": "\\overline", "\u20d7": "\\vec",
+                   "\u0307": "\\dot", "\u0308": "\\ddot", "\u0303": "\\tilde", "\u030c": "\\check"}
+
+DELIMITERS = {"": ".", "{": "\\{", "}": "\\}", "\u2016": "\\|", "\u230a": "\\lfloor", "\u230b": "\\rfloor",
+              "\u2308": "\\lceil", "\u2309": "\\rceil", "\u27e8": "\\langle", "\u27e9": "\\rangle",
+              "\u2329": "\\langle", "\u232a": "\\rangle"}
+
+MATH_FUNCTIONS = {"sin", "cos", "tan", "cot", "sec", "csc", "log", "ln", "lg", "exp", "lim", "max", "min",
+                  "sinh", "cosh", "tanh", "arcsin", "arccos", "arctan", "det", "gcd", "deg"}
+
+# Base of a sub/superscript that needs no braces: one symbol, a number or a command
+MATH_ATOM = re.compile(r"[^\s{}\\]|\d+(?:\.\d+)?|\\[A-Za-z]+")
+
+
+def math_val(node, tag, default=None):
+    """Return the m:val of child property tag of node (e.g. m:begChr in m:dPr)."""
+    if node is None:
+        return default
+    child = node.find(m(tag))
+    if child is None:
+        return default
+    return child.get(m("val"), default)
+
+
+def math_flag(props, tag):
+    """Return True when an on/off OMML property is set (present without m:val="0"/"off")."""
+    if props is None or props.find(m(tag)) is None:
+        return False
+    return math_val(props, tag, "on") not in ("0", "off", "false")
+
+
+def strip_math(tex):
+    """Trim the spaces around converted math, keeping an explicit space ("\\ ") at the end."""
+    tex = tex.lstrip(" ")
+    while tex.endswith(" ") and not tex.endswith("\\ "):
+        tex = tex[:-1]
+    return tex
+
+
+def math_text(text):
+    """Convert the text of an m:r run to linear LaTeX."""
+    out = []
+    for ch in text:
+        if ch in MATH_OPERATORS:
+            out.append(f" {MATH_OPERATORS[ch]} ")
+        elif ch == " ":
+            out.append("\\ ")
+        elif ch in MATH_SYMBOLS:
+            command = MATH_SYMBOLS[ch]
+            out.append(command)
+        else:
+            out.append(ch)
+    return join_math(out)
+
+
+def join_math(pieces):
+    """
+    Concatenate LaTeX pieces, separating a control word from a following
+    letter and keeping a single space between neighbouring operators.
+    """
+    out = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        if re.search(r"\\[A-Za-z]+$", out) and piece[0].isalpha():
+            out += " "
+        elif out.endswith(" ") and not out.endswith("\\ ") and piece[0] == " ":
+            piece = piece[1:]
+        out += piece
+    return out
+
+
+def math_group(node):
+    """Convert an OMML argument element (m:e, m:num, m:sub, ...) and trim the outer spaces."""
+    if node is None:
+        return ""
+    return strip_math(omml_children(node))
+
+
+def math_base(node):
+    """Convert the base of a script, bracing it unless it is a single atom."""
+    base = math_group(node)
+    if MATH_ATOM.fullmatch(base) or base.startswith("\\left") or base.startswith("\\frac"):
+        return base
+    return f"{{{base}}}"
+
+
+def omml_children(node):
+    return join_math(omml_to_latex(child) for child in node)
+
+
+def omml_to_latex(node):
+    """Convert one OMML element to linear LaTeX, recursing into its arguments."""
+    tag = node.tag
+
+    if tag == m("r"):
+        props = node.find(m("rPr"))
+        text = "".join(t.text or "" for t in node.iter(m("t")))
+        if math_flag(props, "nor"):
+            return f"\\text{{{text}}}"
+        converted = math_text(text)
+        style = math_val(props, "sty")
+        if style in ("b", "bi"):
+            return f"\\mathbf{{{strip_math(converted)}}}"
+        return converted
+    if tag == m("f"):
+        num, den = math_group(node.find(m("num"))), math_group(node.find(m("den")))
+        fraction_type = math_val(node.find(m("fPr")), "type", "bar")
+        if fraction_type == "lin":
+            return f"{num}/{den}"
+        if fraction_type == "noBar":
+            return f"\\genfrac{{}}{{}}{{0pt}}{{}}{{{num}}}{{{den}}}"
+        return f"\\frac{{{num}}}{{{den}}}"
+    if tag == m("sSub"):
+        return f"{math_base(node.find(m('e')))}_{{{math_group(node.find(m('sub')))}}}"
+    if tag == m("sSup"):
+        return f"{math_base(node.find(m('e')))}^{{{math_group(node.find(m('sup')))}}}"
+    if tag == m("sSubSup"):
+        return (f"{math_base(node.find(m('e')))}_{{{math_group(node.find(m('sub')))}}}"
+                f"^{{{math_group(node.find(m('sup')))}}}")
+    if tag == m("sPre"):
+        return (f"{{}}_{{{math_group(node.find(m('sub')))}}}^{{{math_group(node.find(m('sup')))}}}"
+                f"{math_base(node.find(m('e')))}")
+    if tag == m("rad"):
+        props = node.find(m("radPr"))
+        degree = math_group(node.find(m("deg")))
+        body = math_group(node.find(m("e")))
+        if degree and not math_flag(props, "degHide"):
+            return f"\\sqrt[{degree}]{{{body}}}"
+        return f"\\sqrt{{{body}}}"
+    if tag == m("d"):
+        props = node.find(m("dPr"))
+        begin = math_val(props, "begChr", "(")
+        end = math_val(props, "endChr", ")")
+        separator = math_val(props, "sepChr", "|")
+        parts = [math_group(e) for e in node.findall(m("e"))]
+        left = DELIMITERS.get(begin, begin)
+        right = DELIMITERS.get(end, end)
+        return f"\\left{left} {f' {separator} '.join(parts)} \\right{right}"
+    if tag == m("m"):
+        rows = []
+        for row in node.findall(m("mr")):
+            rows.append(" & ".join(math_group(e) for e in row.findall(m("e"))))
+        return "\\begin{matrix}\n" + " \\\\\n".join(rows) + "\n\\end{matrix}"
+    if tag == m("eqArr"):
+        rows = [math_group(e) for e in node.findall(m("e"))]
+        return "\\begin{matrix}\n" + " \\\\\n".join(rows) + "\n\\end{matrix}"
+    if tag == m("nary"):
+        props = node.find(m("naryPr"))
+        symbol = math_val(props, "chr", "\u222b")
+        command = NARY_COMMANDS.get(symbol, symbol)
+        lower, upper = math_group(node.find(m("sub"))), math_group(node.find(m("sup")))
+        if lower and not math_flag(props, "subHide"):
+            command += f"_{{{lower}}}"
+        if upper and not math_flag(props, "supHide"):
+            command += f"^{{{upper}}}"
+        return join_math([command, math_group(node.find(m("e")))])
+    if tag == m("func"):
+        name = math_group(node.find(m("fName")))
+        if name in MATH_FUNCTIONS:
+            name = "\\" + name
+        return join_math([name, math_group(node.find(m("e")))])
+    if tag in (m("limLow"), m("limUpp")):
+        base = math_group(node.find(m("e")))
+        limit = math_group(node.find(m("lim")))
+        if base in MATH_FUNCTIONS:
+            base = "\\" + base
+        if tag == m("limLow"):
+            if base.lstrip("\\") in MATH_FUNCTIONS:
+                return f"{base}_{{{limit}}}"
+            return f"\\underset{{{limit}}}{{{base}}}"
+        return f"\\overset{{{limit}}}{{{base}}}"
+    if tag == m("acc"):
+        accent = math_val(node.find(m("accPr")), "chr", "\u0302")
+        command = ACCENT_COMMANDS.get(accent, "\\hat")
+        return f"{command}{{{math_group(node.find(m('e')))}}}"
+    if tag == m("bar"):
+        position = math_val(node.find(m("barPr")), "pos", "bot")
+        command = "\\overline" if position == "top" else "\\underline"
+        return f"{command}{{{math_group(node.find(m('e')))}}}"
+    if tag == m("groupChr"):
+        props = node.find(m("groupChrPr"))
+        symbol = math_val(props, "chr", "\u23df")
+        body = math_group(node.find(m("e")))
+        if symbol == "\u23de":
+            return f"\\overbrace{{{body}}}"
+        if symbol == "\u23df":
+            return f"\\underbrace{{{body}}}"
+        return body
+    if tag == m("borderBox"):
+        return f"\\boxed{{{math_group(node.find(m('e')))}}}"
+    if tag in (m("box"), m("phant"), m("e"), m("oMath")):
+        return omml_children(node)
+    if tag.endswith("Pr") or tag == m("ctrlPr"):
+        return ""
+    return omml_children(node)
+
+
+def omml_to_tex(omath):
+    """Convert an m:oMath element to the TeX string of a pandoc Math inline."""
+    return strip_math(omml_to_latex(omath))
+
+
+# ---------------------------------------------------------------------
+# WordprocessingML -> pandoc AST
+# ---------------------------------------------------------------------
+
+def is_on(props, tag):
+    """Return True when a run property toggle (w:b, w:i, ...) is switched on."""
+    if props is None:
+        return False
+    node = props.find(w(tag))
+    if node is None:
+        return False
+    return node.get(w("val"), "true") not in ("0", "false", "off", "none")
+
+
+def run_format(props):
+    """
+    Return the formatting of a run as a tuple of RUN_FORMATS keys. Complex
+    script runs (w:cs, e.g. Bengali text) are bold/italic through w:bCs and
+    w:iCs rather than w:b and w:i, the same rule Word and pandoc apply.
+    """
+    if props is None:
+        return ()
+    complex_script = is_on(props, "cs") or is_on(props, "rtl")
+    vertical = props.find(w("vertAlign"))
+    vertical = vertical.get(w("val")) if vertical is not None else None
+    formats = []
+    for key, _kind in RUN_FORMATS:
+        if key == "sup":
+            on = vertical == "superscript"
+        elif key == "sub":
+            on = vertical == "subscript"
+        elif key in ("b", "i") and complex_script:
+            on = is_on(props, key + "Cs")
+        else:
+            on = is_on(props, key)
+        if on:
+            formats.append(key)
+    return tuple(formats)
+
+
+def text_inlines(text):
+    """Split text into pandoc Str and Space inlines."""
+    inlines = []
+    for i, word in enumerate(re.split(r"\s+", text)):
+        if i:
+            inlines.append({"t": "Space"})
+        if word:
+            inlines.append({"t": "Str", "c": word})
+    return inlines
+
+
+def trim_spaces(inlines):
+    """Collapse repeated spaces and drop leading/trailing ones, like pandoc does."""
+    out = []
+    for node in inlines:
+        if node["t"] in ("Space", "SoftBreak") and (not out or out[-1]["t"] in ("Space", "SoftBreak", "LineBreak")):
+            continue
+        if node["t"] == "LineBreak" and out and out[-1]["t"] == "Space":
+            out.pop()
+        out.append(node)
+    while out and out[-1]["t"] in ("Space", "SoftBreak"):
+        out.pop()
+    return out
+
+
+def merge_strs(inlines):
+    """Join adjacent Str inlines so escaping sees whole words."""
+    out = []
+    for node in inlines:
+        if node["t"] == "Str" and out and out[-1]["t"] == "Str":
+            out[-1] = {"t": "Str", "c": out[-1]["c"] + node["c"]}
+        else:
+            out.append(node)
+    return out
+
+
+def wrap_formats(items):
+    """
+    Turn a list of (formats, inline) items into nested pandoc inlines,
+    grouping neighbouring runs that share the outermost format. Spaces at
+    the edges of a group are moved outside it, as pandoc does.
+    """
+    out = []
+    i = 0
+    while i < len(items):
+        formats, node = items[i]
+        if not formats:
+            out.append(node)
+            i += 1
+            continue
+        outer = formats[0]
+        j = i
+        group = []
+        while j < len(items) and items[j][0] and items[j][0][0] == outer:
+            group.append((items[j][0][1:], items[j][1]))
+            j += 1
+        inner = merge_strs(wrap_formats(group))
+        leading, trailing = [], []
+        while inner and inner[0]["t"] == "Space":
+            leading.append(inner.pop(0))
+        while inner and inner[-1]["t"] == "Space":
+            trailing.append(inner.pop())
+        out.extend(leading)
+        if inner:
+            out.append({"t": dict(RUN_FORMATS)[outer], "c": inner})
+        out.extend(trailing)
+        i = j
+    return merge_strs(out)
+
+
+class DocxReader:
+    """Read one docx file into a pandoc-compatible JSON AST."""
+
+    def __init__(self, docx_file):
+        self.docx_file = docx_file
+        self.relationships = {}
+
+    def read(self):
+        with zipfile.ZipFile(self.docx_file) as docx:
+            names = set(docx.namelist())
+            if "word/_rels/document.xml.rels" in names:
+                with docx.open("word/_rels/document.xml.rels") as f:
+                    self.relationships = self.read_relationships(f)
+            with docx.open("word/document.xml") as f:
+                body = self.read_body(f)
+        return {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": self.blocks(body)}
+
+    def read_relationships(self, f):
+        relationships = {}
+        for rel in ET.parse(f).getroot().iter(f"{{{REL_NS}}}Relationship"):
+            target = rel.get("Target", "")
+            if rel.get("TargetMode") != "External":
+                target = posixpath.normpath(target.lstrip("/")) if target.startswith("/") \
+                    else posixpath.normpath(target)
+                target = target[len("word/"):] if target.startswith("word/") else target
+            relationships[rel.get("Id")] = target
+        return relationships
+
+    def read_body(self, f):
+        """Stream document.xml and return the w:body element once it has been parsed."""
+        for event, node in ET.iterparse(f, events=("end",)):
+            if node.tag == w("body"):
+                return node
+        raise ValueError("word/document.xml has no w:body")
+
+    # Blocks
+
+    def blocks(self, parent):
+        out = []
+        for node in parent:
+            tag = node.tag
+            if tag == w("p"):
+                out.extend(self.paragraph(node))
+            elif tag == w("tbl"):
+                out.append(self.table(node))
+            elif tag in (w("sdt"), w("customXml")):
+                content = node.find(w("sdtContent")) if tag == w("sdt") else node
+                if content is not None:
+                    out.extend(self.blocks(content))
+            elif tag == m("oMathPara"):
+                out.append({"t": "Para", "c": self.display_math(node)})
+        return out
+
+    def paragraph(self, node):
+        items = self.paragraph_items(node)
+        inlines = trim_spaces(wrap_formats(items))
+        if not inlines:
+            return []
+        style = node.find(f"{w('pPr')}/{w('pStyle')}")
+        style = style.get(w("val"), "") if style is not None else ""
+        heading = re.fullmatch(r"(?i)heading\s*(\d)", style)
+        if heading:
+            return [{"t": "Header", "c": [int(heading.group(1)), NO_ATTR, inlines]}]
+        return [{"t": "Para", "c": inlines}]
+
+    def display_math(self, node):
+        return [{"t": "Math", "c": [{"t": "DisplayMath"}, omml_to_tex(omath)]}
+                for omath in node.iter(m("oMath"))]
+
+    def paragraph_items(self, parent):
+        """Return the (formats, inline) items of a paragraph or inline container."""
+        items = []
+        for node in parent:
+            tag = node.tag
+            if tag == w("r"):
+                items.extend(self.run_items(node))
+            elif tag == m("oMath"):
+                items.append(((), {"t": "Math", "c": [{"t": "InlineMath"}, omml_to_tex(node)]}))
+            elif tag == m("oMathPara"):
+                items.extend(((), math) for math in self.display_math(node))
+            elif tag in INLINE_CONTAINERS:
+                items.extend(self.paragraph_items(node))
+            elif tag == w("sdt"):
+                content = node.find(w("sdtContent"))
+                if content is not None:
+                    items.extend(self.paragraph_items(content))
+        return items
+
+    def run_items(self, run):
+        formats = run_format(run.find(w("rPr")))
+        items = []
+        for node in run:
+            tag = node.tag
+            if tag == w("t"):
+                items.extend((formats, inline) for inline in text_inlines(node.text or ""))
+            elif tag == w("tab"):
+                items.append((formats, {"t": "Space"}))
+            elif tag in (w("br"), w("cr")):
+                if node.get(w("type"), "textWrapping") == "textWrapping":
+                    items.append(((), {"t": "LineBreak"}))
+            elif tag == w("noBreakHyphen"):
+                items.append((formats, {"t": "Str", "c": "-"}))
+            elif tag == w("sym"):
+                char = node.get(w("char"), "")
+                if char:
+                    items.append((formats, {"t": "Str", "c": chr(int(char, 16))}))
+            elif tag in (w("drawing"), w("pict"), w("object"), f"{{{MC_NS}}}AlternateContent"):
+                image = self.image(node)
+                if image:
+                    items.append(((), image))
+        return items
+
+    def image(self, node):
+        """Return a pandoc Image inline for the first picture inside node, if any."""
+        if node.tag == f"{{{MC_NS}}}AlternateContent":
+            choice = node.find(f"{{{MC_NS}}}Choice")
+            node = choice if choice is not None else node
+        blip = node.find(f".//{{{A_NS}}}blip")
+        rel_id = blip.get(f"{{{R_NS}}}embed") if blip is not None else None
+        if rel_id is None:
+            imagedata = node.find(f".//{{{V_NS}}}imagedata")
+            rel_id = imagedata.get(f"{{{R_NS}}}id") if imagedata is not None else None
+        if rel_id is None or rel_id not in self.relationships:
+            return None
+        doc_pr = node.find(f".//{{{WP_NS}}}docPr")
+        alt = doc_pr.get("descr", "") if doc_pr is not None else ""
+        return {"t": "Image", "c": [NO_ATTR, text_inlines(alt), [self.relationships[rel_id], ""]]}
+
+    # Tables
+
+    def table(self, node):
+        grid = node.findall(f"{w('tblGrid')}/{w('gridCol')}")
+        look = node.find(f"{w('tblPr')}/{w('tblLook')}")
+        header_look = False
+        if look is not None:
+            first_row = look.get(w("firstRow"))
+            if first_row is not None:
+                header_look = first_row in ("1", "true", "on")
+            else:
+                header_look = bool(int(look.get(w("val"), "0"), 16) & 0x0020)
+
+        rows = []
+        for tr in node.findall(w("tr")):
+            cells = []
+            for tc in tr.findall(w("tc")):
+                props = tc.find(w("tcPr"))
+                merge = props.find(w("vMerge")) if props is not None else None
+                if merge is not None and merge.get(w("val"), "continue") == "continue":
+                    continue
+                span = props.find(w("gridSpan")) if props is not None else None
+                colspan = int(span.get(w("val"), "1")) if span is not None else 1
+                blocks = self.blocks(tc)
+                if len(blocks) == 1 and blocks[0]["t"] == "Para":
+                    blocks = [{"t": "Plain", "c": blocks[0]["c"]}]
+                cells.append([NO_ATTR, {"t": self.cell_alignment(tc)}, 1, colspan, blocks])
+            is_header = tr.find(f"{w('trPr')}/{w('tblHeader')}") is not None
+            rows.append((is_header, [NO_ATTR, cells]))
+
+        header_count = 0
+        while header_count < len(rows) and rows[header_count][0]:
+            header_count += 1
+        if header_count == 0 and header_look and len(rows) > 1:
+            header_count = 1
+
+        columns = len(grid) or max((len(row[1][1]) for row in rows), default=0)
+        alignments = [cell[1] for cell in rows[0][1][1]] if rows else []
+        alignments += [{"t": "AlignDefault"}] * (columns - len(alignments))
+        colspecs = [[align, {"t": "ColWidthDefault"}] for align in alignments[:columns]]
+
+        head = [NO_ATTR, [row for _is_header, row in rows[:header_count]]]
+        bodies = [[NO_ATTR, 0, [], [row for _is_header, row in rows[header_count:]]]]
+        return {"t": "Table", "c": [NO_ATTR, [None, []], colspecs, head, bodies, [NO_ATTR, []]]}
+
+    def cell_alignment(self, tc):
+        jc = tc.find(f"{w('p')}/{w('pPr')}/{w('jc')}")
+        if jc is None:
+            return "AlignDefault"
+        return CELL_ALIGNMENTS.get(jc.get(w("val"), ""), "AlignDefault")
+
+
+def read_docx_ast(docx_file):
+    """Read docx_file without pandoc and return a pandoc-compatible JSON AST."""
+    return DocxReader(docx_file).read()
+
+
+def load_docx_ast(docx_file, engine="pandoc"):
+    """
+    Return the JSON AST of docx_file using the requested engine. The native
+    engine falls back to pandoc when it cannot read the document.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    if engine == "native":
+        try:
+            ast = read_docx_ast(docx_file)
+            log.info("Read document with the native reader.")
+            return ast
+        except (KeyError, ValueError, zipfile.BadZipFile, ET.ParseError) as e:
+            log.warning("Native reader failed (%s), falling back to pandoc", e)
+    return run_pandoc_ast(docx_file)
@@ -1,65 +1,28 @@
 #!/usr/bin/env python3
 import os
-import re
 import tempfile
 import json
-import base64
-import zipfile
-from PIL import Image
-import io
 import subprocess
 import sys
+import argparse
+import logging
+from pandoc_ast import ast_to_latex
+from docx_reader import ENGINES, load_docx_ast
+import mcq_patterns as patterns
+from mcq_lexer import choose_serial_pattern, iter_mcq_blocks, read_block
+from image_cache import CACHE_DIR_ENV, DocxMedia, decode_data_url, resolve_images
+from pg_sink import DATABASE_URL_ENV, copy_to_database
+from mcq_log import LOG_LEVELS, configure_logging, get_logger
+from mcq_metrics import PROFILE_DIR_ENV, collect_metrics, current_metrics
+from pandoc_cache import PANDOC_CACHE_DIR_ENV
 
-def extract_images_from_docx(docx_file, output_dir):
-    """Extract images from the DOCX file (which is a ZIP archive)"""
-    try:
-        with zipfile.ZipFile(docx_file, 'r') as zip_ref:
-            # Find all image files in the archive
-            for file_info in zip_ref.infolist():
-                if file_info.filename.startswith('word/media/'):
-                    # Extract the image file
-                    image_data = zip_ref.read(file_info.filename)
-                    # Get just the filename part
-                    image_filename = os.path.basename(file_info.filename)
-                    # Save to the output directory
-                    with open(os.path.join(output_dir, image_filename), 'wb') as img_file:
-                        img_file.write(image_data)
-    except Exception as e:
-        print(f"Error extracting images: {e}", file=sys.stderr)
-        return False
-    return True
+log = get_logger("docx_to_mcq")
 
-def image_to_base64(image_path):
-    """Convert an image file to base64 string"""
-    try:
-        if not os.path.exists(image_path):
-            return ""
-        
-        # Open the image and resize if needed
-        with Image.open(image_path) as img:
-            # Optionally resize large images
-            max_size = (800, 600)  # Maximum dimensions
-            if img.width > max_size[0] or img.height > max_size[1]:
-                img.thumbnail(max_size, Image.LANCZOS)
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            # Determine the format based on the file extension
-            format_ext = os.path.splitext(image_path)[1].lower().lstrip('.')
-            if format_ext not in ['jpg', 'jpeg', 'png', 'gif']:
-                format_ext = 'png'  # Default to PNG for unknown formats
-            
-            # Save to buffer
-            img.save(buffer, format=format_ext.upper())
-            img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            # Create data URL
-            return f"data:image/{format_ext};base64,{img_str}"
-    except Exception as e:
-        print(f"Error converting image to base64: {e}", file=sys.stderr)
-        return ""
+# MCQ fields holding an image: a media member while parsing, a base64 data URL once resolved
+IMAGE_FIELDS = ["Ques_img", "OptionA_IMG", "OptionB_IMG", "OptionC_IMG", "OptionD_IMG",
+                "Explaination_IMG", "Hint_img"]
 
-def parse_latex_for_mcqs(latex_file, images_dir):
+def iter_latex_mcqs(latex_file, media, image_workers=1):
     """
     Reads the LaTeX line by line, searching for the structure of both pattern types:
 
@@ -90,322 +53,124 @@ def parse_latex_for_mcqs(latex_file, images_dir):
         [Hint: {Hint}]
         [Explaination: {Explanation}]
 
-    Returns a list of rows for the final spreadsheet.
+    Yields one MCQ dict per question as soon as its block has been read and
+    its images encoded, so only a few questions are held in memory at a time.
+    The images are read from media (the DocxMedia of the document) and encoded
+    on up to image_workers processes (see resolve_images in image_cache.py) while the
+    following questions are parsed.
     """
+    metrics = current_metrics()
+    mcqs = metrics.iterate("parse", iter_parsed_mcqs(latex_file, media))
+    yield from metrics.iterate("images", resolve_images(mcqs, IMAGE_FIELDS, media, image_workers))
 
-    with open(latex_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    # Print first few lines for debugging
-    print("First few lines of the latex file:")
-    for i, line in enumerate(lines[:10]):
-        print(f"Line {i+1}: {line.strip()}")
-
-    # Regex for "Serial. question" - Bengali numerals
-    re_question_bn = re.compile(r'^([০-৯]+)[.,)।]\s*(.*)', re.UNICODE)
-    # Regex for "Serial. question" - English numerals
-    re_question_en = re.compile(r'^(\d+)[.,)।]\s*(.*)', re.UNICODE)
-    # Regex for options: "ক. ..."
-    re_option = re.compile(r'^([ক-ঘ])[.)]\s+(.*)$', re.UNICODE)
-    # Regex for answer: "উত্তরঃ ..."
-    re_answer = re.compile(r'^উত্তর[:ঃ]\s+(.*)$', re.UNICODE)
-    # Regex for explanation: "[Explaination: ...]"
-    re_explanation = re.compile(r'\[Explaination:\s+(.*?)(?:\]|$)', re.UNICODE)
-    # Regex for hint: "[Hint: ...]"
-    re_hint = re.compile(r'\[Hint:\s+(.*?)(?:\]|$)', re.UNICODE)
-    
-    # Updated regex patterns for topic, difficulty, and board/institute
-    # Regex for difficulty: "[Easy]", "[Medium]", "[Hard]", or any text in brackets
-    re_difficulty = re.compile(r'\[(Easy|Medium|Hard|.*?Difficulty.*?)\]', re.UNICODE | re.IGNORECASE)
-    # Regex for board/institute: "[Board-Year]" or any text containing "Board" in brackets
-    re_board = re.compile(r'\[(.*?(?:Board|Institute|Reference).*?)\]', re.UNICODE | re.IGNORECASE)
-    # Regex for topic: "[টপিক: ...]" or any text starting with "Topic:" in brackets
-    re_topic = re.compile(r'\[(?:টপিক[:ঃ]|Topic:)\s+(.*?)(?:\]|$)', re.UNICODE | re.IGNORECASE)
-    # Alternative topic pattern (just in brackets)
-    re_topic_alt = re.compile(r'\[(.*?(?:Topic|Subject|Chapter).*?)\]', re.UNICODE | re.IGNORECASE)
-    
-    # Updated specific pattern for Bengali topics - with non-greedy matching to get full content
-    re_topic_bengali = re.compile(r'\[টপিক[:ঃ]\s+([\s\S]*?)\]', re.UNICODE)
-    
-    # Regex for image inclusion
-    re_image = re.compile(r'\\includegraphics(?:\[.*?\])?\{(.*?)\}')
-    # Regex for multiple choice statements (i, ii, iii)
-    re_statement = re.compile(r'(?:^|\n)\s*(i{1,3})\.\s*(.*?)(?=$|\n\s*i{1,3}\.|\n\s*নিচের)', re.UNICODE | re.DOTALL)
-    # Regex for "নিচের কোনটি সঠিক?" to detect Pattern 2
-    re_which_correct = re.compile(r'নিচের\s+কোনটি\s+সঠিক\s*\?', re.UNICODE)
-
-    mcq_data = []
-
-    # First pass: collect all lines into a single text
-    full_text = " ".join([line.strip() for line in lines if line.strip()])
-    
-    # Print first 100 characters for debugging
-    print(f"Full text first 100 chars: {full_text[:100]}")
-    
-    # Search for Bengali numerals in the text to confirm they exist
-    bengali_digits_pattern = re.compile(r'[০-৯]+')
-    bengali_matches = bengali_digits_pattern.findall(full_text)
-    if bengali_matches:
-        print(f"Found Bengali digits in text: {', '.join(bengali_matches[:10])}")
-    else:
-        print("No Bengali digits found in the text")
-    
-    # More robust pattern for Bengali serial numbers with various separators
-    bengali_serial_pattern = r'(?:^|\s)([০-৯]+)[\.|\,|\)|।|:|\\]?[\s]*'
-    
-    # Try pattern matching with Bengali digits first (priority)
-    mcq_blocks = re.split(bengali_serial_pattern, full_text)
-    
-    # If no MCQs found or very few, try with English digits
-    if len(mcq_blocks) <= 3:  # Only the original text or just one MCQ found
-        print("Few or no Bengali digit MCQs found, trying with English digits...")
-        mcq_blocks = re.split(r'(?:^|\s)(\d+)[\.|\,|\)|।|:|\\]?[\s]*', full_text)
-    
-    # If still no MCQs found, try with even more flexible pattern
-    if len(mcq_blocks) <= 3:
-        print("Still few or no MCQs found, trying with an even more flexible pattern...")
-        # This pattern allows for more variations in separators and spacing
-        combined_pattern = r'(?:^|\s)([০-৯\d]+)[\.|\,|\)|।|:|\\]?[\s]*'
-        mcq_blocks = re.split(combined_pattern, full_text)
-    
-    print(f"Found {(len(mcq_blocks)-1)//2} potential MCQ blocks")
-    
-    # Debug first block if available
-    if len(mcq_blocks) > 2:
-        print(f"First MCQ serial: {mcq_blocks[1]}")
-        print(f"First MCQ content (first 100 chars): {mcq_blocks[2][:100]}...")
-    
-    # Check if any of the serial numbers are Bengali digits
+def iter_parsed_mcqs(latex_file, media):
+    """Yield the MCQs of the .tex file with the media members, not yet encoded, in their image fields."""
+    metrics = current_metrics()
+    serial_pattern = choose_serial_pattern(latex_file)
     bengali_serials = 0
     english_serials = 0
-    for i in range(1, len(mcq_blocks), 2):
-        if i < len(mcq_blocks):
-            if re.match(r'[০-৯]+', mcq_blocks[i]):
+
+    with open(latex_file, "r", encoding="utf-8") as f:
+        for serial_number, question_text in iter_mcq_blocks(f, serial_pattern):
+            if patterns.BENGALI_DIGITS.match(serial_number):
                 bengali_serials += 1
-            elif re.match(r'\d+', mcq_blocks[i]):
+            elif patterns.ENGLISH_DIGITS.match(serial_number):
                 english_serials += 1
-    
-    print(f"Detected {bengali_serials} Bengali serial numbers and {english_serials} English serial numbers")
-    
-    # Process each MCQ block
-    i = 1
-    while i < len(mcq_blocks):
-        # Get serial number and question text
-        serial_number = mcq_blocks[i]
-        question_text = mcq_blocks[i+1] if i+1 < len(mcq_blocks) else ""
-        
-        # Skip if no question text
-        if not question_text.strip():
-            i += 2
-            continue
-            
-        print(f"Processing MCQ with serial: {serial_number}")
-        
-        # Check if it's a Bengali serial number and display equivalent English number
-        if re.match(r'[০-৯]+', serial_number):
-            # Convert Bengali digits to English
-            english_serial = ''
-            bengali_to_english = {'০':'0', '১':'1', '২':'2', '৩':'3', '৪':'4', 
-                                 '৫':'5', '৬':'6', '৭':'7', '৮':'8', '৯':'9'}
-            for digit in serial_number:
-                english_serial += bengali_to_english.get(digit, digit)
-            print(f"  Bengali serial {serial_number} = English serial {english_serial}")
-        
-        # Reset variables for new MCQ
-        board_institute = ""
-        topic = ""
-        difficulty = ""
-        question_img = ""
-        options = {"ক": "", "খ": "", "গ": "", "ঘ": ""}
-        options_img = {"ক": "", "খ": "", "গ": "", "ঘ": ""}
-        answer = ""
-        explanation = ""
-        explanation_img = ""
-        hint = ""
-        hint_img = ""
-        is_pattern2 = False
-        
-        # Check if it's Pattern 2 (has multiple choice statements)
-        if re_which_correct.search(question_text):
-            is_pattern2 = True
-            print(f"MCQ {serial_number} is Pattern 2 (multiple choice)")
-        
-        # Extract images from question text
-        img_matches = re_image.findall(question_text)
-        if img_matches:
-            for img_path in img_matches:
-                # Extract just the filename part
-                img_filename = os.path.basename(img_path)
-                # Construct full path to the extracted image
-                full_img_path = os.path.join(images_dir, img_filename)
-                
-                if os.path.exists(full_img_path):
-                    question_img = image_to_base64(full_img_path)
-                    # Once we have a question image, we can break
-                    break
-            
-            # Remove image references from text
-            question_text = re_image.sub('', question_text)
-        
-        # Extract topic from the question text - try both patterns
-        # First try the Bengali-specific pattern
-        topic_match = re_topic_bengali.search(question_text)
-        if topic_match:
-            topic = topic_match.group(1).strip()
-            print(f"Found topic (Bengali pattern): {topic}")
-        else:
-            # Try general topic pattern
-            topic_match = re_topic.search(question_text)
-            if topic_match:
-                topic = topic_match.group(1).strip()
-                print(f"Found topic (primary pattern): {topic}")
+
+            mcq = build_mcq(serial_number, question_text, media)
+            if mcq is not None:
+                metrics.count("questions")
+                yield mcq
             else:
-                # Try alternative topic pattern
-                topic_alt_match = re_topic_alt.search(question_text)
-                if topic_alt_match:
-                    topic = topic_alt_match.group(1).strip()
-                    print(f"Found topic (alternative pattern): {topic}")
-        
-        # Extract difficulty from the question text
-        difficulty_match = re_difficulty.search(question_text)
-        if difficulty_match:
-            difficulty = difficulty_match.group(1).strip()
-            print(f"Found difficulty: {difficulty}")
-        
-        # Extract board/institute from the question text
-        board_match = re_board.search(question_text)
-        if board_match:
-            board_institute = board_match.group(1).strip()
-            print(f"Found board/institute: {board_institute}")
-        
-        # Extract hint from the question text
-        hint_match = re_hint.search(question_text)
-        if hint_match:
-            hint = hint_match.group(1).strip()
-            print(f"Found hint of length: {len(hint)}")
-            
-            # Look for images in the hint text
-            hint_img_matches = re_image.findall(hint)
-            if hint_img_matches:
-                for img_path in hint_img_matches:
-                    img_filename = os.path.basename(img_path)
-                    full_img_path = os.path.join(images_dir, img_filename)
-                    
-                    if os.path.exists(full_img_path):
-                        hint_img = image_to_base64(full_img_path)
-                        break
-                
-                # Remove image references from hint
-                hint = re_image.sub('', hint)
-        
-        # Extract explanation from the question text
-        explanation_match = re_explanation.search(question_text)
-        if explanation_match:
-            explanation = explanation_match.group(1).strip()
-            print(f"Found explanation of length: {len(explanation)}")
-            
-            # Look for images in the explanation text
-            exp_img_matches = re_image.findall(explanation)
-            if exp_img_matches:
-                for img_path in exp_img_matches:
-                    img_filename = os.path.basename(img_path)
-                    full_img_path = os.path.join(images_dir, img_filename)
-                    
-                    if os.path.exists(full_img_path):
-                        explanation_img = image_to_base64(full_img_path)
-                        break
-                
-                # Remove image references from explanation
-                explanation = re_image.sub('', explanation)
-        
-        # Try to find options with two different patterns
-        option_found = False
-        for option_letter in ["ক", "খ", "গ", "ঘ"]:
-            # Pattern 1: Look for options like "ক. Option text"
-            option_pattern1 = re.compile(rf"{option_letter}\.\s+(.*?)(?=\s+[ক-ঘ]\.|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", re.DOTALL)
-            option_match = option_pattern1.search(question_text)
-            
-            # Pattern 2: Look for options like "ক) Option text" or "ক অপশন টেক্সট"
-            if not option_match:
-                option_pattern2 = re.compile(rf"{option_letter}[\)।\s]\s*(.*?)(?=\s+[ক-ঘ][\)।\s]|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", re.DOTALL)
-                option_match = option_pattern2.search(question_text)
-            
-            if option_match:
-                option_found = True
-                option_text = option_match.group(1).strip()
-                print(f"Found option {option_letter}: {option_text[:20]}...")
-                
-                # Look for images in the option text
-                opt_img_matches = re_image.findall(option_text)
-                if opt_img_matches:
-                    for img_path in opt_img_matches:
-                        img_filename = os.path.basename(img_path)
-                        full_img_path = os.path.join(images_dir, img_filename)
-                        
-                        if os.path.exists(full_img_path):
-                            options_img[option_letter] = image_to_base64(full_img_path)
-                            break
-                    
-                    # Remove image references from option text
-                    option_text = re_image.sub('', option_text)
-                
-                options[option_letter] = option_text
-        
-        # Skip this MCQ if no options found
-        if not option_found:
-            print(f"Warning: No options found for MCQ {serial_number}, skipping")
-            i += 2
-            continue
-        
-        # Extract answer from the question text - try multiple patterns
-        answer_match = re.search(r'উত্তর[:ঃ]\s+(.*?)(?=\s+\[|$)', question_text)
-        if not answer_match:
-            answer_match = re.search(r'[Aa]nswer[:ঃ]\s+(.*?)(?=\s+\[|$)', question_text)
-        
-        if answer_match:
-            answer = answer_match.group(1).strip()
-            print(f"Found answer: {answer}")
-        else:
-            print(f"Warning: No answer found for MCQ {serial_number}")
-        
-        # Clean up the question text by removing extracted parts
-        cleaned_question = question_text
-        # Remove topic - both patterns
-        cleaned_question = re.sub(r'\[(?:টপিক[:ঃ]|Topic:)\s+.*?\]', '', cleaned_question, flags=re.IGNORECASE)
-        cleaned_question = re.sub(r'\[(.*?(?:Topic|Subject|Chapter).*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-        # Remove difficulty
-        cleaned_question = re.sub(r'\[(Easy|Medium|Hard|.*?Difficulty.*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-        # Remove board/institute
-        cleaned_question = re.sub(r'\[(.*?(?:Board|Institute|Reference).*?)\]', '', cleaned_question, flags=re.IGNORECASE)
-        # Remove options
-        for option_letter in ["ক", "খ", "গ", "ঘ"]:
-            cleaned_question = re.sub(rf"{option_letter}[.)]\s+.*?(?=\s+[ক-ঘ][.)]|উত্তর[:ঃ]|\[Hint:|\[Explaination:|$)", '', cleaned_question, flags=re.DOTALL)
-        # Remove answer
-        cleaned_question = re.sub(r'উত্তর[:ঃ]\s+.*?(?=\s+\[|$)', '', cleaned_question)
-        cleaned_question = re.sub(r'[Aa]nswer[:ঃ]\s+.*?(?=\s+\[|$)', '', cleaned_question)
-        # Remove hint
-        cleaned_question = re.sub(r'\[Hint:\s+.*?\]', '', cleaned_question)
-        # Remove explanation
-        cleaned_question = re.sub(r'\[Explaination:\s+.*?\]', '', cleaned_question)
-        # Remove the "নিচের কোনটি সঠিক?" text for pattern 2
-        if is_pattern2:
-            cleaned_question = re.sub(r'নিচের\s+কোনটি\s+সঠিক\s*\?', '', cleaned_question)
-        
-        # Clean up any excessive whitespace
-        if is_pattern2:
-            # For pattern 2, preserve newlines but replace multiple spaces with single space
-            cleaned_question = re.sub(r' +', ' ', cleaned_question).strip()
-            # Make sure there are no more than 2 consecutive newlines
-            cleaned_question = re.sub(r'\n{3,}', '\n\n', cleaned_question)
-        else:
-            # For pattern 1, replace all whitespace with single space
-            cleaned_question = re.sub(r'\s+', ' ', cleaned_question).strip()
-        
-        # Update question text with the cleaned version
-        question_text = cleaned_question
-        print(f"Cleaned question (first 50 chars): {question_text[:50]}...")
-        
-        # Clean up LaTeX commands
+                metrics.count("skipped_blocks")
+
+    log.info("Detected %d Bengali serial numbers and %d English serial numbers", bengali_serials, english_serials)
+
+def parse_latex_for_mcqs(latex_file, media, image_workers=1):
+    """Parse the whole .tex file and return the list of MCQs (see iter_latex_mcqs)."""
+    return list(iter_latex_mcqs(latex_file, media, image_workers))
+
+def build_mcq(serial_number, question_text, media):
+    """
+    Build the MCQ dict for one question block, or None if it has no options.
+    Image fields hold the media member of the image; resolve_images encodes them.
+    """
+    # Skip if no question text
+    if not question_text.strip():
+        return None
+
+    debug = log.isEnabledFor(logging.DEBUG)
+    log.debug("Processing MCQ with serial: %s", serial_number)
+
+    # Check if it's a Bengali serial number and display equivalent English number
+    if debug and patterns.BENGALI_DIGITS.match(serial_number):
+        # Convert Bengali digits to English
+        english_serial = ''
+        bengali_to_english = {'০':'0', '১':'1', '২':'2', '৩':'3', '৪':'4', 
+                             '৫':'5', '৬':'6', '৭':'7', '৮':'8', '৯':'9'}
+        for digit in serial_number:
+            english_serial += bengali_to_english.get(digit, digit)
+        log.debug("  Bengali serial %s = English serial %s", serial_number, english_serial)
+
+    # Read every field of the block in one pass
+    block = read_block(question_text)
+    is_pattern2 = block["is_pattern2"]
+    if is_pattern2:
+        log.debug("MCQ %s is Pattern 2 (multiple choice)", serial_number)
+
+    # The first image of the document referenced anywhere in the block becomes the
+    # question image; hint, explanation and option images are not split out
+    question_img = ""
+    for img_path in block["images"]:
+        member = media.find(img_path)
+        if member:
+            question_img = member
+            break
+
+    topic = block["topic"]
+    difficulty = block["difficulty"]
+    board_institute = block["board"]
+    hint = block["hint"]
+    hint_img = ""
+    explanation = block["explanation"]
+    explanation_img = ""
+    if debug:
+        if topic:
+            log.debug("Found topic: %s", topic)
+        if difficulty:
+            log.debug("Found difficulty: %s", difficulty)
+        if board_institute:
+            log.debug("Found board/institute: %s", board_institute)
+        if hint:
+            log.debug("Found hint of length: %d", len(hint))
+        if explanation:
+            log.debug("Found explanation of length: %d", len(explanation))
+
+    # Skip this MCQ if no options found
+    if not block["options"]:
+        log.warning("No options found for MCQ %s, skipping", serial_number)
+        return None
+
+    options = {}
+    options_img = {}
+    for option_letter in patterns.OPTION_LETTERS:
+        options[option_letter] = block["options"].get(option_letter, "")
+        options_img[option_letter] = ""
+        if debug and option_letter in block["options"]:
+            log.debug("Found option %s: %s...", option_letter, options[option_letter][:20])
+
+    answer = block["answer"]
+    if answer:
+        log.debug("Found answer: %s", answer)
+    else:
+        log.warning("No answer found for MCQ %s", serial_number)
+
+    question_text = block["question"]
+    if debug:
+        log.debug("Cleaned question (first 50 chars): %s...", question_text[:50])
+
+    # Clean up LaTeX commands
+    with current_metrics().stage("cleanup"):
         question_text = clean_latex_commands(question_text)
         topic = clean_latex_commands(topic)
         board_institute = clean_latex_commands(board_institute)
@@ -413,48 +178,43 @@ def parse_latex_for_mcqs(latex_file, images_dir):
         explanation = clean_latex_commands(explanation)
         for k in options.keys():
             options[k] = clean_latex_commands(options[k])
-        
-        # Convert Bengali answer to English (ক -> A, খ -> B, etc.)
-        option_map = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
-        answer_eng = ""
-        for bn_letter in answer:
-            if bn_letter in option_map:
-                answer_eng += option_map[bn_letter]
-        
-        # If we successfully mapped the answer, use it; otherwise keep original
-        if answer_eng:
-            answer = answer_eng
-        
-        # Add the MCQ to our data
-        mcq_obj = {
-            "Serial": serial_number.strip(),
-            "Question": question_text.strip(),
-            "Ques_img": question_img,
-            "Topic": topic.strip(),
-            "Difficulty_level": difficulty.strip(),
-            "Reference_Board/Institute": board_institute.strip(),
-            "OptionA": options["ক"].strip(),
-            "OptionA_IMG": options_img["ক"],
-            "OptionB": options["খ"].strip(),
-            "OptionB_IMG": options_img["খ"],
-            "OptionC": options["গ"].strip(),
-            "OptionC_IMG": options_img["গ"],
-            "OptionD": options["ঘ"].strip(),
-            "OptionD_IMG": options_img["ঘ"],
-            "Answer": answer.strip(),
-            "Explaination": explanation.strip(),
-            "Explaination_IMG": explanation_img,
-            "Hint": hint.strip(),
-            "Hint_img": hint_img
-        }
-        
-        mcq_data.append(mcq_obj)
-        print(f"Successfully added MCQ {serial_number} to dataset")
-        
-        # Move to the next block
-        i += 2
 
-    return mcq_data
+    # Convert Bengali answer to English (ক -> A, খ -> B, etc.)
+    option_map = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
+    answer_eng = ""
+    for bn_letter in answer:
+        if bn_letter in option_map:
+            answer_eng += option_map[bn_letter]
+
+    # If we successfully mapped the answer, use it; otherwise keep original
+    if answer_eng:
+        answer = answer_eng
+
+    # Add the MCQ to our data
+    mcq_obj = {
+        "Serial": serial_number.strip(),
+        "Question": question_text.strip(),
+        "Ques_img": question_img,
+        "Topic": topic.strip(),
+        "Difficulty_level": difficulty.strip(),
+        "Reference_Board/Institute": board_institute.strip(),
+        "OptionA": options["ক"].strip(),
+        "OptionA_IMG": options_img["ক"],
+        "OptionB": options["খ"].strip(),
+        "OptionB_IMG": options_img["খ"],
+        "OptionC": options["গ"].strip(),
+        "OptionC_IMG": options_img["গ"],
+        "OptionD": options["ঘ"].strip(),
+        "OptionD_IMG": options_img["ঘ"],
+        "Answer": answer.strip(),
+        "Explaination": explanation.strip(),
+        "Explaination_IMG": explanation_img,
+        "Hint": hint.strip(),
+        "Hint_img": hint_img
+    }
+
+    log.debug("Successfully added MCQ %s to dataset", serial_number)
+    return mcq_obj
 
 def clean_latex_commands(text):
     """
@@ -468,67 +228,61 @@ def clean_latex_commands(text):
     text = text.replace(r'$\neq$', '__SPECIAL_NEQ__')
     
     # Replace LaTeX equation delimiters \( and \) with $ signs
-    text = re.sub(r'\\(\(|\))', '$', text)
+    text = patterns.MATH_PAREN_DELIMITER.sub('$', text)
     
     # Fix adjacent $ signs (might happen with $$ in the middle)
-    text = re.sub(r'\${2,}', '$', text)
+    text = patterns.REPEATED_DOLLARS.sub('$', text)
     
     # Handle specific case for system of equations with braces (like in the example image)
     # $\left.\ \begin{matrix}-\frac{1}{2}x+y&=-1\\x-2y&=2\\\end{matrix}\right\}$
-    system_pattern = r'\\left\.\s*\\begin\{matrix\}(.*?)\\end\{matrix\}\\right\\}'
-    if re.search(system_pattern, text, re.DOTALL):
+    if patterns.BRACE_EQUATION_SYSTEM.search(text):
         # Keep this format as is - it's already in the desired linear format with braces
         pass
     else:
         # Handle other LaTeX for system of equations in linear format
         # Convert any matrix or array environment to linear equations
-        text = re.sub(r'\\left\\{.*?\\begin\{(matrix|array).*?\}(.*?)\\end\{\1.*?\}', 
-                     lambda m: linearize_equation_system(m.group(2)), text, flags=re.DOTALL)
+        text = patterns.MATRIX_EQUATION_SYSTEM.sub(lambda m: linearize_equation_system(m.group(2)), text)
     
     # Handle common LaTeX environments that might be in the text but preserve their content
-    text = re.sub(r'\\begin\{(equation|align|gather|eqnarray)\*?\}(.*?)\\end\{\1\*?\}', 
-                 lambda m: f'${m.group(2).strip()}$', text, flags=re.DOTALL)
+    text = patterns.EQUATION_ENVIRONMENT.sub(lambda m: f'${m.group(2).strip()}$', text)
     
     # Clean up some excessive whitespace in equations
-    text = re.sub(r'\$\s+', '$', text)
-    text = re.sub(r'\s+\$', '$', text)
+    text = patterns.SPACE_AFTER_DOLLAR.sub('$', text)
+    text = patterns.SPACE_BEFORE_DOLLAR.sub('$', text)
     
     # Handle the specific case from the example
     # For example: $\frac{a_{1}}{a_{2}} = \frac{b_{1}}{b_{2}} $\neq$ \frac{c_{1}}{c_{2}}$
-    text = re.sub(r'\$([^$]*?) \$\\neq\$ ([^$]*?)\$', r'$\1 \\neq \2$', text)
+    text = patterns.SPLIT_NEQ.sub(r'$\1 \\neq \2$', text)
     
     # Remove \textbf and similar LaTeX markup tags
-    text = re.sub(r'\\textbf\{([^}]*?)\}', r'\1', text)
-    text = re.sub(r'\\textit\{([^}]*?)\}', r'\1', text)
-    text = re.sub(r'\\emph\{([^}]*?)\}', r'\1', text)
+    text = patterns.TEXTBF.sub(r'\1', text)
+    text = patterns.TEXTIT.sub(r'\1', text)
+    text = patterns.EMPH.sub(r'\1', text)
     
     # Remove extra brackets around normal text
-    text = re.sub(r'\{\[}([^{}\[\]]*?)\{\]}', r'\1', text)
-    text = re.sub(r'\textbf\{\{([^{}]*?)\}\}', r'\1', text)
+    text = patterns.BRACKETED_TEXT.sub(r'\1', text)
+    text = patterns.TAB_TEXTBF_BRACES.sub(r'\1', text)
     
     # Handle the specific bracket pattern from the example
     # \textbf{{[}}টপিক\textbf{:} ... \textbf{{]}}
-    text = re.sub(r'\\textbf\{\{\[}}(.*?)\\textbf\{\{\]}}', r'[\1]', text)
-    text = re.sub(r'\\textbf\{:\}', r':', text)
-    text = re.sub(r'\\textbf\{\?}', r'?', text)
+    text = patterns.TEXTBF_BRACKETS.sub(r'[\1]', text)
+    text = patterns.TEXTBF_COLON.sub(r':', text)
+    text = patterns.TEXTBF_QUESTION.sub(r'?', text)
     
     # Remove extra brackets that might interfere with equation display
-    text = re.sub(r'\{\\\[}(.*?)\{\\\]}', r'\1', text)
-    text = re.sub(r'\{\\(.*?)\\}', r'\1', text)
+    text = patterns.ESCAPED_BRACKETS.sub(r'\1', text)
+    text = patterns.BRACED_COMMAND.sub(r'\1', text)
     
     # Restore protected special commands
     text = text.replace('__SPECIAL_NEQ__', r'\neq')
     
     # Clean up slashes before and after equation delimiters
     # Remove unnecessary backslashes and forward slashes before $
-    text = re.sub(r'[\/\\]+\s*\$', ' $', text)
+    text = patterns.SLASHES_BEFORE_DOLLAR.sub(' $', text)
     # Remove unnecessary backslashes and forward slashes after $
-    text = re.sub(r'\$\s*[\/\\]+', '$ ', text)
+    text = patterns.SLASHES_AFTER_DOLLAR.sub('$ ', text)
     
     # Add spaces before and after every equation if not already present
-    # First, find all equation patterns (text between $ signs)
-    equation_pattern = re.compile(r'(\$[^$]+?\$)')
-    
     # Function to add spaces only if needed
     def add_spaces_to_eq(match):
         eq = match.group(1)
@@ -538,10 +292,10 @@ def clean_latex_commands(text):
         return f"{prefix}{eq}{suffix}"
         
     # Apply the spacing function
-    text = equation_pattern.sub(add_spaces_to_eq, text)
+    text = patterns.INLINE_EQUATION.sub(add_spaces_to_eq, text)
     
     # Fix any cases where we might have added too many spaces
-    text = re.sub(r'\s{2,}', ' ', text)
+    text = patterns.REPEATED_WHITESPACE.sub(' ', text)
     
     return text.strip()
 
@@ -555,80 +309,419 @@ def linearize_equation_system(matrix_content):
     Output: -\frac{1}{2}x+y=-1, x-2y=2
     """
     # Replace newline markers with commas
-    linear = re.sub(r'\\\\', ', ', matrix_content)
+    linear = matrix_content.replace('\\\\', ', ')
     
     # Replace alignment markers with appropriate symbols
-    linear = re.sub(r'&=', '=', linear)
-    linear = re.sub(r'&<', '<', linear)
-    linear = re.sub(r'&>', '>', linear)
+    linear = linear.replace('&=', '=')
+    linear = linear.replace('&<', '<')
+    linear = linear.replace('&>', '>')
     
     return linear
 
-def process_docx_file(docx_file, class_name, subject_name):
-    """Process a DOCX file to extract MCQs"""
-    mcq_data = []
-    
-    try:
-        # Create temporary directory for processing
-        with tempfile.TemporaryDirectory() as tmpdir:
-            print(f"Created temporary directory: {tmpdir}")
-            
-            # Extract DOCX contents (it's a ZIP file)
-            images_dir = os.path.join(tmpdir, "media")
-            os.makedirs(images_dir, exist_ok=True)
-            
-            # Extract images from DOCX
-            extract_images_from_docx(docx_file, images_dir)
-            print(f"Extracted images to {images_dir}")
-            
-            # Convert docx -> .tex using pandoc
+class ConversionError(Exception):
+    """Raised when a document cannot be converted into LaTeX."""
+
+
+class ConversionCancelled(Exception):
+    """Raised to stop a conversion that is no longer wanted (see process_docx_file)."""
+
+
+def iter_docx_mcqs(docx_file, class_name, subject_name, engine="pandoc", image_workers=None, ast=None):
+    """
+    Yield the MCQs of a DOCX file, read with pandoc or the native reader, one
+    at a time as they are parsed. The temporary directory holding the .tex
+    file is kept, and the document's archive left open for reading its images,
+    until the generator is exhausted. Images are encoded on image_workers
+    processes (default: one per CPU core). ast, if given, is the document's
+    AST already read (e.g. by the job queue in mcq_jobs.py), and the document
+    is not read again.
+
+    Raises subprocess.CalledProcessError if pandoc fails and ConversionError
+    if the document produces no LaTeX.
+    """
+    # Create temporary directory for processing
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log.debug("Created temporary directory: %s", tmpdir)
+        
+        # Convert docx -> .tex through the JSON AST of the selected engine
+        metrics = current_metrics()
+        if ast is None:
+            with metrics.stage("read"):
+                ast = load_docx_ast(docx_file, engine)
+            log.info("Document conversion completed.")
+        
+        with metrics.stage("latex"):
+            latex_text = ast_to_latex(ast)
+            if not latex_text.strip():
+                log.error("Generated .tex file is empty.")
+                raise ConversionError("Pandoc failed to generate a proper .tex file")
             tex_path = os.path.join(tmpdir, "converted.tex")
-            cmd = ["pandoc", docx_file, "-o", tex_path]
-            print(f"Running pandoc command: {' '.join(cmd)}")
-            
-            try:
-                result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-                print("Pandoc conversion completed.")
-            except subprocess.CalledProcessError as e:
-                print(f"Pandoc command failed with error: {e}")
-                print(f"Error output: {e.stderr}")
-                return {"error": f"Failed to convert DOCX file: {e.stderr}"}
-            
-            if not os.path.exists(tex_path) or os.path.getsize(tex_path) == 0:
-                print("Error: Generated .tex file is empty or doesn't exist.")
-                return {"error": "Pandoc failed to generate a proper .tex file"}
-            
-            # Parse the generated .tex for MCQs
-            mcq_data = parse_latex_for_mcqs(tex_path, images_dir)
-            
-            # Add class and subject to each MCQ
-            for mcq in mcq_data:
+            with open(tex_path, "w", encoding="utf-8") as f:
+                f.write(latex_text)
+        metrics.count("tex_bytes", os.path.getsize(tex_path))
+        # The parser streams the file; do not keep the document in memory meanwhile
+        del ast, latex_text
+        
+        # Parse the generated .tex for MCQs, reading the images it references from the DOCX (a ZIP file)
+        with DocxMedia(docx_file) as media:
+            log.info("Found %d images in the document", len(media))
+            for mcq in iter_latex_mcqs(tex_path, media, image_workers):
+                # Add class and subject to each MCQ
                 mcq["Class"] = class_name
                 mcq["Subject"] = subject_name
                 mcq["Chapter"] = mcq.get("Topic", "")  # Use Topic as Chapter if not specified
-    
+                yield mcq
+
+def conversion_error(e):
+    """The {"error": ...} result for an exception raised while converting; call it from the except block."""
+    if isinstance(e, subprocess.CalledProcessError):
+        log.error("Pandoc command failed with error: %s", e)
+        log.error("Error output: %s", e.stderr)
+        return {"error": f"Failed to convert DOCX file: {e.stderr}"}
+    if isinstance(e, ConversionError):
+        return {"error": str(e)}
+    if isinstance(e, ConversionCancelled):
+        log.info("Conversion cancelled")
+        return {"error": "Conversion cancelled"}
+    log.exception("Error processing DOCX file")
+    return {"error": f"Error processing DOCX file: {str(e)}"}
+
+def process_docx_file(docx_file, class_name, subject_name, engine="pandoc", image_workers=None, ast=None,
+                      cancelled=None):
+    """
+    Process a DOCX file to extract MCQs, reading it with pandoc or the native
+    reader (unless its ast is given, see iter_docx_mcqs). Returns
+    {"mcqs": [...], "metrics": {...}} (see mcq_metrics.py) or {"error": ...}.
+    cancelled, if given, is called after each MCQ and stops the conversion
+    when it returns true.
+    """
+    try:
+        with collect_metrics(docx_file, engine=engine) as metrics:
+            mcq_data = []
+            for mcq in iter_docx_mcqs(docx_file, class_name, subject_name, engine, image_workers, ast):
+                if cancelled is not None and cancelled():
+                    raise ConversionCancelled()
+                mcq_data.append(mcq)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {"error": f"Error processing DOCX file: {str(e)}"}
+        return conversion_error(e)
     
-    return {"mcqs": mcq_data}
+    return {"mcqs": mcq_data, "metrics": metrics.report()}
+
+def write_json_array(items, out):
+    """
+    Write items to out as the same indented JSON array json.dumps(list, indent=2)
+    produces, one item at a time. Returns the number of items written.
+    """
+    count = 0
+    for item in items:
+        out.write("[\n  " if count == 0 else ",\n  ")
+        out.write(json.dumps(item, indent=2).replace("\n", "\n  "))
+        count += 1
+    out.write("\n]\n" if count else "[]\n")
+    return count
+
+def write_ndjson(items, out):
+    """
+    Write items to out as newline-delimited JSON, one compact object per line,
+    flushing each line so the reader gets every item as soon as it is parsed.
+    Returns the number of items written.
+    """
+    count = 0
+    for item in items:
+        out.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+def binary_mcq(mcq):
+    """
+    The MCQ for MessagePack output: each image data URL is replaced by
+    {"format": "png", "data": <the image bytes>}, saving the base64 expansion.
+    """
+    record = dict(mcq)
+    for field in IMAGE_FIELDS:
+        image = decode_data_url(record[field]) if record[field] else None
+        if image is not None:
+            record[field] = {"format": image[0], "data": image[1]}
+    return record
+
+def msgpack_packer():
+    """A msgpack Packer writing str as MessagePack str and bytes as bin. Needs msgpack."""
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("MessagePack output needs msgpack (pip install msgpack)") from e
+    return msgpack.Packer(use_bin_type=True)
+
+def write_msgpack(items, out, packer=None):
+    """
+    Write items to out (a binary stream) as consecutive MessagePack objects,
+    each flushed as soon as it is written; pass MCQs through binary_mcq
+    first. Returns the number of items written.
+    """
+    packer = packer or msgpack_packer()
+    count = 0
+    for item in items:
+        out.write(packer.pack(item))
+        out.flush()
+        count += 1
+    return count
+
+def _serve_worker_init(log_level):
+    """Log to stderr at the server's level, and keep stray prints off the protocol stream."""
+    configure_logging(log_level)
+    sys.stdout = sys.stderr
+
+def serve(workers=None, engine="pandoc", log_level=None, packer=None):
+    """
+    Long-lived conversion server used by the Node backend instead of spawning
+    one Python process per upload.
+
+    Reads one JSON job per line from stdin:
+        {"id": 1, "docx_file": "...", "class_name": "...", "subject_name": "..."}
+    (an optional "engine" key overrides the server's --engine for that job)
+    and writes one JSON line per finished job to stdout:
+        {"id": 1, "mcqs": [...], "metrics": {...}}  or  {"id": 1, "error": "..."}
+    where metrics holds the job's stage timings and counters (mcq_metrics.py).
+
+    Jobs are accepted as soon as they are read and run on the job queue of
+    mcq_jobs.py, at most workers (default: one per CPU core) at a time, so
+    results can arrive out of order and must be matched by id. A job with
+    "events": true also gets {"id": 1, "state": "queued"} when it is accepted
+    and {"id": 1, "state": "running"} when it starts, and a {"status": 1} line
+    is answered with {"id": 1, "state": ...} ("queued" with its "position" in
+    the queue, "running", or "unknown" for a job that is not pending). Lines
+    with a "state" are never results. A {"cancel": 1} line stops job 1, which
+    is then answered with {"id": 1, "error": "Conversion cancelled"} (or
+    with its result, if it finished first); it gets {"id": 1, "state":
+    "unknown"} if job 1 is not pending. Ids are JSON strings, numbers or null;
+    a line that is not a valid job or request is answered with
+    {"id": null, "error": "Invalid request: ..."}. The server exits once
+    stdin is closed and all pending jobs have been answered. Log messages go
+    to stderr.
+
+    With a packer (msgpack_packer()), the answers are written as consecutive
+    MessagePack maps instead of JSON lines, with the images of the MCQs as
+    raw bytes (see binary_mcq); jobs are still read as JSON lines.
+    """
+    import asyncio
+
+    log_level = configure_logging(log_level)
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    asyncio.run(_serve_jobs(workers, engine, log_level, protocol_out, packer))
+
+def _client_id(value, key):
+    """A job id the client chose, which must be a JSON string, number or null (to key the pending jobs by)."""
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise ValueError(f'"{key}" must be a string, a number or null, not {type(value).__name__}')
+    return value
+
+async def _serve_jobs(workers, engine, log_level, protocol_out, packer=None):
+    """The protocol loop of serve, on the event loop running its JobQueue."""
+    import asyncio
+    from mcq_jobs import JobQueue
+
+    def send(message):
+        if packer is None:
+            protocol_out.write(json.dumps(message, ensure_ascii=False) + "\n")
+            protocol_out.flush()
+            return
+        if "mcqs" in message:
+            message["mcqs"] = [binary_mcq(mcq) for mcq in message["mcqs"]]
+        write_msgpack([message], protocol_out.buffer, packer)
+
+    loop = asyncio.get_running_loop()
+    async with JobQueue(workers, engine, log_level) as jobs:
+        # Pending jobs: queue id -> the client's id, and the client's id -> queue id
+        client_ids = {}
+        job_ids = {}
+        with_events = set()
+
+        async def send_events():
+            async for status in jobs.watch():
+                if status["state"] == "running" and status["id"] in with_events and status["id"] in client_ids:
+                    send({"id": client_ids[status["id"]], "state": "running"})
+
+        async def answer(job_id):
+            result = await jobs.wait(job_id)
+            client_id = client_ids.pop(job_id)
+            if job_ids.get(client_id) == job_id:
+                del job_ids[client_id]
+            with_events.discard(job_id)
+            jobs.forget(job_id)
+            send({"id": client_id, **result})
+
+        events = asyncio.create_task(send_events())
+        # Let send_events subscribe before the first job is submitted
+        await asyncio.sleep(0)
+        answers = set()
+        send({"ready": True, "workers": jobs.concurrency})
+
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+                if "status" in request:
+                    client_id = _client_id(request["status"], "status")
+                    status = jobs.status(job_ids.get(client_id))
+                    reply = {"id": client_id, "state": status["state"] if status else "unknown"}
+                    if status and "position" in status:
+                        reply["position"] = status["position"]
+                    send(reply)
+                    continue
+                if "cancel" in request:
+                    client_id = _client_id(request["cancel"], "cancel")
+                    if client_id in job_ids:
+                        # answer() sends its {"error": "Conversion cancelled"} once it has stopped
+                        jobs.forget(job_ids[client_id])
+                    else:
+                        send({"id": client_id, "state": "unknown"})
+                    continue
+                client_id = _client_id(request.get("id"), "id")
+                docx_file = request["docx_file"]
+            except (ValueError, KeyError, AttributeError, TypeError) as e:
+                send({"id": None, "error": f"Invalid request: {e}"})
+                continue
+
+            job_id = jobs.submit(docx_file, request.get("class_name", ""), request.get("subject_name", ""),
+                                 request.get("engine", engine))
+            client_ids[job_id] = client_id
+            job_ids[client_id] = job_id
+            if request.get("events"):
+                with_events.add(job_id)
+                send({"id": client_id, "state": "queued"})
+            task = asyncio.create_task(answer(job_id))
+            answers.add(task)
+            task.add_done_callback(answers.discard)
+
+        if answers:
+            await asyncio.gather(*answers)
+        events.cancel()
 
 if __name__ == "__main__":
     # This block executes when the script is run directly
-    if len(sys.argv) < 4:
+    parser = argparse.ArgumentParser(
+        usage="python docx_to_mcq.py <docx_file> <class_name> <subject_name> [--ndjson | --msgpack]\n"
+              "       python docx_to_mcq.py --serve [--workers N]")
+    parser.add_argument("docx_file", nargs="?")
+    parser.add_argument("class_name", nargs="?")
+    parser.add_argument("subject_name", nargs="?")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a persistent worker reading JSON jobs from stdin")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Concurrent conversions in --serve mode (default: one per CPU core)")
+    parser.add_argument("--engine", choices=ENGINES, default="pandoc",
+                        help="Read documents with pandoc (default) or the built-in reader, "
+                             "which falls back to pandoc on documents it cannot read")
+    parser.add_argument("--image-cache", metavar="DIR", default=None,
+                        help=f"Keep encoded images in DIR and reuse them across runs (default: ${CACHE_DIR_ENV})")
+    parser.add_argument("--pandoc-cache", metavar="DIR", default=None,
+                        help=f"Keep pandoc's output in DIR and reuse it for identical documents (default: ${PANDOC_CACHE_DIR_ENV})")
+    parser.add_argument("--image-workers", type=int, default=None,
+                        help="Processes encoding the images of a document (default: one per CPU core; "
+                             "--serve jobs always encode their own images)")
+    parser.add_argument("--to-database", action="store_true",
+                        help="Load the MCQs into the questions table with one COPY instead of printing JSON")
+    parser.add_argument("--database-url", default=None,
+                        help=f"PostgreSQL database for --to-database (default: ${DATABASE_URL_ENV})")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write one JSON object per MCQ as soon as it is parsed, then a summary line "
+                             "{\"done\": true, \"count\": N, \"metrics\": {...}} (or {\"done\": true, \"error\": ...}), "
+                             "instead of a JSON array")
+    parser.add_argument("--msgpack", action="store_true",
+                        help="Write MessagePack instead of JSON, with the images as raw bytes: the MCQs and the "
+                             "summary line of --ndjson as consecutive maps, or the --serve answers; needs msgpack")
+    parser.add_argument("--metrics", metavar="FILE", default=None,
+                        help="Write the stage timings and counters of the conversion to FILE as JSON")
+    parser.add_argument("--profile", metavar="DIR", default=None,
+                        help=f"Profile each conversion with cProfile into DIR/<document>.prof (default: ${PROFILE_DIR_ENV})")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=None,
+                        help="Log messages at this level and above to stderr (default: $MCQ_LOG_LEVEL or INFO; "
+                             "DEBUG reports every question)")
+    args = parser.parse_args()
+
+    if args.image_cache:
+        # Inherited by the --serve worker processes
+        os.environ[CACHE_DIR_ENV] = os.path.abspath(args.image_cache)
+    if args.pandoc_cache:
+        os.environ[PANDOC_CACHE_DIR_ENV] = os.path.abspath(args.pandoc_cache)
+    if args.profile:
+        os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.profile)
+
+    packer = None
+    if args.msgpack:
+        try:
+            packer = msgpack_packer()
+        except ImportError as e:
+            parser.error(str(e))
+
+    if args.serve:
+        serve(args.workers, args.engine, args.log_level, packer)
+        sys.exit(0)
+
+    if args.subject_name is None:
         print("Usage: python docx_to_mcq.py <docx_file> <class_name> <subject_name>")
         sys.exit(1)
-    
-    docx_file = sys.argv[1]
-    class_name = sys.argv[2]
-    subject_name = sys.argv[3]
-    
-    result = process_docx_file(docx_file, class_name, subject_name)
-    
-    if "error" in result:
-        print(f"Error: {result['error']}")
+    if args.to_database and (args.ndjson or args.msgpack):
+        parser.error("--ndjson and --msgpack cannot be combined with --to-database")
+    if args.ndjson and args.msgpack:
+        parser.error("--ndjson and --msgpack cannot be combined")
+    
+    docx_file = args.docx_file
+    class_name = args.class_name
+    subject_name = args.subject_name
+    configure_logging(args.log_level)
+    
+    # Write the JSON (or load the database) as the MCQs are parsed. stdout only
+    # carries the JSON array (or lines); log messages (and any stray print) go to stderr.
+    json_out = sys.stdout
+    if args.ndjson:
+        # The lines keep Bengali text unescaped
+        json_out.reconfigure(encoding="utf-8")
+    sys.stdout = sys.stderr
+    try:
+        with collect_metrics(docx_file, engine=args.engine) as metrics:
+            mcqs = iter_docx_mcqs(docx_file, class_name, subject_name, args.engine, args.image_workers)
+            with metrics.stage("write"):
+                if args.to_database:
+                    # The options are cleaned LaTeX, so the answer must be too for pg_sink to match it to one
+                    records = (dict(mcq, Answer=clean_latex_commands(mcq["Answer"])) for mcq in mcqs)
+                    count = copy_to_database(records, args.database_url)
+                elif args.ndjson:
+                    count = write_ndjson(mcqs, json_out)
+                elif args.msgpack:
+                    count = write_msgpack(map(binary_mcq, mcqs), json_out.buffer, packer)
+                else:
+                    count = write_json_array(mcqs, json_out)
+    except Exception as e:
+        result = conversion_error(e)
+        log.error("%s", result['error'])
+        if args.ndjson:
+            write_ndjson([{"done": True, **result}], json_out)
+        elif args.msgpack:
+            write_msgpack([{"done": True, **result}], json_out.buffer, packer)
         sys.exit(1)
-    
-    print(json.dumps(result["mcqs"], indent=2))
-    print(f"Successfully extracted {len(result['mcqs'])} MCQs from {docx_file}") 
\ No newline at end of file
+    finally:
+        sys.stdout = json_out
+    
+    report = metrics.report()
+    if args.ndjson:
+        write_ndjson([{"done": True, "count": count, "metrics": report}], json_out)
+    elif args.msgpack:
+        write_msgpack([{"done": True, "count": count, "metrics": report}], json_out.buffer, packer)
+    log.info("Metrics: %s", json.dumps(report, ensure_ascii=False))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.to_database:
+        log.info("Successfully loaded %d MCQs from %s into the questions table", count, docx_file)
+    else:
+        log.info("Successfully extracted %d MCQs from %s", count, docx_file)
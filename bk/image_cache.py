@@ -0,0 +1,371 @@
+"""
+Content-addressed cache for the base64 data URLs of question images.
+
+Every \\includegraphics reference used to open, thumbnail and re-encode its
+image, and the same figure is often reused many times across a chapter (and
+across the chapters of a batch). Images are keyed by the SHA-256 of their
+bytes, so each distinct image is encoded once per process (in-memory LRU) and,
+when a cache directory is configured, once across runs.
+
+The cache directory comes from the MCQ_IMAGE_CACHE_DIR environment variable
+(the converters' --image-cache option sets it for their worker processes).
+
+resolve_images is the image stage of the converters: the parsers put the
+names of the referenced images in the records, and it encodes the distinct
+images on a pool of worker processes while later records are still being
+parsed. The images are read from the .docx archive itself (DocxMedia), only
+when a question references them; nothing is extracted to disk.
+
+save_image_blob writes the image of a data URL to a content-addressed folder,
+for outputs that keep images out of their cells.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from mcq_log import get_logger
+from mcq_metrics import current_metrics
+
+log = get_logger("image_cache")
+
+CACHE_DIR_ENV = "MCQ_IMAGE_CACHE_DIR"
+
+# Maximum dimensions of an encoded image; part of the cache key
+MAX_SIZE = (800, 600)
+KEY_VERSION = f"{MAX_SIZE[0]}x{MAX_SIZE[1]}"
+
+# Records resolve_images reads ahead of the one it is waiting on
+IMAGE_LOOKAHEAD = 64
+
+
+def image_format(name):
+    """The output format for an image file name: jpg, jpeg, png or gif, else png."""
+    format_ext = os.path.splitext(name)[1].lower().lstrip('.')
+    if format_ext not in ['jpg', 'jpeg', 'png', 'gif']:
+        format_ext = 'png'  # Default to PNG for unknown formats
+    return format_ext
+
+
+def encode_image(data, name):
+    """
+    Convert image bytes to a base64 data URL, shrinking images larger than
+    MAX_SIZE. name is the image's file name, which picks the output format.
+    Returns "" if the image cannot be read.
+    """
+    # Pillow is only loaded once a document actually has an image to encode
+    from PIL import Image
+
+    try:
+        # Open the image and resize if needed
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width > MAX_SIZE[0] or img.height > MAX_SIZE[1]:
+                img.thumbnail(MAX_SIZE, Image.LANCZOS)
+
+            # Convert to base64
+            buffer = io.BytesIO()
+            format_ext = image_format(name)
+            img.save(buffer, format=format_ext.upper())
+            img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+            # Create data URL
+            return f"data:image/{format_ext};base64,{img_str}"
+    except Exception as e:
+        log.warning("Error converting image to base64: %s", e)
+        return ""
+
+
+class ImageCache:
+    """
+    Data URLs keyed by image content: an in-memory LRU of max_entries
+    entries in front of an optional directory of <key>.txt files.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Encodings running on a pool, by key
+        self.running = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(data, name):
+        return f"{hashlib.sha256(data).hexdigest()}-{image_format(name)}-{KEY_VERSION}"
+
+    def lookup(self, key):
+        """The cached data URL for key, from memory or disk, or None."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        url = self.read_disk(key)
+        if url is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        self.remember(key, url)
+        return url
+
+    def remember(self, key, url):
+        with self.lock:
+            self.entries[key] = url
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def store(self, key, url):
+        # An image that could not be encoded ("") is tried again next time
+        # rather than staying blank, e.g. once Pillow can read it
+        if not url:
+            return
+        self.remember(key, url)
+        self.write_disk(key, url)
+
+    def data_url(self, data, name):
+        """Return the data URL for image bytes, encoding them only if no cache has it."""
+        key = self.key(data, name)
+        url = self.lookup(key)
+        if url is None:
+            url = encode_image(data, name)
+            self.store(key, url)
+        return url
+
+    def submit(self, data, name, pool=None):
+        """
+        Return a Future for the data URL of image bytes. A cache miss is encoded
+        on pool if one is given, else right away; images with the same content
+        share one encoding.
+        """
+        key = self.key(data, name)
+        url = self.lookup(key)
+        if url is not None or pool is None:
+            if url is None:
+                url = encode_image(data, name)
+                self.store(key, url)
+            future = Future()
+            future.set_result(url)
+            return future
+
+        with self.lock:
+            if key in self.running:
+                return self.running[key]
+            future = self.running[key] = pool.submit(encode_image, data, name)
+        future.add_done_callback(lambda done: self.finish(key, done))
+        return future
+
+    def finish(self, key, future):
+        with self.lock:
+            self.running.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.store(key, future.result())
+
+    def disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.disk_path(key), "r", encoding="ascii") as f:
+                # Older versions stored failed encodings as empty files
+                return f.read() or None
+        except OSError:
+            return None
+
+    def write_disk(self, key, url):
+        if not self.cache_dir:
+            return
+        try:
+            write_atomically(self.disk_path(key), url.encode("ascii"))
+        except OSError as e:
+            log.warning("Could not write image cache entry: %s", e)
+
+
+def write_atomically(path, data):
+    """Write bytes to path through a temporary file, so concurrent readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def decode_data_url(data_url):
+    """The (format, bytes) of an image data URL, or None if it is empty or not an image."""
+    header, _, payload = data_url.partition(",")
+    if not header.startswith("data:image/") or not payload:
+        return None
+    return header[len("data:image/"):].split(";")[0], base64.b64decode(payload)
+
+
+def save_image_blob(data_url, blob_dir):
+    """
+    Write the image of a base64 data URL to blob_dir as <sha256>.<format>,
+    unless the same image is already there, and return the file name. Returns
+    "" for an empty data URL.
+    """
+    image = decode_data_url(data_url)
+    if image is None:
+        return ""
+    format_ext, data = image
+    name = f"{hashlib.sha256(data).hexdigest()}.{format_ext}"
+    path = os.path.join(blob_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(blob_dir, exist_ok=True)
+        write_atomically(path, data)
+    return name
+
+
+class DocxMedia:
+    """
+    The images stored in a .docx archive (word/media/), read on demand from the
+    open ZipFile. Use as a context manager to close the archive.
+    """
+
+    def __init__(self, docx_file):
+        self.zip = zipfile.ZipFile(docx_file)
+        # File name -> archive member, as \includegraphics refers to images by file name
+        self.members = {}
+        for info in self.zip.infolist():
+            name = os.path.basename(info.filename)
+            if info.filename.startswith("word/media/") and name:
+                self.members[name] = info.filename
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.members)
+
+    def close(self):
+        self.zip.close()
+
+    def find(self, image_path):
+        """The archive member an \\includegraphics path refers to, or None if the document has no such image."""
+        return self.members.get(os.path.basename(image_path))
+
+    def read(self, member):
+        """The bytes of an archive member, or None if it cannot be read."""
+        try:
+            return self.zip.read(member)
+        except (KeyError, OSError, zipfile.BadZipFile) as e:
+            log.warning("Error reading image %s: %s", member, e)
+            return None
+
+
+def image_pool_size(workers, image_count):
+    """
+    Worker processes for transcoding image_count distinct images: workers (one
+    per CPU core if None), but no more than there are images. 1 means no pool.
+    """
+    return max(1, min(workers or os.cpu_count() or 1, image_count))
+
+
+def resolve_images(records, image_fields, media, workers=1, lookahead=IMAGE_LOOKAHEAD):
+    """
+    Yield records with the media members in image_fields (dict keys or list
+    indexes) replaced by data URLs, in order. The images are read from media
+    (a DocxMedia) when first referenced and the distinct ones are encoded
+    on a pool of worker processes while up to lookahead records are read
+    ahead.
+
+    The pool has at most workers processes (one per CPU core if None), and
+    no more than the distinct images the first lookahead records refer to
+    (see image_pool_size): the images of those records are only submitted
+    once they have been read, or the records have ended. With a single
+    image, or workers=1, the images are encoded in this process instead.
+    """
+    cache = default_cache()
+    metrics = current_metrics()
+    pool = None
+    # The images read before the pool is sized, member -> bytes; None once it is
+    unsubmitted = {} if (workers or os.cpu_count() or 1) > 1 else None
+    futures = {}
+    pending = deque()
+    read = 0
+
+    def start_pool():
+        nonlocal pool, unsubmitted
+        size = image_pool_size(workers, len(unsubmitted))
+        if size > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=size)
+        log.debug("Encoding %d distinct images on %d processes", len(unsubmitted), size)
+        for member, data in unsubmitted.items():
+            futures[member] = cache.submit(data, member, pool)
+        unsubmitted = None
+
+    def ready(record):
+        return all(record[field] in futures and futures[record[field]].done()
+                   for field in image_fields if record[field])
+
+    def fill(record):
+        for field in image_fields:
+            if record[field]:
+                record[field] = futures[record[field]].result()
+        return record
+
+    try:
+        for record in records:
+            for field in image_fields:
+                member = record[field]
+                if member and member not in futures and (unsubmitted is None or member not in unsubmitted):
+                    data = media.read(member)
+                    metrics.count("images")
+                    if data is None:
+                        futures[member] = Future()
+                        futures[member].set_result("")
+                    elif unsubmitted is not None:
+                        metrics.count("image_bytes", len(data))
+                        unsubmitted[member] = data
+                    else:
+                        metrics.count("image_bytes", len(data))
+                        futures[member] = cache.submit(data, member, pool)
+            pending.append(record)
+            read += 1
+            if unsubmitted is not None and read >= lookahead:
+                start_pool()
+            while pending and (len(pending) > lookahead or ready(pending[0])):
+                yield fill(pending.popleft())
+        if unsubmitted is not None:
+            start_pool()
+        while pending:
+            yield fill(pending.popleft())
+    finally:
+        if pool is not None:
+            for future in futures.values():
+                future.cancel()
+            pool.shutdown()
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The process-wide cache, using MCQ_IMAGE_CACHE_DIR as its directory if set."""
+    global _default_cache
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or None
+    if _default_cache is None or _default_cache.cache_dir != cache_dir:
+        _default_cache = ImageCache(cache_dir)
+    return _default_cache
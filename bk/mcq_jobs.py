@@ -0,0 +1,220 @@
+"""
+Asynchronous job queue for DOCX conversions.
+
+process_docx_file converts a document synchronously, from pandoc to the
+encoded images. JobQueue runs it as jobs on an asyncio event loop: submit()
+returns a job id at once, and at most `concurrency` jobs convert at a time
+while the others wait their turn, so a burst of uploads is accepted right
+away instead of each upload waiting for the ones before it.
+
+A job reads its document with pandoc as an asyncio subprocess
+(run_pandoc_ast_async), so waiting on pandoc takes no worker; the rest of the
+conversion (LaTeX, parsing, images) is CPU-bound and runs on a pool of
+`concurrency` worker processes. The native engine reads the document in the
+worker instead.
+
+A job is "queued", then "running", then "done" or "failed". status() returns
+its state (and its result once finished), wait() waits for its result, and
+watch() streams the state changes of every job. Finished jobs are kept until
+forget() is called for them; forgetting an unfinished job cancels it, and
+it finishes with {"error": "Conversion cancelled"}. A job converting on a
+worker process is stopped through a flag its worker checks after each
+question (one flag per concurrent job, shared with the workers), and keeps
+its place among the running jobs until its worker is free again.
+
+    async with JobQueue(concurrency=4) as jobs:
+        job_id = jobs.submit("chapter.docx", "10", "Math")
+        result = await jobs.wait(job_id)   # {"mcqs": [...], "metrics": {...}} or {"error": ...}
+
+serve() in docx_to_mcq.py exposes the queue over stdin and stdout.
+"""
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from docx_to_mcq import _serve_worker_init, conversion_error, process_docx_file
+from mcq_log import get_logger
+from pandoc_ast import run_pandoc_ast_async
+
+log = get_logger("jobs")
+
+# The queue's cancel flags, in a worker process
+_cancel_flags = None
+
+
+def _job_worker_init(log_level, cancel_flags):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    _serve_worker_init(log_level)
+
+
+def convert_job(docx_file, class_name, subject_name, engine, pandoc_output, slot):
+    """
+    Convert a job's document in a worker process. pandoc_output is pandoc's
+    JSON output, read by the event loop, or None for the worker to read the
+    document itself; slot is the index of the job's cancel flag.
+    """
+    ast = json.loads(pandoc_output) if pandoc_output is not None else None
+    # The jobs already use every worker, so each one encodes its images itself
+    return process_docx_file(docx_file, class_name, subject_name, engine, image_workers=1, ast=ast,
+                             cancelled=lambda: _cancel_flags[slot])
+
+
+class Job:
+    """A conversion submitted to a JobQueue."""
+
+    def __init__(self, job_id, docx_file, class_name, subject_name, engine):
+        self.id = job_id
+        self.docx_file = docx_file
+        self.class_name = class_name
+        self.subject_name = subject_name
+        self.engine = engine
+        self.state = "queued"
+        self.result = None
+        self.submitted = time.perf_counter()
+        self.finished = asyncio.Event()
+        self.task = None
+        # The index of its cancel flag while running, and whether a worker process is converting it
+        self.slot = None
+        self.converting = False
+
+
+class JobQueue:
+    """
+    Convert documents on the running event loop with at most concurrency
+    (default: one per CPU core) jobs at a time; see the module docstring.
+    """
+
+    def __init__(self, concurrency=None, engine="pandoc", log_level=None):
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.engine = engine
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.free_slots = list(range(self.concurrency))
+        self.cancel_flags = multiprocessing.Array("b", self.concurrency, lock=False)
+        self.watchers = set()
+        self.pool = ProcessPoolExecutor(max_workers=self.concurrency, initializer=_job_worker_init,
+                                        initargs=(log_level, self.cancel_flags))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def submit(self, docx_file, class_name="", subject_name="", engine=None):
+        """Queue the conversion of docx_file and return its job id; call it from the event loop."""
+        job = Job(next(self.job_ids), docx_file, class_name, subject_name, engine or self.engine)
+        self.jobs[job.id] = job
+        self.notify(job)
+        job.task = asyncio.create_task(self.run(job))
+        return job.id
+
+    def status(self, job_id):
+        """
+        {"id", "state"} of a job, with "position" (the number of jobs queued
+        before it) while queued and "result" once finished; None for an
+        unknown job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        status = {"id": job.id, "state": job.state}
+        if job.state == "queued":
+            status["position"] = sum(1 for other in self.jobs.values() if other.state == "queued" and other.id < job.id)
+        elif job.result is not None:
+            status["result"] = job.result
+        return status
+
+    async def wait(self, job_id):
+        """The result of a job once it has finished: {"mcqs", "metrics"} or {"error"}."""
+        job = self.jobs[job_id]
+        await job.finished.wait()
+        return job.result
+
+    def forget(self, job_id):
+        """
+        Drop a finished job's result. A job that has not finished is cancelled:
+        at once while queued or waiting for pandoc, at its next question while
+        a worker process converts it.
+        """
+        job = self.jobs.pop(job_id, None)
+        if job is None or job.finished.is_set():
+            return
+        if job.converting:
+            # Cancelling the task would not stop the worker, only free its slot while it is still busy
+            self.cancel_flags[job.slot] = 1
+        else:
+            job.task.cancel()
+
+    async def watch(self):
+        """Yield the status (see status()) of every job as its state changes, until the caller stops."""
+        changes = asyncio.Queue()
+        self.watchers.add(changes)
+        try:
+            while True:
+                yield await changes.get()
+        finally:
+            self.watchers.discard(changes)
+
+    def notify(self, job):
+        if self.watchers:
+            status = {"id": job.id, "state": job.state}
+            for changes in self.watchers:
+                changes.put_nowait(status)
+
+    def set_state(self, job, state):
+        job.state = state
+        self.notify(job)
+
+    async def run(self, job):
+        result = {"error": "Conversion cancelled"}
+        try:
+            async with self.slots:
+                job.slot = self.free_slots.pop()
+                self.cancel_flags[job.slot] = 0
+                try:
+                    self.set_state(job, "running")
+                    result = await self.convert(job)
+                finally:
+                    self.free_slots.append(job.slot)
+        finally:
+            job.result = result
+            job.finished.set()
+            self.set_state(job, "failed" if "error" in result else "done")
+
+    async def convert(self, job):
+        log.info("Converting %s (job %s)", job.docx_file, job.id)
+        pandoc_seconds = 0.0
+        pandoc_output = None
+        try:
+            if job.engine == "pandoc":
+                start = time.perf_counter()
+                pandoc_output = await run_pandoc_ast_async(job.docx_file)
+                pandoc_seconds = time.perf_counter() - start
+            loop = asyncio.get_running_loop()
+            job.converting = True
+            result = await loop.run_in_executor(self.pool, convert_job, job.docx_file, job.class_name,
+                                                job.subject_name, job.engine, pandoc_output, job.slot)
+        except Exception as e:
+            return conversion_error(e)
+
+        if "metrics" in result and pandoc_output is not None:
+            # pandoc ran here, not in the worker that measured the rest of the job
+            metrics = result["metrics"]
+            metrics["stages"]["pandoc"] = round(pandoc_seconds, 4)
+            metrics["seconds"] = round(metrics["seconds"] + pandoc_seconds, 4)
+            metrics["queued_seconds"] = round(max(0.0, time.perf_counter() - job.submitted - metrics["seconds"]), 4)
+        return result
+
+    async def close(self):
+        """Wait for the submitted jobs to finish and stop the worker processes."""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.pool.shutdown()
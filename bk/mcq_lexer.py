@@ -0,0 +1,281 @@
+"""
+Single-pass lexer for the MCQ blocks of the converted LaTeX.
+
+parse_latex_for_mcqs (in docx_to_mcq.py and the root MCQ2XLXS.py) used to
+search every block once per field (three topic patterns, difficulty, board,
+hint, explanation, each option twice, the answer twice) and then rewrite it
+with a dozen substitutions to get the bare question text. tokenize_block walks
+a block once and read_block builds all the fields from the tokens, so the cost
+grows with the length of the block rather than with the number of patterns.
+
+iter_mcq_blocks splits the .tex file into those blocks while reading it line
+by line, so only the question being read is held in memory.
+
+Token kinds:
+    text       plain text
+    math       a \\( ... \\) or \\[ ... \\] span, kept whole
+    image      \\includegraphics{...}, value is the image path
+    open       "[" or Pandoc's escaped "{[}" or bold "\\textbf{{[}}", value is
+               "topic", "hint", "explanation" or None
+    close      "]", "{]}" or "\\textbf{{]}}"
+    option     an option marker, value is (letter, separator) for "ক.", "ক)",
+               "ক।" or a bare "ক" followed by a space
+    answer     "উত্তর:" / "Answer:"
+    which      "নিচের কোনটি সঠিক?" (marks a Pattern 2 question)
+    statement  "i." / "ii." / "iii." in a Pattern 2 question
+"""
+import itertools
+from collections import namedtuple
+
+import mcq_patterns as patterns
+
+Token = namedtuple("Token", ["kind", "value", "raw"])
+
+OPEN_KINDS = {"টপিক": "topic", "topic": "topic", "hint": "hint", "explaination": "explanation"}
+
+
+def iter_serial_pieces(lines, serial_pattern):
+    """
+    Yield ("text", text) and ("serial", serial) pieces of the .tex lines in
+    document order: the same pieces re.split(serial_pattern) gives for the
+    non-blank lines stripped and joined with spaces, one line at a time.
+    """
+    first = True
+    # Whether the last serial ended the previous line, swallowing the joining space
+    joined = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if first:
+            text, pos = line, 0
+        else:
+            # A swallowed space cannot start another serial, so skip it
+            text, pos = " " + line, 1 if joined else 0
+        first = False
+        joined = False
+        while True:
+            match = serial_pattern.search(text, pos)
+            if match is None:
+                break
+            if match.start() > pos:
+                yield "text", text[pos:match.start()]
+            yield "serial", match.group(1)
+            pos = match.end()
+            joined = pos == len(text)
+        if pos < len(text):
+            yield "text", text[pos:]
+
+
+def choose_serial_pattern(latex_file):
+    """
+    Pick the serial pattern the .tex file is numbered with: Bengali digits if
+    at least two questions use them, then English digits, then either. Reads
+    only as far as the second matching serial.
+    """
+    for serial_pattern in (patterns.SERIAL_SPLIT_BENGALI, patterns.SERIAL_SPLIT_ENGLISH):
+        with open(latex_file, "r", encoding="utf-8") as f:
+            serials = (piece for piece in iter_serial_pieces(f, serial_pattern) if piece[0] == "serial")
+            if len(list(itertools.islice(serials, 2))) == 2:
+                return serial_pattern
+    return patterns.SERIAL_SPLIT_ANY
+
+
+def iter_mcq_blocks(lines, serial_pattern):
+    """
+    Yield (serial, block_text) for each question in the .tex lines as soon as
+    the next serial, or the end of the input, closes it. Text before the first
+    serial is skipped.
+    """
+    serial = None
+    parts = []
+    for kind, value in iter_serial_pieces(lines, serial_pattern):
+        if kind == "serial":
+            if serial is not None:
+                yield serial, "".join(parts)
+            serial = value
+            parts = []
+        elif serial is not None:
+            parts.append(value)
+    if serial is not None:
+        yield serial, "".join(parts)
+
+
+def tokenize_block(text):
+    """Split one MCQ block into a list of Tokens in a single left-to-right scan."""
+    tokens = []
+    pos = 0
+    for match in patterns.MCQ_TOKEN.finditer(text):
+        start = match.start()
+        if start > pos:
+            tokens.append(Token("text", text[pos:start], text[pos:start]))
+        kind = match.lastgroup
+        raw = match.group()
+        if kind == "image":
+            tokens.append(Token("image", match.group("image_path"), raw))
+        elif kind == "open":
+            label = match.group("open_label")
+            tokens.append(Token("open", OPEN_KINDS[label.lower()] if label else None, raw))
+        elif kind == "option":
+            tokens.append(Token("option", (match.group("option_letter"), raw[1]), raw))
+        else:
+            tokens.append(Token(kind, raw, raw))
+        pos = match.end()
+    if pos < len(text):
+        tokens.append(Token("text", text[pos:], text[pos:]))
+    return tokens
+
+
+def classify_tag(content):
+    """Return the field a bracketed tag such as "[Easy]" or "[Dhaka Board-2019]" belongs to, or None."""
+    if patterns.DIFFICULTY_TAG.match(content):
+        return "difficulty"
+    if patterns.BOARD_TAG.search(content):
+        return "board"
+    if patterns.TOPIC_TAG.search(content):
+        return "alt_topic"
+    return None
+
+
+def choose_option_markers(tokens):
+    """
+    Pick the token index of each option letter: the first "ক." marker, or the
+    first looser "ক)" / "ক।" / "ক" marker when the block has no "ক." for that letter.
+    """
+    chosen = {}
+    for index, token in enumerate(tokens):
+        if token.kind != "option":
+            continue
+        letter, separator = token.value
+        if letter not in chosen or (separator == "." and tokens[chosen[letter]].value[1] != "."):
+            chosen[letter] = index
+    return set(chosen.values())
+
+
+def read_block(text):
+    """
+    Build the fields of one MCQ block (the text after its serial number).
+
+    Returns a dict with the cleaned "question", the "topic", "difficulty",
+    "board", "hint", "explanation" and "answer" text, the "options" found
+    (letter -> text), the "images" referenced anywhere in the block in
+    document order, the Pattern 2 "statements" and "is_pattern2".
+    Image references are dropped from all text fields.
+    """
+    tokens = tokenize_block(text)
+    option_markers = choose_option_markers(tokens)
+
+    parts = {"question": [], "answer": []}
+    options = {}
+    tags = {}
+    images = []
+    statements = []
+    is_pattern2 = False
+
+    # Lists the current text goes to; usually one
+    targets = (parts["question"],)
+    tag_kind = None
+    tag_open = None
+    tag_parts = None
+
+    def close_tag(close):
+        nonlocal targets
+        content = "".join(tag_parts).strip()
+        kind = tag_kind or (classify_tag(content) if close is not None else None)
+        if kind is None:
+            # Not a field tag: keep the brackets as text where they were
+            for target in targets:
+                target.extend([tag_open] + tag_parts + ([close] if close is not None else []))
+            return
+        # A field tag ends the option before it
+        tags.setdefault(kind, content)
+        targets = (parts["question"],)
+
+    for index, token in enumerate(tokens):
+        kind = token.kind
+        if kind == "image":
+            images.append(token.value)
+            continue
+        if kind == "which":
+            is_pattern2 = True
+
+        if tag_parts is not None:
+            if kind == "close":
+                close_tag(token.raw)
+                tag_parts = None
+            else:
+                tag_parts.append(token.raw)
+            continue
+
+        if kind == "open":
+            if targets[0] is parts["answer"]:
+                # The answer runs up to the next bracket
+                targets = (parts["question"],)
+            tag_kind = token.value
+            tag_open = token.raw
+            tag_parts = []
+        elif kind == "option" and index in option_markers:
+            letter, separator = token.value
+            options[letter] = []
+            if separator in ".)":
+                targets = (options[letter],)
+            else:
+                # A bare letter may just end a word, so its text also stays in the question
+                parts["question"].append(token.raw)
+                targets = (options[letter], parts["question"])
+        elif kind == "answer":
+            targets = (parts["answer"],)
+        elif kind == "which" and targets[0] is parts["question"]:
+            continue
+        else:
+            if kind == "statement":
+                statements.append(token.value)
+            for target in targets:
+                target.append(token.raw)
+
+    if tag_parts is not None:
+        # Unterminated tag at the end of the block
+        close_tag(None)
+
+    question = "".join(parts["question"])
+    if is_pattern2:
+        # For pattern 2, preserve newlines but replace multiple spaces with single space
+        question = patterns.SPACES.sub(' ', question).strip()
+        question = patterns.EXCESS_NEWLINES.sub('\n\n', question)
+    else:
+        question = patterns.WHITESPACE.sub(' ', question).strip()
+
+    return {
+        "question": question,
+        "topic": tags.get("topic") or tags.get("alt_topic", ""),
+        "difficulty": tags.get("difficulty", ""),
+        "board": tags.get("board", ""),
+        "hint": tags.get("hint", ""),
+        "explanation": tags.get("explanation", ""),
+        "answer": "".join(parts["answer"]).strip(),
+        "options": {letter: "".join(text_parts).strip() for letter, text_parts in options.items()},
+        "images": images,
+        "statements": statements,
+        "is_pattern2": is_pattern2,
+    }
+
+
+# Option letters of a block -> the answer letters of the sheet and the questions table
+ANSWER_LETTERS = {"ক": "A", "খ": "B", "গ": "C", "ঘ": "D"}
+
+
+def standardize_answer(answer, options):
+    """
+    The answer as "A" to "D" when it is an option letter (English or Bengali)
+    or the text of one of the options ({"ক": text, ...}, compared as they
+    are); otherwise the answer text, stripped.
+    """
+    clean_answer = answer.strip()
+    if clean_answer in ("A", "B", "C", "D"):
+        return clean_answer
+    if clean_answer in ANSWER_LETTERS:
+        return ANSWER_LETTERS[clean_answer]
+    for option_letter, option_text in options.items():
+        if option_text and clean_answer == option_text.strip():
+            return ANSWER_LETTERS.get(option_letter, option_letter)
+    return clean_answer
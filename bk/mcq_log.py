@@ -0,0 +1,54 @@
+"""
+Logging for the MCQ converters.
+
+The parsers used to print several lines for every question they read, to
+stdout, where they were mixed with the converters' output (the JSON of
+docx_to_mcq.py, the protocol lines of its --serve mode). They now log through
+the "mcq" logger with lazy %-formatting, so messages below the configured
+level are never formatted:
+
+    DEBUG    per-question detail ("Processing MCQ ...", "Found option ...")
+    INFO     per-document progress
+    WARNING  skipped questions, unreadable images and the like
+    ERROR    failed conversions
+
+configure_logging sends them to stderr; stdout only carries output.
+The level comes from the converters' --log-level option or the
+MCQ_LOG_LEVEL environment variable, and is INFO by default.
+"""
+import logging
+import os
+import sys
+
+LOG_LEVEL_ENV = "MCQ_LOG_LEVEL"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+DEFAULT_LOG_LEVEL = "INFO"
+
+ROOT_LOGGER = "mcq"
+
+
+def get_logger(name):
+    """The logger for a converter module, e.g. get_logger("lexer") -> "mcq.lexer"."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def configure_logging(level=None):
+    """
+    Send the converters' log messages at level (a LOG_LEVELS name; default:
+    $MCQ_LOG_LEVEL, else INFO) and above to stderr. Safe to call again, e.g.
+    in worker processes, to change the level. Returns the level name.
+    """
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LOG_LEVEL).upper()
+    if level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level {level!r}; expected one of {', '.join(LOG_LEVELS)}")
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+        logger.addHandler(handler)
+    # Inherited by worker processes, whose configure_logging() call picks it up
+    os.environ[LOG_LEVEL_ENV] = level
+    return level
@@ -0,0 +1,166 @@
+"""
+Per-document timings and counters for the MCQ converters.
+
+A conversion streams: the writer pulls records from the image stage, which
+pulls them from the parser, so the stages of a document interleave. Metrics
+therefore times stages exclusively: entering a stage pauses the one it was
+entered from, and a stage entered many times (once per question, once per
+record pulled) accumulates. The stages are
+
+    read     reading the document (the native reader, or pandoc's AST)
+    pandoc   the pandoc subprocess, when pandoc reads the document
+    latex    rendering the AST to the .tex file
+    tables   rendering the tables to HTML (desktop converter)
+    parse    splitting and reading the question blocks
+    cleanup  cleaning up the LaTeX of the fields
+    images   reading, encoding (or waiting on the pool encoding) the images
+    write    writing the output (workbook, JSON, database)
+
+and the report (Metrics.report) adds counters such as the number of questions
+and the bytes of images read. Time spent outside any stage is reported as
+"other".
+
+collect_metrics makes a Metrics current for the duration of a conversion, so
+the converter modules reach it through current_metrics() rather than an extra
+argument on every function; outside collect_metrics, current_metrics()
+returns a no-op instance. When MCQ_PROFILE_DIR is set (the converters'
+--profile option sets it), collect_metrics also profiles the conversion with
+cProfile and writes <document name>.prof there, for pstats or snakeviz. Only
+this process is profiled, not the image pool workers.
+"""
+import contextlib
+import os
+import time
+
+PROFILE_DIR_ENV = "MCQ_PROFILE_DIR"
+
+
+class Metrics:
+    """Exclusive stage timings and counters of one document."""
+
+    def __init__(self, document="", **info):
+        self.document = document
+        self.info = info
+        self.seconds = {}
+        self.counters = {}
+        # [stage, time it was entered or last resumed]
+        self.stack = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self.profiler = None
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self.stack:
+            parent = self.stack[-1]
+            self.seconds[parent[0]] = self.seconds.get(parent[0], 0.0) + now - parent[1]
+        self.stack.append([name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        name, start = self.stack.pop()
+        self.seconds[name] = self.seconds.get(name, 0.0) + now - start
+        if self.stack:
+            self.stack[-1][1] = now
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Attribute the time spent in the with block to stage name."""
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    def iterate(self, name, iterable):
+        """Yield the items of iterable, attributing the time spent producing each one to stage name."""
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        """Stop the clock (and the profiler); later calls do nothing."""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            if self.profiler is not None:
+                self.profiler.disable()
+
+    def report(self):
+        """The metrics as a JSON-serializable dict; finishes the measurement."""
+        self.finish()
+        elapsed = self.finished - self.started
+        stages = {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+        stages["other"] = round(max(0.0, elapsed - sum(self.seconds.values())), 4)
+        questions = self.counters.get("questions", 0)
+        return {
+            "document": self.document,
+            **self.info,
+            "seconds": round(elapsed, 4),
+            "stages": stages,
+            "counters": dict(self.counters),
+            "questions_per_second": round(questions / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+class NullMetrics:
+    """The Metrics interface doing nothing, used outside collect_metrics."""
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def count(self, name, amount=1):
+        pass
+
+
+_null_metrics = NullMetrics()
+_current_metrics = _null_metrics
+
+
+def current_metrics():
+    """The Metrics of the conversion in progress, or a no-op instance."""
+    return _current_metrics
+
+
+@contextlib.contextmanager
+def collect_metrics(document, **info):
+    """
+    Make a new Metrics for document current in the with block and yield it;
+    info (e.g. engine="native") is copied into its report. Profiles the block
+    when MCQ_PROFILE_DIR is set (see the module docstring).
+    """
+    global _current_metrics
+    metrics = Metrics(document, **info)
+    try:
+        metrics.count("docx_bytes", os.path.getsize(document))
+    except OSError:
+        pass
+
+    profile_dir = os.environ.get(PROFILE_DIR_ENV)
+    if profile_dir:
+        import cProfile
+        metrics.profiler = cProfile.Profile()
+        metrics.profiler.enable()
+
+    previous, _current_metrics = _current_metrics, metrics
+    try:
+        yield metrics
+    finally:
+        _current_metrics = previous
+        metrics.finish()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(document))[0] or "document"
+            metrics.profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
@@ -0,0 +1,97 @@
+"""
+Regular expressions used by the MCQ parsers (docx_to_mcq.py and the root
+MCQ2XLXS.py), compiled once at import.
+
+The parsers used to compile or look up these patterns inside their per-MCQ
+loops (the option patterns were rebuilt for every letter of every question).
+Keeping them here means each one is compiled a single time per process and
+both parsers are guaranteed to use the same expressions.
+"""
+import re
+
+
+OPTION_LETTERS = ["ক", "খ", "গ", "ঘ"]
+
+# ---------------------------------------------------------------------
+# Splitting the document into MCQ blocks
+# ---------------------------------------------------------------------
+
+BENGALI_DIGITS = re.compile(r'[০-৯]+')
+ENGLISH_DIGITS = re.compile(r'\d+')
+
+# "Serial." at the start of a question, with various separators
+SERIAL_SPLIT_BENGALI = re.compile(r'(?:^|\s)([০-৯]+)[\.|\,|\)|।|:|\\]?[\s]*')
+SERIAL_SPLIT_ENGLISH = re.compile(r'(?:^|\s)(\d+)[\.|\,|\)|।|:|\\]?[\s]*')
+SERIAL_SPLIT_ANY = re.compile(r'(?:^|\s)([০-৯\d]+)[\.|\,|\)|।|:|\\]?[\s]*')
+
+# ---------------------------------------------------------------------
+# Tokens inside an MCQ block (mcq_lexer.py)
+# ---------------------------------------------------------------------
+
+MCQ_TOKEN = re.compile(r"""
+    (?P<math>\\\(.*?\\\)|\\\[.*?\\\])                          # \( ... \) and \[ ... \] spans
+  | (?P<image>\\includegraphics(?:\[[^\]]*\])?\{(?P<image_path>[^}]*)\})
+  | (?P<open>(?:\[|\{\[\}|\\textbf\{\{\[\}\})                 # "[", or Pandoc's escaped {[} and bold \textbf{{[}}
+        (?:(?P<open_label>টপিক(?=[:ঃ]|\\textbf\{[:ঃ]\})|(?i:topic)(?=:)|Hint(?=:)|Explaination(?=:))
+           (?:[:ঃ]|\\textbf\{[:ঃ]\})\s+)?)
+  | (?P<close>\]|\{\]\}|\\textbf\{\{\]\}\})
+  | (?P<option>(?P<option_letter>[ক-ঘ])(?:\.(?=\s)|[\)।]|\s))  # "ক." or the looser "ক)" / "ক"
+  | (?P<answer>(?:উত্তর|[Aa]nswer)[:ঃ]\s+)
+  | (?P<which>নিচের\s+কোনটি\s+সঠিক\s*\?)                       # marks a Pattern 2 question
+  | (?<!\S)(?P<statement>i{1,3}\.)(?=\s)                       # Pattern 2 statements
+""", re.VERBOSE | re.DOTALL)
+
+# Bracketed tags: "[Easy]", "[Medium]", "[Hard]" or any tag mentioning a difficulty,
+# then a board, institute or reference, then a topic, subject or chapter
+DIFFICULTY_TAG = re.compile(r'(?:Easy|Medium|Hard)\Z|.*?Difficulty', re.IGNORECASE | re.DOTALL)
+BOARD_TAG = re.compile(r'Board|Institute|Reference', re.IGNORECASE)
+TOPIC_TAG = re.compile(r'Topic|Subject|Chapter', re.IGNORECASE)
+
+SPACES = re.compile(r' +')
+EXCESS_NEWLINES = re.compile(r'\n{3,}')
+WHITESPACE = re.compile(r'\s+')
+
+# ---------------------------------------------------------------------
+# LaTeX clean-up (clean_latex_commands)
+# ---------------------------------------------------------------------
+
+MATH_PAREN_DELIMITER = re.compile(r'\\(\(|\))')
+REPEATED_DOLLARS = re.compile(r'\${2,}')
+# $\left.\ \begin{matrix}-\frac{1}{2}x+y&=-1\\x-2y&=2\\\end{matrix}\right\}$
+BRACE_EQUATION_SYSTEM = re.compile(r'\\left\.\s*\\begin\{matrix\}(.*?)\\end\{matrix\}\\right\\}', re.DOTALL)
+MATRIX_EQUATION_SYSTEM = re.compile(r'\\left\\{.*?\\begin\{(matrix|array).*?\}(.*?)\\end\{\1.*?\}', re.DOTALL)
+EQUATION_ENVIRONMENT = re.compile(r'\\begin\{(equation|align|gather|eqnarray)\*?\}(.*?)\\end\{\1\*?\}', re.DOTALL)
+SPACE_AFTER_DOLLAR = re.compile(r'\$\s+')
+SPACE_BEFORE_DOLLAR = re.compile(r'\s+\$')
+# $\frac{a_{1}}{a_{2}} = \frac{b_{1}}{b_{2}} $\neq$ \frac{c_{1}}{c_{2}}$
+SPLIT_NEQ = re.compile(r'\$([^$]*?) \$\\neq\$ ([^$]*?)\$')
+TEXTBF = re.compile(r'\\textbf\{([^}]*?)\}')
+TEXTIT = re.compile(r'\\textit\{([^}]*?)\}')
+EMPH = re.compile(r'\\emph\{([^}]*?)\}')
+BRACKETED_TEXT = re.compile(r'\{\[}([^{}\[\]]*?)\{\]}')
+# Historical pattern: "\t" is a tab here, not a backslash-t; kept as-is so output does not change
+TAB_TEXTBF_BRACES = re.compile(r'\textbf\{\{([^{}]*?)\}\}')
+# \textbf{{[}}টপিক\textbf{:} ... \textbf{{]}}
+TEXTBF_BRACKETS = re.compile(r'\\textbf\{\{\[}}(.*?)\\textbf\{\{\]}}')
+TEXTBF_COLON = re.compile(r'\\textbf\{:\}')
+TEXTBF_QUESTION = re.compile(r'\\textbf\{\?}')
+ESCAPED_BRACKETS = re.compile(r'\{\\\[}(.*?)\{\\\]}')
+BRACED_COMMAND = re.compile(r'\{\\(.*?)\\}')
+SLASHES_BEFORE_DOLLAR = re.compile(r'[\/\\]+\s*\$')
+SLASHES_AFTER_DOLLAR = re.compile(r'\$\s*[\/\\]+')
+INLINE_EQUATION = re.compile(r'(\$[^$]+?\$)')
+REPEATED_WHITESPACE = re.compile(r'\s{2,}')
+
+# ---------------------------------------------------------------------
+# Equation helpers used only by MCQ2XLXS.py
+# ---------------------------------------------------------------------
+
+# $...$, $$...$$ (any number of dollars) and {[}...{]} blocks in parse_bracket_tokens
+DOLLAR_EQUATION = re.compile(r'(\$+)(.*?)(\1)', re.DOTALL)
+BRACKET_TOKEN = re.compile(r'\{\[}(.*?)\{]}')
+# $...$ or $$...$$ for the Unicode conversion
+UNICODE_EQUATION = re.compile(r'(\${1,2})(.*?)(\1)', re.DOTALL)
+SUPERSCRIPT = re.compile(r'([A-Za-z0-9])\^([A-Za-z0-9])')
+SUBSCRIPT = re.compile(r'([A-Za-z0-9])_([A-Za-z0-9])')
+# Single-dollar equations in ensure_latex_escaped
+DOLLAR_CONTENT = re.compile(r'\$(.*?)\$')
@@ -0,0 +1,412 @@
+"""
+Helpers for working with pandoc's JSON AST.
+
+Pandoc is run once per document with ``-t json``; the LaTeX text read by the
+MCQ parsers and the HTML tables are both rendered from that AST in Python,
+instead of running pandoc separately for every output format.
+
+The LaTeX renderer follows pandoc's own LaTeX writer for the elements that
+appear in question banks (text escaping, bold/italic, math, images, line
+breaks), since the MCQ parsers were written against that output. Tables are
+rendered as a plain tabular instead of pandoc's longtable preamble.
+"""
+import html
+import json
+import subprocess
+
+from mcq_log import get_logger
+from mcq_metrics import current_metrics
+from pandoc_cache import default_pandoc_cache
+
+log = get_logger("pandoc_ast")
+
+
+# Characters pandoc's LaTeX writer replaces with a fixed string
+LATEX_ESCAPES = {
+    "{": "\\{",
+    "}": "\\}",
+    "$": "\\$",
+    "%": "\\%",
+    "&": "\\&",
+    "_": "\\_",
+    "#": "\\#",
+    "^": "\\^{}",
+    "[": "{[}",
+    "]": "{]}",
+    "\u00a0": "~",
+    "\u2013": "--",
+    "\u2014": "---",
+    "\u2018": "`",
+    "\u2019": "'",
+    "\u201c": "``",
+    "\u201d": "''",
+}
+
+# Characters replaced with a control sequence, which needs a terminator
+# depending on what follows it (see escape_latex)
+LATEX_COMMAND_ESCAPES = {
+    "\\": "\\textbackslash",
+    "~": "\\textasciitilde",
+    "|": "\\textbar",
+    "<": "\\textless",
+    ">": "\\textgreater",
+    "'": "\\textquotesingle",
+    "\u2026": "\\ldots",
+}
+
+HEADER_COMMANDS = ["section", "subsection", "subsubsection", "paragraph", "subparagraph"]
+
+TABLE_ALIGNMENTS = {"AlignLeft": "l", "AlignRight": "r", "AlignCenter": "c", "AlignDefault": "l"}
+HTML_ALIGNMENTS = {"AlignLeft": "left", "AlignRight": "right", "AlignCenter": "center"}
+
+# Arguments of the pandoc command after the document
+PANDOC_ARGS = ["-t", "json"]
+
+
+def run_pandoc_ast(docx_file):
+    """
+    Run pandoc once on docx_file and return its JSON AST as a dict. With a
+    pandoc cache configured (see pandoc_cache.py), the output of a previous
+    run on an identical document is reused instead.
+    """
+    cmd = ["pandoc", docx_file, *PANDOC_ARGS]
+    metrics = current_metrics()
+    cache = default_pandoc_cache()
+    with metrics.stage("pandoc"):
+        if cache is not None:
+            key = cache.key(docx_file, PANDOC_ARGS)
+            output = cache.lookup(key)
+            if output is not None:
+                log.info("Reusing the cached pandoc output for %s", docx_file)
+                metrics.count("pandoc_cache_hits")
+                return json.loads(output)
+
+        log.info("Running pandoc command: %s", " ".join(cmd))
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True, encoding="utf-8")
+        if cache is not None:
+            cache.store(key, result.stdout)
+    return json.loads(result.stdout)
+
+
+async def run_pandoc_ast_async(docx_file):
+    """
+    run_pandoc_ast for asyncio code: pandoc runs as an asyncio subprocess, so
+    the event loop carries on while it reads the document, and the pandoc
+    cache is used the same way. Returns pandoc's JSON output as text, not
+    parsed, to be handed to a worker process. Raises
+    subprocess.CalledProcessError if pandoc fails; cancelling the call kills
+    pandoc.
+    """
+    import asyncio
+
+    cmd = ["pandoc", docx_file, *PANDOC_ARGS]
+    cache = default_pandoc_cache()
+    if cache is not None:
+        # Hashing the document reads all of it; keep that off the event loop
+        key = await asyncio.to_thread(cache.key, docx_file, PANDOC_ARGS)
+        output = await asyncio.to_thread(cache.lookup, key)
+        if output is not None:
+            log.info("Reusing the cached pandoc output for %s", docx_file)
+            return output
+
+    log.info("Running pandoc command: %s", " ".join(cmd))
+    process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        # Cancelling the job must not leave pandoc running
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout.decode("utf-8", "replace"),
+                                            stderr.decode("utf-8", "replace"))
+    output = stdout.decode("utf-8")
+    if cache is not None:
+        await asyncio.to_thread(cache.store, key, output)
+    return output
+
+
+def escape_latex(text):
+    """Escape a pandoc Str the way pandoc's LaTeX writer does."""
+    out = []
+    for i, ch in enumerate(text):
+        nxt = text[i + 1] if i + 1 < len(text) else ""
+        if ch in LATEX_COMMAND_ESCAPES:
+            command = LATEX_COMMAND_ESCAPES[ch]
+            if nxt.isalpha():
+                out.append(command + " ")
+            elif not nxt or nxt.isspace():
+                out.append(command + "{}")
+            else:
+                out.append(command)
+        elif ch in LATEX_ESCAPES:
+            out.append(LATEX_ESCAPES[ch])
+        elif ch == "-" and nxt == "-":
+            out.append("-\\/")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def table_rows(table):
+    """
+    Return every row of a pandoc Table node (head, bodies, foot) as
+    (is_header, cells) pairs.
+    """
+    _attr, _caption, _colspecs, head, bodies, foot = table["c"]
+    rows = [(True, row[1]) for row in head[1]]
+    for body in bodies:
+        _body_attr, _row_head_columns, head_rows, body_rows = body
+        rows.extend((False, row[1]) for row in head_rows + body_rows)
+    rows.extend((False, row[1]) for row in foot[1])
+    return rows
+
+
+class LatexRenderer:
+    """Render pandoc AST nodes to the LaTeX text the MCQ parsers expect."""
+
+    def __init__(self):
+        # Display math inside table cells is written inline, like pandoc does
+        self.in_table = False
+
+    def inlines(self, inlines):
+        return "".join(self.inline(node) for node in inlines)
+
+    def inline(self, node):
+        kind = node["t"]
+        content = node.get("c")
+
+        if kind == "Str":
+            return escape_latex(content)
+        if kind == "Space":
+            return " "
+        if kind == "SoftBreak":
+            return "\n"
+        if kind == "LineBreak":
+            return "\\\\\n"
+        if kind == "Math":
+            math_type, tex = content
+            if math_type["t"] == "DisplayMath" and not self.in_table:
+                return f"\\[{tex}\\]"
+            return f"\\({tex}\\)"
+        if kind == "Image":
+            _attr, _alt, (src, _title) = content
+            return f"\\includegraphics{{{src}}}"
+        if kind == "Strong":
+            return f"\\textbf{{{self.inlines(content)}}}"
+        if kind == "Emph":
+            return f"\\emph{{{self.inlines(content)}}}"
+        if kind == "Underline":
+            return f"\\ul{{{self.inlines(content)}}}"
+        if kind == "Strikeout":
+            return f"\\st{{{self.inlines(content)}}}"
+        if kind == "Superscript":
+            return f"\\textsuperscript{{{self.inlines(content)}}}"
+        if kind == "Subscript":
+            return f"\\textsubscript{{{self.inlines(content)}}}"
+        if kind == "SmallCaps":
+            return f"\\textsc{{{self.inlines(content)}}}"
+        if kind == "Quoted":
+            quote_type, inner = content
+            if quote_type["t"] == "DoubleQuote":
+                return f"``{self.inlines(inner)}''"
+            return f"`{self.inlines(inner)}'"
+        if kind == "Code":
+            return f"\\texttt{{{escape_latex(content[1])}}}"
+        if kind == "RawInline":
+            fmt, text = content
+            return text if fmt in ("latex", "tex") else ""
+        if kind == "Link":
+            _attr, inner, (url, _title) = content
+            return f"\\href{{{url}}}{{{self.inlines(inner)}}}"
+        if kind == "Note":
+            return f"\\footnote{{{self.blocks(content).strip()}}}"
+        if kind == "Cite":
+            return self.inlines(content[1])
+        if kind == "Span":
+            return self.inlines(content[1])
+        return ""
+
+    def blocks(self, blocks):
+        rendered = (self.block(node) for node in blocks)
+        return "\n\n".join(text for text in rendered if text)
+
+    def block(self, node):
+        kind = node["t"]
+        content = node.get("c")
+
+        if kind in ("Para", "Plain"):
+            return self.inlines(content)
+        if kind == "LineBlock":
+            return "\\\\\n".join(self.inlines(line) for line in content)
+        if kind == "Header":
+            level, _attr, inner = content
+            command = HEADER_COMMANDS[min(level, len(HEADER_COMMANDS)) - 1]
+            return f"\\{command}{{{self.inlines(inner)}}}"
+        if kind == "CodeBlock":
+            return f"\\begin{{verbatim}}\n{content[1]}\n\\end{{verbatim}}"
+        if kind == "RawBlock":
+            fmt, text = content
+            return text if fmt in ("latex", "tex") else ""
+        if kind == "BlockQuote":
+            return f"\\begin{{quote}}\n{self.blocks(content)}\n\\end{{quote}}"
+        if kind in ("BulletList", "OrderedList"):
+            environment = "itemize" if kind == "BulletList" else "enumerate"
+            items = content if kind == "BulletList" else content[1]
+            body = "\n".join(f"\\item\n  {self.blocks(item)}" for item in items)
+            return f"\\begin{{{environment}}}\n{body}\n\\end{{{environment}}}"
+        if kind == "DefinitionList":
+            items = []
+            for term, definitions in content:
+                text = " ".join(self.blocks(definition) for definition in definitions)
+                items.append(f"\\item[{self.inlines(term)}] {text}")
+            return "\\begin{description}\n" + "\n".join(items) + "\n\\end{description}"
+        if kind == "HorizontalRule":
+            return "\\begin{center}\\rule{0.5\\linewidth}{0.5pt}\\end{center}"
+        if kind == "Table":
+            return self.table(node)
+        if kind == "Figure":
+            return self.blocks(content[2])
+        if kind == "Div":
+            return self.blocks(content[1])
+        return ""
+
+    def table(self, node):
+        colspecs = node["c"][2]
+        alignments = "".join(TABLE_ALIGNMENTS.get(align["t"], "l") for align, _width in colspecs)
+
+        self.in_table = True
+        try:
+            lines = []
+            for _is_header, cells in table_rows(node):
+                rendered = [" ".join(self.blocks(cell[4]).split()) for cell in cells]
+                lines.append(" & ".join(rendered) + " \\\\")
+        finally:
+            self.in_table = False
+
+        return f"\\begin{{tabular}}{{{alignments}}}\n" + "\n".join(lines) + "\n\\end{tabular}"
+
+
+def ast_to_latex(ast):
+    """Render a pandoc JSON AST to LaTeX text for the MCQ parsers."""
+    return LatexRenderer().blocks(ast["blocks"]) + "\n"
+
+
+def inlines_to_html(inlines):
+    """Render pandoc inlines to HTML for table cells."""
+    out = []
+    for node in inlines:
+        kind = node["t"]
+        content = node.get("c")
+
+        if kind == "Str":
+            out.append(html.escape(content, quote=False))
+        elif kind == "Space":
+            out.append(" ")
+        elif kind == "SoftBreak":
+            out.append("\n")
+        elif kind == "LineBreak":
+            out.append("<br />")
+        elif kind == "Math":
+            math_type, tex = content
+            if math_type["t"] == "DisplayMath":
+                out.append(f'<span class="math display">\\[{html.escape(tex, quote=False)}\\]</span>')
+            else:
+                out.append(f'<span class="math inline">\\({html.escape(tex, quote=False)}\\)</span>')
+        elif kind == "Image":
+            _attr, alt, (src, _title) = content
+            alt_text = html.escape("".join(n.get("c", " ") if n["t"] == "Str" else " " for n in alt))
+            out.append(f'<img src="{html.escape(src)}" alt="{alt_text}" />')
+        elif kind == "Strong":
+            out.append(f"<strong>{inlines_to_html(content)}</strong>")
+        elif kind == "Emph":
+            out.append(f"<em>{inlines_to_html(content)}</em>")
+        elif kind == "Underline":
+            out.append(f"<u>{inlines_to_html(content)}</u>")
+        elif kind == "Strikeout":
+            out.append(f"<del>{inlines_to_html(content)}</del>")
+        elif kind == "Superscript":
+            out.append(f"<sup>{inlines_to_html(content)}</sup>")
+        elif kind == "Subscript":
+            out.append(f"<sub>{inlines_to_html(content)}</sub>")
+        elif kind == "Code":
+            out.append(f"<code>{html.escape(content[1], quote=False)}</code>")
+        elif kind == "Quoted":
+            quote_type, inner = content
+            left, right = ("\u201c", "\u201d") if quote_type["t"] == "DoubleQuote" else ("\u2018", "\u2019")
+            out.append(f"{left}{inlines_to_html(inner)}{right}")
+        elif kind == "Link":
+            _attr, inner, (url, _title) = content
+            out.append(f'<a href="{html.escape(url)}">{inlines_to_html(inner)}</a>')
+        elif kind in ("SmallCaps", "Note"):
+            continue
+        elif kind in ("Span", "Cite"):
+            out.append(inlines_to_html(content[1]))
+    return "".join(out)
+
+
+def blocks_to_html(blocks):
+    """Render the blocks of a table cell to HTML."""
+    out = []
+    for node in blocks:
+        kind = node["t"]
+        content = node.get("c")
+        if kind == "Plain":
+            out.append(inlines_to_html(content))
+        elif kind == "Para":
+            out.append(f"<p>{inlines_to_html(content)}</p>")
+        elif kind == "LineBlock":
+            out.append("<br />".join(inlines_to_html(line) for line in content))
+        elif kind == "Div":
+            out.append(blocks_to_html(content[1]))
+        elif kind == "Table":
+            out.append(f"<table>{table_to_html(node)}</table>")
+    return "".join(out)
+
+
+def table_to_html(table):
+    """Render the inside of a pandoc Table node (everything between <table> and </table>)."""
+    head, body = [], []
+    for is_header, cells in table_rows(table):
+        tag = "th" if is_header else "td"
+        rendered = []
+        for cell in cells:
+            _attr, align, rowspan, colspan, blocks = cell
+            attrs = ""
+            if align["t"] in HTML_ALIGNMENTS:
+                attrs += f' style="text-align: {HTML_ALIGNMENTS[align["t"]]};"'
+            if rowspan > 1:
+                attrs += f' rowspan="{rowspan}"'
+            if colspan > 1:
+                attrs += f' colspan="{colspan}"'
+            rendered.append(f"<{tag}{attrs}>{blocks_to_html(blocks)}</{tag}>")
+        (head if is_header else body).append(rendered)
+
+    parts = []
+    if head:
+        parts.append("<thead>" + "".join(f'<tr class="header">{"".join(row)}</tr>' for row in head) + "</thead>")
+    if body:
+        rows = [f'<tr class="{"odd" if i % 2 == 0 else "even"}">{"".join(row)}</tr>' for i, row in enumerate(body)]
+        parts.append("<tbody>" + "".join(rows) + "</tbody>")
+    return "\n".join(parts)
+
+
+def find_tables(blocks):
+    """Yield every Table node in a list of blocks, including nested ones."""
+    for node in blocks:
+        kind = node["t"]
+        if kind == "Table":
+            yield node
+        elif kind in ("BlockQuote", "Div", "Figure"):
+            yield from find_tables(node["c"] if kind == "BlockQuote" else node["c"][-1])
+        elif kind in ("BulletList", "OrderedList"):
+            items = node["c"] if kind == "BulletList" else node["c"][1]
+            for item in items:
+                yield from find_tables(item)
+
+
+def ast_tables_to_html(ast):
+    """Return the inner HTML of every table in the document, in document order."""
+    return [table_to_html(table) for table in find_tables(ast["blocks"])]
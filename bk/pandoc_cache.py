@@ -0,0 +1,122 @@
+"""
+On-disk cache of pandoc's output, so re-reading an identical document skips pandoc.
+
+Pandoc is the slowest stage of a conversion, and the same document is often
+converted again unchanged: a retried upload, a re-upload after a typo in the
+class or subject, a re-conversion to another output format. Its output (the
+JSON AST, from which the converters render both the LaTeX and the tables)
+is stored under a key made of the SHA-256 of the document's bytes, the
+pandoc version and the command-line arguments, so a different pandoc or
+different arguments never reuse an entry.
+
+The cache directory comes from the MCQ_PANDOC_CACHE_DIR environment variable
+(the converters' --pandoc-cache option sets it for their worker processes).
+It holds at most MCQ_PANDOC_CACHE_MB megabytes (DEFAULT_CACHE_MB by default);
+the least recently used entries are removed beyond that.
+"""
+import hashlib
+import os
+import subprocess
+
+from image_cache import write_atomically
+from mcq_log import get_logger
+
+log = get_logger("pandoc_cache")
+
+PANDOC_CACHE_DIR_ENV = "MCQ_PANDOC_CACHE_DIR"
+PANDOC_CACHE_SIZE_ENV = "MCQ_PANDOC_CACHE_MB"
+DEFAULT_CACHE_MB = 256
+
+_pandoc_version = None
+
+
+def pandoc_version():
+    """The first line of `pandoc --version`, e.g. "pandoc 3.1.9"; run once per process."""
+    global _pandoc_version
+    if _pandoc_version is None:
+        result = subprocess.run(["pandoc", "--version"], check=True, capture_output=True, text=True, encoding="utf-8")
+        _pandoc_version = result.stdout.partition("\n")[0].strip()
+    return _pandoc_version
+
+
+class PandocCache:
+    """Pandoc outputs in a directory of <key>.json files, at most max_bytes in total."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(docx_file, args):
+        """The key of running pandoc with args on docx_file, from its content, the pandoc version and args."""
+        digest = hashlib.sha256()
+        with open(docx_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update("\0".join([pandoc_version(), *args]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def lookup(self, key):
+        """The cached output for key, or None; marks the entry as recently used."""
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                output = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return output
+
+    def store(self, key, output):
+        try:
+            write_atomically(self.path(key), output.encode("utf-8"))
+        except OSError as e:
+            log.warning("Could not write pandoc cache entry: %s", e)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already removed, e.g. by another worker evicting at the same time
+                pass
+            total -= size
+
+
+_default_cache = None
+
+
+def default_pandoc_cache():
+    """The cache in MCQ_PANDOC_CACHE_DIR, or None if it is not set."""
+    global _default_cache
+    cache_dir = os.environ.get(PANDOC_CACHE_DIR_ENV) or None
+    if cache_dir is None:
+        return None
+    try:
+        max_bytes = int(float(os.environ.get(PANDOC_CACHE_SIZE_ENV) or DEFAULT_CACHE_MB) * 1024 * 1024)
+    except ValueError:
+        log.warning("Ignoring invalid %s=%r", PANDOC_CACHE_SIZE_ENV, os.environ[PANDOC_CACHE_SIZE_ENV])
+        max_bytes = DEFAULT_CACHE_MB * 1024 * 1024
+    if _default_cache is None or (_default_cache.cache_dir, _default_cache.max_bytes) != (cache_dir, max_bytes):
+        _default_cache = PandocCache(cache_dir, max_bytes)
+    return _default_cache
@@ -0,0 +1,144 @@
+"""
+Bulk load of parsed MCQs into the questions table (setup-database.sql).
+
+Uploading a chapter used to go docx -> MCQ2XLXS.py -> xlsx, after which the
+Node excelUpload route parsed the sheet again and inserted the questions one
+row at a time. copy_to_database streams the records straight into the table
+with a single COPY ... FROM STDIN per document, in one transaction, so a
+document is either loaded completely or not at all; only a question with a
+value too long for its column is skipped (see copy_questions).
+
+Records are dicts keyed like the MCQs of docx_to_mcq.py and the columns of
+the MCQ2XLXS.py sheet ("Serial", "Question", "OptionA_IMG", ...). The
+questions table refers to the class, subject, chapter and topic by name, not
+by id, so they are written as they are. The answer is written as its option
+letter, "A" to "D", as in the sheet: the raw answer text (e.g. the option's
+equation) seldom fits the answer column.
+
+Needs psycopg 3 (pip install "psycopg[binary]"). The database defaults to the
+DATABASE_URL environment variable, as in the Node backend (db.js).
+"""
+import os
+
+from mcq_lexer import standardize_answer
+from mcq_log import get_logger
+
+log = get_logger("pg_sink")
+
+DATABASE_URL_ENV = "DATABASE_URL"
+
+# questions column -> record field
+QUESTION_COLUMNS = {
+    "qserial": "Serial",
+    "classname": "Class",
+    "subject": "Subject",
+    "chapter": "Chapter",
+    "topic": "Topic",
+    "ques": "Question",
+    "ques_img": "Ques_img",
+    "option_a": "OptionA",
+    "option_a_img": "OptionA_IMG",
+    "option_b": "OptionB",
+    "option_b_img": "OptionB_IMG",
+    "option_c": "OptionC",
+    "option_c_img": "OptionC_IMG",
+    "option_d": "OptionD",
+    "option_d_img": "OptionD_IMG",
+    "answer": "Answer",
+    "explanation": "Explaination",
+    "explanation_img": "Explaination_IMG",
+    "hint": "Hint",
+    "hint_img": "Hint_img",
+    "difficulty_level": "Difficulty_level",
+    "reference": "Reference_Board/Institute",
+}
+
+# VARCHAR lengths of the questions table; a longer value would fail the whole COPY
+COLUMN_LIMITS = {
+    "qserial": 20,
+    "classname": 50,
+    "subject": 100,
+    "chapter": 100,
+    "topic": 100,
+    "answer": 10,
+    "difficulty_level": 20,
+}
+
+# Option letter of a block -> record field, for standardize_answer
+OPTION_FIELDS = {"ক": "OptionA", "খ": "OptionB", "গ": "OptionC", "ঘ": "OptionD"}
+
+COPY_SQL = f"COPY questions ({', '.join(QUESTION_COLUMNS)}) FROM STDIN"
+
+
+def question_row(record):
+    """The questions column values for one record, in QUESTION_COLUMNS order."""
+    row = []
+    for column, field in QUESTION_COLUMNS.items():
+        value = record.get(field) or ""
+        if column == "chapter":
+            # Same fallback as the docx upload route
+            value = value or record.get("Topic") or ""
+        elif column == "difficulty_level":
+            value = value or "medium"
+        elif column == "answer":
+            options = {letter: record.get(field) or "" for letter, field in OPTION_FIELDS.items()}
+            value = standardize_answer(value, options)
+        row.append(value)
+    return row
+
+
+def oversized_column(row):
+    """The first column of a question row whose value is longer than the table allows, or None."""
+    for index, column in enumerate(QUESTION_COLUMNS):
+        if column in COLUMN_LIMITS and len(row[index]) > COLUMN_LIMITS[column]:
+            return column
+    return None
+
+
+def copy_questions(conn, records):
+    """
+    Stream records into the questions table with one COPY on an open psycopg
+    connection, in its current transaction. Returns the number of rows copied.
+
+    A record with a value too long for its column (e.g. an answer that
+    matches none of the options) is skipped with a warning naming the value,
+    as the row-by-row upload routes skip the rows they fail to insert, rather
+    than failing the COPY and with it the rest of the document.
+    """
+    count = 0
+    with conn.cursor() as cur:
+        with cur.copy(COPY_SQL) as copy:
+            for record in records:
+                row = question_row(record)
+                column = oversized_column(row)
+                if column:
+                    value = row[list(QUESTION_COLUMNS).index(column)]
+                    log.warning("Skipping MCQ %s: %s %r is longer than the %d characters of questions.%s",
+                                record.get('Serial', ''), column, value[:40], COLUMN_LIMITS[column], column)
+                    continue
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def connect(database_url=None):
+    """Open a psycopg connection to database_url, or to $DATABASE_URL if not given."""
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ImportError('Loading into PostgreSQL needs psycopg 3 (pip install "psycopg[binary]")') from e
+    database_url = database_url or os.environ.get(DATABASE_URL_ENV)
+    if not database_url:
+        raise ValueError(f"No database given: pass a database URL or set {DATABASE_URL_ENV}")
+    return psycopg.connect(database_url)
+
+
+def copy_to_database(records, database_url=None):
+    """
+    Load records into the questions table of database_url (default
+    $DATABASE_URL) with one COPY, committed only if every record was copied.
+    Returns the number of rows loaded.
+    """
+    with connect(database_url) as conn:
+        # The connection commits on leaving the block, or rolls back on an exception
+        return copy_questions(conn, records)
@@ -840,89 +840,207 @@ function createDummyMCQs(text, className, subjectName) {
     });
 }
 
+/**
+ * Persistent Python converter shared by all uploads.
+ * docx_to_mcq.py --serve keeps its modules loaded between jobs and converts
+ * several documents concurrently, so an upload no longer pays Python start-up.
+ * Jobs and results are single JSON lines matched by id; jobs sent with
+ * "events" also get {"id", "state": "queued" | "running"} lines, and a
+ * {"cancel": id} line stops a job.
+ */
+let converterProcess = null;
+let converterBuffer = '';
+let nextConverterJobId = 1;
+// Job id -> { onState(state), onResult(message) }
+const pendingConverterJobs = new Map();
+
+// A job may wait this long in the converter's queue, then convert for CONVERSION_TIMEOUT_MS
+const QUEUE_TIMEOUT_MS = 60000;
+const CONVERSION_TIMEOUT_MS = 10000;
+
+function failPendingConverterJobs(reason) {
+    for (const [jobId, job] of pendingConverterJobs) {
+        job.onResult({ id: jobId, error: reason });
+    }
+    pendingConverterJobs.clear();
+}
+
+function cancelConverterJob(jobId) {
+    pendingConverterJobs.delete(jobId);
+    if (converterProcess) {
+        // Frees the converter's worker; the job's "Conversion cancelled" answer is then ignored
+        converterProcess.stdin.write(JSON.stringify({ cancel: jobId }) + '\n');
+    }
+}
+
+function handleConverterLine(line) {
+    let message;
+    try {
+        message = JSON.parse(line);
+    } catch (error) {
+        console.error('Invalid line from Python converter:', line.substring(0, 200));
+        return;
+    }
+
+    if (message.ready) {
+        console.log(`Python converter ready with ${message.workers} workers`);
+        return;
+    }
+
+    const job = pendingConverterJobs.get(message.id);
+    if (!job) {
+        if (message.id === null && message.error) {
+            // A line the converter could not read as a job
+            console.error('Python converter error:', message.error);
+        }
+        return;
+    }
+    if (message.state) {
+        // Progress of the job, never its result
+        job.onState(message.state);
+        return;
+    }
+    pendingConverterJobs.delete(message.id);
+    job.onResult(message);
+}
+
+function getConverterProcess() {
+    if (converterProcess) {
+        return converterProcess;
+    }
+
+    const scriptPath = path.join(__dirname, '../docx_to_mcq.py');
+    if (!fs.existsSync(scriptPath)) {
+        console.log("Python script not found:", scriptPath);
+        return null;
+    }
+
+    console.log("Starting Python converter:", scriptPath);
+
+    const { spawn } = require('child_process');
+    const args = [scriptPath, '--serve'];
+    if (process.env.DOCX_ENGINE) {
+        // "native" reads documents without pandoc (see docx_reader.py)
+        args.push('--engine', process.env.DOCX_ENGINE);
+    }
+    // Parser diagnostics go to stderr in server mode; only protocol lines use stdout
+    const proc = spawn('python', args, { stdio: ['pipe', 'pipe', 'pipe'] });
+
+    // Forward the converter's log lines (and any traceback) to the server log
+    let stderrBuffer = '';
+    proc.stderr.setEncoding('utf8');
+    proc.stderr.on('data', (data) => {
+        stderrBuffer += data;
+        let newlineIndex;
+        while ((newlineIndex = stderrBuffer.indexOf('\n')) >= 0) {
+            const line = stderrBuffer.substring(0, newlineIndex).trimEnd();
+            stderrBuffer = stderrBuffer.substring(newlineIndex + 1);
+            if (line) {
+                console.error(`[python] ${line}`);
+            }
+        }
+    });
+    proc.stderr.on('end', () => {
+        if (stderrBuffer.trim()) {
+            console.error(`[python] ${stderrBuffer.trimEnd()}`);
+        }
+    });
+
+    proc.stdout.setEncoding('utf8');
+    proc.stdout.on('data', (data) => {
+        converterBuffer += data;
+        let newlineIndex;
+        while ((newlineIndex = converterBuffer.indexOf('\n')) >= 0) {
+            const line = converterBuffer.substring(0, newlineIndex).trim();
+            converterBuffer = converterBuffer.substring(newlineIndex + 1);
+            if (line) {
+                handleConverterLine(line);
+            }
+        }
+    });
+
+    const onExit = (reason) => {
+        if (converterProcess === proc) {
+            converterProcess = null;
+            converterBuffer = '';
+        }
+        failPendingConverterJobs(reason);
+    };
+
+    proc.on('error', (error) => {
+        console.error('Error spawning Python converter:', error);
+        onExit(`Python converter failed to start: ${error.message}`);
+    });
+
+    proc.on('exit', (code) => {
+        console.log(`Python converter exited with code ${code}`);
+        onExit(`Python converter exited with code ${code}`);
+    });
+
+    proc.stdin.on('error', (error) => {
+        console.error('Error writing to Python converter:', error);
+    });
+
+    converterProcess = proc;
+    return proc;
+}
+
 /**
  * Try to use the Python script if it's available
  */
 async function tryPythonScript(docxFile, className, subjectName) {
     return new Promise((resolve) => {
-        // Timeout after 10 seconds
-        const timeoutId = setTimeout(() => {
-            console.log("Python script timeout - taking too long");
-            resolve(null);
-        }, 10000);
-        
         try {
-            // Check if python script exists
-            const scriptPath = path.join(__dirname, '../docx_to_mcq.py');
-            if (!fs.existsSync(scriptPath)) {
-                console.log("Python script not found:", scriptPath);
-                clearTimeout(timeoutId);
+            const proc = getConverterProcess();
+            if (!proc) {
                 resolve(null);
                 return;
             }
-            
-            console.log("Trying Python script:", scriptPath);
-            
-            // Try to execute the Python script
-            const { spawn } = require('child_process');
-            const pythonProcess = spawn('python', [
-                scriptPath,
-                docxFile,
-                className || '',
-                subjectName || ''
-            ]);
-            
-            let pythonOutput = '';
-            let pythonError = '';
-            
-            pythonProcess.stdout.on('data', (data) => {
-                pythonOutput += data.toString();
-            });
-            
-            pythonProcess.stderr.on('data', (data) => {
-                pythonError += data.toString();
-            });
-            
-            pythonProcess.on('close', (code) => {
+
+            const jobId = nextConverterJobId++;
+
+            // The conversion time limit starts once the job leaves the converter's queue
+            let timeoutId = null;
+            const startTimeout = (ms, what) => {
                 clearTimeout(timeoutId);
-                
-                if (code !== 0) {
-                    console.error(`Python process exited with code ${code}`);
-                    console.error(`Python error output: ${pythonError}`);
+                timeoutId = setTimeout(() => {
+                    console.log(`Python converter timeout - ${what} took too long, cancelling job ${jobId}`);
+                    cancelConverterJob(jobId);
                     resolve(null);
-                    return;
-                }
-                
-                try {
-                    // Extract JSON data from Python output
-                    const jsonStartIndex = pythonOutput.indexOf('[{');
-                    const jsonEndIndex = pythonOutput.lastIndexOf('}]') + 2;
-                    
-                    if (jsonStartIndex >= 0 && jsonEndIndex > jsonStartIndex) {
-                        const jsonData = pythonOutput.substring(jsonStartIndex, jsonEndIndex);
-                        const mcqData = JSON.parse(jsonData);
-                        
-                        // Successfully extracted MCQs using the Python script
-                        console.log(`Successfully parsed ${mcqData.length} MCQs from Python script`);
-                        resolve(mcqData);
-                    } else {
-                        console.log('No valid JSON found in Python output');
+                }, ms);
+            };
+            startTimeout(QUEUE_TIMEOUT_MS, 'waiting in the queue');
+
+            pendingConverterJobs.set(jobId, {
+                onState: (state) => {
+                    if (state === 'running') {
+                        startTimeout(CONVERSION_TIMEOUT_MS, 'the conversion');
+                    }
+                },
+                onResult: (message) => {
+                    clearTimeout(timeoutId);
+
+                    if (message.error) {
+                        console.error(`Python converter error: ${message.error}`);
                         resolve(null);
+                        return;
                     }
-                } catch (error) {
-                    console.error('Error parsing Python output:', error);
-                    resolve(null);
+
+                    console.log(`Successfully parsed ${message.mcqs.length} MCQs from Python script`);
+                    resolve(message.mcqs);
                 }
             });
-            
-            pythonProcess.on('error', (error) => {
-                clearTimeout(timeoutId);
-                console.error('Error spawning Python process:', error);
-                resolve(null);
-            });
-            
+
+            console.log("Sending DOCX to Python converter:", docxFile);
+            proc.stdin.write(JSON.stringify({
+                id: jobId,
+                docx_file: docxFile,
+                class_name: className || '',
+                subject_name: subjectName || '',
+                events: true
+            }) + '\n');
+
         } catch (error) {
-            clearTimeout(timeoutId);
             console.error('Error trying Python script:', error);
             resolve(null);
         }
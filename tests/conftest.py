@@ -0,0 +1,26 @@
+"""
+Shared fixtures for the converter tests.
+
+The converters live in MCQ2XLXS.py (the desktop app) and bk/ (the backend,
+whose modules import each other by name), so both directories go on sys.path; the repository root first, as bk/ holds
+an old copy of MCQ2XLXS.py.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BK_DIR = os.path.join(REPO_DIR, "bk")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SAMPLE_DOCX = os.path.join(REPO_DIR, "AFS AP-Jan SSC  Genral Math  Chapter 12 MCQ done by MOHOMMAD HASAN.docx")
+
+sys.path[:0] = [REPO_DIR, BK_DIR]
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURES_DIR, name)
+
+
+requires_pandoc = pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc is not installed")
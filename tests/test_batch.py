@@ -0,0 +1,75 @@
+"""
+The headless batch command of MCQ2XLXS.py, run as the user would run it on a
+directory of documents, with the native reader (no pandoc needed).
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR, SAMPLE_DOCX
+
+SAMPLE_MCQS = 61
+
+
+def run_batch(*args):
+    return subprocess.run([sys.executable, os.path.join(REPO_DIR, "MCQ2XLXS.py"), "batch", *args, "--engine", "native"],
+                          capture_output=True, encoding="utf-8", timeout=300)
+
+
+def read_summary(output_dir):
+    with open(os.path.join(output_dir, "batch_summary.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_batch_converts_every_document(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+
+    input_dir = tmp_path / "chapters"
+    (input_dir / "part2").mkdir(parents=True)
+    shutil.copy(SAMPLE_DOCX, input_dir / "chapter12.docx")
+    shutil.copy(SAMPLE_DOCX, input_dir / "part2" / "chapter12b.docx")
+    # A Word lock file, which is not a document
+    (input_dir / "~$chapter12.docx").write_bytes(b"")
+    output_dir = tmp_path / "out"
+
+    result = run_batch(str(input_dir), "-o", str(output_dir), "-j", "2", "-r", "--class", "Ten", "--subject", "Math")
+    assert result.returncode == 0, result.stderr
+
+    summary = read_summary(output_dir)
+    assert summary["documents"] == 2
+    assert summary["failed"] == 0
+    assert summary["mcqs"] == 2 * SAMPLE_MCQS
+    assert [os.path.relpath(entry["excel"], output_dir) for entry in summary["files"]] == \
+        ["chapter12.xlsx", os.path.join("part2", "chapter12b.xlsx")]
+    assert summary["files"][0]["metrics"]["counters"]["questions"] == SAMPLE_MCQS
+
+    sheet = openpyxl.load_workbook(output_dir / "chapter12.xlsx", read_only=True)["MCQs"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][:4] == ("QuestionID", "Serial", "Class", "Subject")
+    assert len(rows) == 1 + SAMPLE_MCQS
+    assert {row[2:4] for row in rows[1:]} == {("Ten", "Math")}
+    assert (output_dir / "chapter12_tables.html").exists()
+
+
+def test_batch_reports_failed_documents(tmp_path):
+    pytest.importorskip("openpyxl")
+    shutil.copy(SAMPLE_DOCX, tmp_path / "good.docx")
+    (tmp_path / "broken.docx").write_bytes(b"not a zip archive")
+
+    result = run_batch(str(tmp_path), "-j", "1")
+    assert result.returncode == 1
+
+    summary = read_summary(tmp_path)
+    assert summary["failed"] == 1
+    broken, good = summary["files"]
+    assert broken["error"] and broken["mcqs"] == 0
+    assert not good["error"] and good["mcqs"] == SAMPLE_MCQS
+    assert (tmp_path / "good.xlsx").exists()
+
+
+def test_batch_without_documents_fails(tmp_path):
+    assert run_batch(str(tmp_path)).returncode == 1
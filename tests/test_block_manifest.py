@@ -0,0 +1,94 @@
+"""
+Incremental re-conversion through bk/block_manifest.py: the desktop
+converter's records of the sample chapter (read with the native reader) are
+kept in a manifest, and a second run only parses the blocks that changed.
+"""
+import json
+
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+from block_manifest import BlockManifest
+from docx_reader import load_docx_ast
+from image_cache import DocxMedia
+from pandoc_ast import ast_to_latex
+
+SAMPLE_MCQS = 61
+EDITED_TEXT = ("লেখ নির্দিষ্ট করতে", "গ্রাফ আঁকতে")
+
+
+@pytest.fixture(scope="module")
+def sample_latex():
+    return ast_to_latex(load_docx_ast(SAMPLE_DOCX, "native"))
+
+
+def counting_converter(**options):
+    """A DocxToExcelConverter whose parsed attribute counts the blocks build_mcq_row parses."""
+    from MCQ2XLXS import DocxToExcelConverter
+
+    converter = DocxToExcelConverter(**options)
+    build_mcq_row = converter.build_mcq_row
+    converter.parsed = 0
+
+    def counting_build_mcq_row(*args):
+        converter.parsed += 1
+        return build_mcq_row(*args)
+
+    converter.build_mcq_row = counting_build_mcq_row
+    return converter
+
+
+def convert(converter, latex, tmp_path):
+    """The records of latex through the manifest of tmp_path/sample.xlsx, and that manifest."""
+    latex_file = tmp_path / "converted.tex"
+    latex_file.write_text(latex, encoding="utf-8")
+    manifest = BlockManifest(converter.manifest_file(str(tmp_path / "sample.xlsx")), converter.manifest_settings())
+    with DocxMedia(SAMPLE_DOCX) as media:
+        records = [record.fields() for record in converter.iter_latex_mcqs(str(latex_file), media, manifest)]
+    return records, manifest
+
+
+def test_unchanged_blocks_are_reused(tmp_path, sample_latex):
+    first, manifest = convert(counting_converter(), sample_latex, tmp_path)
+    assert len(first) == SAMPLE_MCQS
+    assert manifest.reused == 0
+    assert (tmp_path / "sample_manifest.json").exists()
+
+    converter = counting_converter()
+    second, manifest = convert(converter, sample_latex, tmp_path)
+    assert manifest.reused == SAMPLE_MCQS
+    assert converter.parsed == 0
+    assert second == first
+
+
+def test_edited_blocks_are_parsed_again(tmp_path, sample_latex):
+    first, _ = convert(counting_converter(), sample_latex, tmp_path)
+
+    converter = counting_converter()
+    edited, manifest = convert(converter, sample_latex.replace(*EDITED_TEXT), tmp_path)
+    assert converter.parsed == 1
+    assert manifest.reused == SAMPLE_MCQS - 1
+    assert EDITED_TEXT[1] in edited[0]["question"]
+    assert edited[1:] == first[1:]
+
+
+def test_record_version_mismatch_discards_the_manifest(tmp_path, sample_latex):
+    convert(counting_converter(), sample_latex, tmp_path)
+    manifest_file = tmp_path / "sample_manifest.json"
+    saved = json.loads(manifest_file.read_text(encoding="utf-8"))
+    saved["settings"]["records"] -= 1
+    manifest_file.write_text(json.dumps(saved), encoding="utf-8")
+
+    converter = counting_converter()
+    _, manifest = convert(converter, sample_latex, tmp_path)
+    assert manifest.reused == 0
+    assert converter.parsed > SAMPLE_MCQS
+    # The manifest is written again with the current version
+    assert json.loads(manifest_file.read_text(encoding="utf-8"))["settings"] == converter.manifest_settings()
+
+
+def test_other_equation_setting_discards_the_manifest(tmp_path, sample_latex):
+    convert(counting_converter(), sample_latex, tmp_path)
+    _, manifest = convert(counting_converter(preserve_equations=False), sample_latex, tmp_path)
+    assert manifest.reused == 0
@@ -0,0 +1,119 @@
+"""
+The content-addressed image cache and the image stage of bk/image_cache.py:
+ImageCache's memory and disk lookups, resolve_images and image_pool_size.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+from image_cache import DocxMedia, ImageCache, decode_data_url, image_pool_size, resolve_images
+
+Image = pytest.importorskip("PIL.Image")
+
+IMAGE_FIELDS = ["image", "hint_image"]
+
+
+def png_bytes(color, size=(4, 3)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeMedia:
+    """A DocxMedia of generated images, counting how often each is read."""
+
+    def __init__(self, images):
+        self.images = images
+        self.reads = {}
+
+    def read(self, member):
+        self.reads[member] = self.reads.get(member, 0) + 1
+        return self.images.get(member)
+
+
+def test_memory_hits_and_misses():
+    cache = ImageCache(max_entries=1)
+    red, blue = png_bytes("red"), png_bytes("blue")
+
+    url = cache.data_url(red, "image1.png")
+    assert decode_data_url(url)[0] == "png"
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.data_url(red, "image7.png") == url
+    assert (cache.hits, cache.misses) == (1, 1)
+    # The output format is part of the key
+    assert cache.data_url(red, "image1.gif").startswith("data:image/gif;")
+    assert cache.misses == 2
+
+    # Only max_entries entries are kept in memory
+    cache.data_url(blue, "image2.png")
+    assert cache.lookup(cache.key(red, "image1.png")) is None
+
+
+def test_disk_entries_are_shared_across_caches(tmp_path):
+    red = png_bytes("red")
+    url = ImageCache(str(tmp_path)).data_url(red, "image1.png")
+    key = ImageCache.key(red, "image1.png")
+    assert (tmp_path / f"{key}.txt").read_text(encoding="ascii") == url
+
+    cache = ImageCache(str(tmp_path))
+    assert cache.lookup(key) == url
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+@pytest.mark.parametrize("pool", [None, "threads"])
+def test_failed_encoding_is_not_cached(tmp_path, pool):
+    cache = ImageCache(str(tmp_path))
+    key = cache.key(b"not an image", "image1.png")
+    if pool is None:
+        assert cache.submit(b"not an image", "image1.png").result() == ""
+    else:
+        with ThreadPoolExecutor(1) as executor:
+            assert cache.submit(b"not an image", "image1.png", executor).result() == ""
+    assert cache.lookup(key) is None
+    assert os.listdir(tmp_path) == []
+
+    # Nor is an empty entry an older version left on disk
+    (tmp_path / f"{key}.txt").write_text("", encoding="ascii")
+    assert ImageCache(str(tmp_path)).lookup(key) is None
+
+
+def test_image_pool_size():
+    assert image_pool_size(4, 10) == 4
+    assert image_pool_size(4, 2) == 2
+    assert image_pool_size(4, 1) == 1
+    assert image_pool_size(4, 0) == 1
+    assert image_pool_size(None, 1000) == (os.cpu_count() or 1)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_resolve_images_keeps_record_order(workers):
+    colors = ["red", "green", "blue", "white"]
+    media = FakeMedia({f"image{i}.png": png_bytes(color) for i, color in enumerate(colors)})
+    records = [{"serial": str(n), "image": f"image{n % 5}.png" if n % 5 < 4 else "", "hint_image": ""}
+               for n in range(40)]
+    records[7]["hint_image"] = "missing.png"
+
+    resolved = list(resolve_images([dict(record) for record in records], IMAGE_FIELDS, media, workers, lookahead=4))
+
+    assert [record["serial"] for record in resolved] == [record["serial"] for record in records]
+    # Each distinct image is read from the document once
+    assert media.reads == {**{f"image{i}.png": 1 for i in range(4)}, "missing.png": 1}
+    for record, original in zip(resolved, records):
+        if original["image"]:
+            assert decode_data_url(record["image"])[1] == png_bytes(colors[int(original["image"][5])])
+        else:
+            assert record["image"] == ""
+    assert resolved[7]["hint_image"] == ""
+
+
+def test_resolve_images_on_the_sample():
+    with DocxMedia(SAMPLE_DOCX) as media:
+        [member] = media.members.values()
+        records = [{"image": member, "hint_image": ""}, {"image": "", "hint_image": member}]
+        first, second = resolve_images(records, IMAGE_FIELDS, media, 2)
+    assert first["image"].startswith("data:image/png;base64,")
+    assert second["hint_image"] == first["image"]
@@ -0,0 +1,89 @@
+"""
+MCQRecord, the record the desktop converter carries from build_mcq_row to
+the writers, on the questions of the sample chapter (native reader).
+"""
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+from docx_reader import load_docx_ast
+from image_cache import DocxMedia
+from pandoc_ast import ast_to_latex
+
+SAMPLE_MCQS = 61
+
+
+@pytest.fixture(scope="module")
+def converter():
+    from MCQ2XLXS import DocxToExcelConverter
+
+    return DocxToExcelConverter(engine="native")
+
+
+@pytest.fixture(scope="module")
+def sample_records(converter, tmp_path_factory):
+    output_file = tmp_path_factory.mktemp("sample") / "sample.xlsx"
+    return list(converter.parse_docx(SAMPLE_DOCX, str(output_file)))
+
+
+def test_fields_default_to_empty_and_are_checked():
+    from MCQ2XLXS import MCQRecord
+
+    record = MCQRecord(serial="১", question="x?")
+    assert record.fields() == {name: {"serial": "১", "question": "x?"}.get(name, "") for name in MCQRecord.__slots__}
+    with pytest.raises(TypeError, match="Unknown MCQRecord fields: options"):
+        MCQRecord(serial="১", options=["a", "b"])
+    # Slots only: a misspelt field cannot be set either
+    with pytest.raises(AttributeError):
+        record.topik = "x"
+
+
+def test_records_index_by_field_name():
+    from MCQ2XLXS import MCQRecord
+
+    record = MCQRecord(question_img="image1.png")
+    assert record["question_img"] == "image1.png"
+    record["question_img"] = "data:image/png;base64,AAAA"
+    assert record.question_img == "data:image/png;base64,AAAA"
+
+
+def test_sample_records(sample_records):
+    from MCQ2XLXS import MCQRecord
+
+    assert len(sample_records) == SAMPLE_MCQS
+    assert all(type(record) is MCQRecord for record in sample_records)
+    first = sample_records[0]
+    assert first.serial == "১"
+    assert first.topic and "টপিক" not in first.question
+    assert first.question_img.startswith("data:image/png;base64,")
+    assert repr(first).startswith("MCQRecord(serial='১', question=")
+
+
+def test_sheet_rows_take_the_named_fields(converter, sample_records):
+    header = converter.SHEET_HEADER
+    for record, row in zip(sample_records, converter.iter_sheet_rows(sample_records)):
+        values = dict(zip(header, row))
+        assert values["QuestionID"] == f"Q{record.serial}"
+        assert values["Serial"] == record.serial
+        assert values["Topic"] == record.topic
+        assert values["Ques_img"] == record.question_img
+        assert values["Difficulty_level"] == record.difficulty
+        assert values["Reference_Board/Institute"] == record.board
+        assert values["OptionD_IMG"] == record.option_d_img
+
+
+def test_manifest_fields_round_trip(sample_records):
+    from MCQ2XLXS import MCQRecord
+
+    # The manifest stores fields() as JSON and rebuilds the record from them
+    for record in sample_records:
+        assert MCQRecord(**record.fields()).fields() == record.fields()
+
+
+def test_records_before_images_are_resolved(converter, tmp_path):
+    tex = tmp_path / "converted.tex"
+    tex.write_text(ast_to_latex(load_docx_ast(SAMPLE_DOCX, "native")), encoding="utf-8")
+    with DocxMedia(SAMPLE_DOCX) as media:
+        first = next(converter.iter_parsed_rows(str(tex), media))
+        # Before resolve_images, the image field holds the archive member
+        assert first.question_img == "word/media/image1.png"
@@ -0,0 +1,102 @@
+"""
+The exclusive stage timers of bk/mcq_metrics.py, on a fake clock, and the
+metrics report of a conversion of the sample chapter.
+"""
+import os
+
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+import mcq_metrics
+from mcq_metrics import Metrics, NullMetrics, collect_metrics, current_metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(mcq_metrics.time, "perf_counter", clock)
+    return clock
+
+
+def test_nested_stages_are_exclusive(clock):
+    metrics = Metrics("chapter.docx", engine="native")
+    with metrics.stage("write"):
+        clock.advance(1)
+        with metrics.stage("images"):
+            clock.advance(2)
+            with metrics.stage("parse"):
+                clock.advance(4)
+            clock.advance(8)
+        clock.advance(16)
+    clock.advance(32)
+    # Entering a stage again accumulates
+    with metrics.stage("parse"):
+        clock.advance(64)
+
+    report = metrics.report()
+    assert report["stages"] == {"write": 17, "images": 10, "parse": 68, "other": 32}
+    assert report["seconds"] == 127
+    assert report["document"] == "chapter.docx" and report["engine"] == "native"
+
+
+def test_iterate_times_producing_each_item(clock):
+    metrics = Metrics()
+
+    def parse():
+        for serial in range(3):
+            clock.advance(1)
+            yield serial
+
+    with metrics.stage("write"):
+        for serial in metrics.iterate("parse", parse()):
+            metrics.count("questions")
+            clock.advance(10)
+
+    report = metrics.report()
+    assert report["stages"] == {"parse": 3, "write": 30, "other": 0}
+    assert report["counters"] == {"questions": 3}
+    assert report["questions_per_second"] == 0.1
+
+
+def test_current_metrics_outside_a_conversion_does_nothing():
+    metrics = current_metrics()
+    assert isinstance(metrics, NullMetrics)
+    with metrics.stage("parse"):
+        metrics.count("questions")
+    assert list(metrics.iterate("parse", [1, 2])) == [1, 2]
+
+
+def test_sample_conversion_report(tmp_path, monkeypatch):
+    pytest.importorskip("openpyxl")
+    from MCQ2XLXS import DocxToExcelConverter
+
+    monkeypatch.setenv(mcq_metrics.PROFILE_DIR_ENV, str(tmp_path / "profiles"))
+    converter = DocxToExcelConverter(engine="native")
+    with collect_metrics(SAMPLE_DOCX, engine="native") as metrics:
+        assert current_metrics() is metrics
+        excel_file = str(tmp_path / "sample.xlsx")
+        converter.write_output(converter.parse_docx(SAMPLE_DOCX, excel_file), excel_file)
+    assert isinstance(current_metrics(), NullMetrics)
+
+    report = metrics.report()
+    assert {"read", "latex", "tables", "parse", "cleanup", "images", "write", "other"} <= set(report["stages"])
+    # The stages partition the conversion, up to the rounding of each
+    assert sum(report["stages"].values()) == pytest.approx(report["seconds"], abs=0.001 * len(report["stages"]))
+    counters = report["counters"]
+    assert counters["questions"] == 61
+    assert counters["docx_bytes"] == os.path.getsize(SAMPLE_DOCX)
+    assert counters["images"] == 1 and counters["image_bytes"] > 0
+    name = os.path.splitext(os.path.basename(SAMPLE_DOCX))[0]
+    assert os.path.exists(tmp_path / "profiles" / f"{name}.prof")
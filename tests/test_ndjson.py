@@ -0,0 +1,48 @@
+"""
+The --ndjson output of bk/docx_to_mcq.py on the sample chapter (native
+reader): one MCQ per line, then a summary line.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import BK_DIR, SAMPLE_DOCX
+
+CONVERTER = [sys.executable, os.path.join(BK_DIR, "docx_to_mcq.py")]
+SAMPLE_MCQS = 61
+
+
+def convert(docx_file, *args):
+    return subprocess.run(CONVERTER + [docx_file, "Ten", "Math", "--engine", "native", *args],
+                          capture_output=True, timeout=120)
+
+
+def test_ndjson_lines_match_the_json_array():
+    result = convert(SAMPLE_DOCX, "--ndjson")
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.decode("utf-8").splitlines()
+    assert len(lines) == SAMPLE_MCQS + 1
+
+    *mcq_lines, summary_line = lines
+    mcqs = [json.loads(line) for line in mcq_lines]
+    expected = json.loads(convert(SAMPLE_DOCX).stdout.decode("utf-8"))
+    assert mcqs == expected
+    # Compact lines, with the Bengali text unescaped
+    assert mcq_lines == [json.dumps(mcq, ensure_ascii=False, separators=(",", ":")) for mcq in mcqs]
+    assert mcqs[0]["Serial"] == "১"
+
+    summary = json.loads(summary_line)
+    assert summary["done"] is True
+    assert summary["count"] == SAMPLE_MCQS
+    assert summary["metrics"]["counters"]["questions"] == SAMPLE_MCQS
+
+
+def test_ndjson_error_summary(tmp_path):
+    result = convert(str(tmp_path / "missing.docx"), "--ndjson")
+    assert result.returncode == 1
+    [summary_line] = result.stdout.decode("utf-8").splitlines()
+    summary = json.loads(summary_line)
+    assert summary["done"] is True
+    assert summary["error"]
+    assert "count" not in summary
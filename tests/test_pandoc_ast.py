@@ -0,0 +1,71 @@
+"""
+ast_to_latex against pandoc's own LaTeX writer, which the MCQ parsers were
+written against.
+
+fixtures/latex_inlines.json and latex_inlines.tex are the output of pandoc
+3.9 on latex_inlines.md (every escaped character and inline element the
+renderer handles):
+
+    pandoc latex_inlines.md -f markdown -t json
+    pandoc latex_inlines.md -f markdown -t latex --wrap=preserve
+
+The renderer deliberately differs from pandoc for images (no size or alt
+text options) and tables (a plain tabular, not a longtable); the sample
+document is compared with those written the same way on both sides.
+"""
+import json
+import re
+import subprocess
+
+from conftest import SAMPLE_DOCX, fixture_path, requires_pandoc
+
+from pandoc_ast import ast_to_latex, escape_latex, run_pandoc_ast
+
+GRAPHICS_OPTIONS = re.compile(r"\\includegraphics\[[^\]]*\]")
+PANDOC_TABLE = re.compile(r"\{\\def\\LTcaptype\{none\}.*?\\end\{longtable\}\n\}", re.DOTALL)
+TABULAR = re.compile(r"\\begin\{tabular\}.*?\\end\{tabular\}", re.DOTALL)
+
+
+def read_fixture(name):
+    with open(fixture_path(name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def without_tables(latex):
+    latex = GRAPHICS_OPTIONS.sub(r"\\includegraphics", latex)
+    return TABULAR.sub("TABLE", PANDOC_TABLE.sub("TABLE", latex))
+
+
+def test_inlines_match_pandoc():
+    ast = json.loads(read_fixture("latex_inlines.json"))
+    assert ast_to_latex(ast) == read_fixture("latex_inlines.tex")
+
+
+def test_escape_terminates_commands():
+    # As printed by pandoc -f markdown-smart -t latex for "a|b c| d|. e--f"
+    assert escape_latex("a|b c| d|. e--f") == "a\\textbar b c\\textbar{} d\\textbar. e-\\/-f"
+
+
+def table_row(*texts):
+    """A pandoc Row of plain text cells."""
+    cells = [[["", [], []], {"t": "AlignDefault"}, 1, 1, [{"t": "Plain", "c": [{"t": "Str", "c": text}]}]]
+             for text in texts]
+    return [["", [], []], cells]
+
+
+def test_table_is_plain_tabular():
+    table = {"t": "Table", "c": [
+        ["", [], []], [None, []],
+        [[{"t": "AlignCenter"}, {"t": "ColWidthDefault"}], [{"t": "AlignLeft"}, {"t": "ColWidthDefault"}]],
+        [["", [], []], [table_row("x", "y")]],
+        [[["", [], []], 0, [], [table_row("1", "2")]]],
+        [["", [], []], []],
+    ]}
+    assert ast_to_latex({"blocks": [table]}) == "\\begin{tabular}{cl}\nx & y \\\\\n1 & 2 \\\\\n\\end{tabular}\n"
+
+
+@requires_pandoc
+def test_sample_matches_pandoc():
+    expected = subprocess.run(["pandoc", SAMPLE_DOCX, "-t", "latex", "--wrap=preserve"],
+                              capture_output=True, text=True, encoding="utf-8", check=True).stdout
+    assert without_tables(ast_to_latex(run_pandoc_ast(SAMPLE_DOCX))) == without_tables(expected)
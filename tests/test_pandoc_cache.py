@@ -0,0 +1,72 @@
+"""
+The on-disk cache of pandoc's output in bk/pandoc_cache.py: its keys and its
+least-recently-used eviction. The pandoc version is fixed, so only the last
+test needs pandoc.
+"""
+import os
+import time
+
+import pytest
+
+from conftest import SAMPLE_DOCX, requires_pandoc
+
+import pandoc_ast
+import pandoc_cache
+from pandoc_cache import PandocCache
+
+ARGS = ["-t", "json"]
+
+
+@pytest.fixture(autouse=True)
+def fixed_pandoc_version(monkeypatch):
+    monkeypatch.setattr(pandoc_cache, "_pandoc_version", "pandoc 3.9")
+
+
+def test_key_depends_on_document_version_and_options(monkeypatch, tmp_path):
+    cache = PandocCache(str(tmp_path / "cache"))
+    key = cache.key(SAMPLE_DOCX, ARGS)
+    assert cache.key(SAMPLE_DOCX, list(ARGS)) == key
+    cache.store(key, '{"blocks": []}')
+    assert cache.lookup(key) == '{"blocks": []}'
+
+    # Other pandoc options miss the cache
+    assert cache.lookup(cache.key(SAMPLE_DOCX, ARGS + ["--wrap=none"])) is None
+    # So does another document
+    other = tmp_path / "other.docx"
+    with open(SAMPLE_DOCX, "rb") as f:
+        other.write_bytes(f.read() + b"\0")
+    assert cache.lookup(cache.key(str(other), ARGS)) is None
+    # And another pandoc
+    monkeypatch.setattr(pandoc_cache, "_pandoc_version", "pandoc 3.1.9")
+    assert cache.lookup(cache.key(SAMPLE_DOCX, ARGS)) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PandocCache(str(tmp_path), max_bytes=250)
+    now = time.time()
+    for age, key in [(100, "oldest"), (90, "older"), (80, "old")]:
+        cache.store(key, "x" * 80)
+        os.utime(cache.path(key), (now - age, now - age))
+
+    # A lookup marks the entry as recently used, so "older" is evicted first
+    assert cache.lookup("oldest") is not None
+    cache.store("new", "x" * 80)
+    assert sorted(os.listdir(tmp_path)) == ["new.json", "old.json", "oldest.json"]
+    assert cache.lookup("older") is None
+
+    # An entry larger than the whole cache is not kept either
+    cache.store("huge", "x" * 300)
+    assert os.listdir(tmp_path) == []
+
+
+@requires_pandoc
+def test_run_pandoc_ast_reuses_cached_output(monkeypatch, tmp_path):
+    monkeypatch.setenv(pandoc_cache.PANDOC_CACHE_DIR_ENV, str(tmp_path))
+    ast = pandoc_ast.run_pandoc_ast(SAMPLE_DOCX)
+    assert len(os.listdir(tmp_path)) == 1
+
+    def no_pandoc(*args, **kwargs):
+        raise AssertionError("pandoc was run again")
+
+    monkeypatch.setattr(pandoc_ast.subprocess, "run", no_pandoc)
+    assert pandoc_ast.run_pandoc_ast(SAMPLE_DOCX) == ast
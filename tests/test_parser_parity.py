@@ -0,0 +1,133 @@
+"""
+Parity of the question parser with the regex parser it replaced.
+
+The fixtures in fixtures/baseline_*.json are the output of the original
+regex parsers (parse_latex_for_mcqs in bk/docx_to_mcq.py and in
+MCQ2XLXS.py, before mcq_lexer.py) on the same LaTeX with Pandoc's escaped
+brackets ({[} {]}, \\textbf{{[}} \\textbf{{]}}) written as plain "[" "]":
+the regex parser only recognised tags in that form, so its output on the
+escaped LaTeX pandoc actually produces is no reference (it leaves every
+tag in the question). Images are stored as the SHA-256 of their data URL.
+
+    baseline_synthetic_*.json  benchmark_mcq.synthetic_latex(100)
+    baseline_sample_*.json     the sample chapter document, read with pandoc
+
+The current parsers must give the same fields on the escaped LaTeX, except
+where the regex parser was wrong; see baseline_quirks.
+"""
+import hashlib
+import json
+import re
+
+import pytest
+
+from conftest import SAMPLE_DOCX, fixture_path, requires_pandoc
+
+from benchmark_mcq import synthetic_latex
+from docx_reader import load_docx_ast
+from docx_to_mcq import parse_latex_for_mcqs
+from image_cache import DocxMedia
+from pandoc_ast import ast_to_latex
+
+BK_OPTION_FIELDS = ["OptionA", "OptionB", "OptionC", "OptionD"]
+GUI_BOARD_COLUMN = 5
+GUI_OPTION_COLUMNS = [6, 8, 10, 12]
+
+# The tag the regex parser let an option run into, up to the end of the block
+OPTION_INTO_TAG = re.compile(r"\s+\[(?:টপিক|Topic|Hint|Explaination)[:ঃ].*", re.DOTALL)
+
+
+def board_quirk(board):
+    # The regex parser's board pattern started at the first "[" of the block,
+    # so it spans the topic and difficulty tags before the board tag
+    return board.rpartition("] [")[2]
+
+
+def option_quirk(option):
+    # Its options only stopped at the next option, answer, hint or explanation
+    return OPTION_INTO_TAG.sub("", option)
+
+
+def baseline_quirks(rows):
+    """The baseline rows (bk dicts or MCQ2XLXS lists) with the regex parser's known mistakes corrected."""
+    for row in rows:
+        if isinstance(row, dict):
+            row["Reference_Board/Institute"] = board_quirk(row["Reference_Board/Institute"])
+            for field in BK_OPTION_FIELDS:
+                row[field] = option_quirk(row[field])
+        else:
+            row[GUI_BOARD_COLUMN] = board_quirk(row[GUI_BOARD_COLUMN])
+            for column in GUI_OPTION_COLUMNS:
+                row[column] = option_quirk(row[column])
+    return rows
+
+
+def load_baseline(name):
+    with open(fixture_path(f"baseline_{name}.json"), "r", encoding="utf-8") as f:
+        return baseline_quirks(json.load(f))
+
+
+def digest(value):
+    if value.startswith("data:"):
+        return "sha256:" + hashlib.sha256(value.encode("utf-8")).hexdigest()
+    return value
+
+
+def parse_bk(latex_file, docx_file):
+    with DocxMedia(docx_file) as media:
+        return [{field: digest(value) for field, value in mcq.items()}
+                for mcq in parse_latex_for_mcqs(str(latex_file), media)]
+
+
+def parse_gui(latex_file, docx_file):
+    from MCQ2XLXS import DocxToExcelConverter
+
+    with DocxMedia(docx_file) as media:
+        return [[digest(value) for value in record.fields().values()]
+                for record in DocxToExcelConverter().parse_latex_for_mcqs(str(latex_file), media)]
+
+
+@pytest.fixture(scope="module")
+def synthetic_tex(tmp_path_factory):
+    tmpdir = tmp_path_factory.mktemp("synthetic")
+    latex_file = tmpdir / "converted.tex"
+    latex_file.write_text(synthetic_latex(100), encoding="utf-8")
+    return latex_file
+
+
+def test_synthetic_latex_escapes_brackets(synthetic_tex):
+    # Otherwise the parity tests below would not cover the escaped tags
+    assert "{[}টপিক: " in synthetic_tex.read_text(encoding="utf-8")
+
+
+def test_synthetic_parity_bk(synthetic_tex):
+    assert parse_bk(synthetic_tex, SAMPLE_DOCX) == load_baseline("synthetic_bk")
+
+
+def test_synthetic_parity_gui(synthetic_tex):
+    assert parse_gui(synthetic_tex, SAMPLE_DOCX) == load_baseline("synthetic_gui")
+
+
+@pytest.fixture(scope="module")
+def sample_tex(tmp_path_factory):
+    latex_file = tmp_path_factory.mktemp("sample") / "converted.tex"
+    latex_file.write_text(ast_to_latex(load_docx_ast(SAMPLE_DOCX, "pandoc")), encoding="utf-8")
+    return latex_file
+
+
+@requires_pandoc
+def test_sample_parity_bk(sample_tex):
+    assert parse_bk(sample_tex, SAMPLE_DOCX) == load_baseline("sample_bk")
+
+
+@requires_pandoc
+def test_sample_parity_gui(sample_tex):
+    assert parse_gui(sample_tex, SAMPLE_DOCX) == load_baseline("sample_gui")
+
+
+@requires_pandoc
+def test_sample_tags_are_fields(sample_tex):
+    mcqs = parse_bk(sample_tex, SAMPLE_DOCX)
+    # Every question but the two split at a stray serial, including the one with a bold tag
+    assert sum(1 for mcq in mcqs if mcq["Topic"]) == 60
+    assert not any("টপিক" in mcq["Question"] for mcq in mcqs)
@@ -0,0 +1,84 @@
+"""
+Loading the sample chapter into the questions table through bk/pg_sink.py,
+on a fake psycopg connection that keeps the copied rows.
+"""
+import contextlib
+import logging.handlers
+
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+import pg_sink
+
+SAMPLE_MCQS = 61
+ANSWER_INDEX = list(pg_sink.QUESTION_COLUMNS).index("answer")
+
+
+class FakeCopy:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    @contextlib.contextmanager
+    def copy(self, sql):
+        assert sql == pg_sink.COPY_SQL
+        yield FakeCopy(self.rows)
+
+
+class FakeConnection:
+    """The part of a psycopg connection copy_questions uses; rows holds what was copied."""
+
+    def __init__(self):
+        self.rows = []
+
+    @contextlib.contextmanager
+    def cursor(self):
+        yield FakeCursor(self.rows)
+
+
+def sample_records(tmp_path, **options):
+    from MCQ2XLXS import DocxToExcelConverter
+
+    converter = DocxToExcelConverter(class_name="Class", subject_name="Subject", engine="native", **options)
+    return converter.database_records(converter.parse_docx(SAMPLE_DOCX, str(tmp_path / "sample.xlsx")))
+
+
+@pytest.mark.parametrize("preserve_equations", [True, False])
+def test_sample_loads_every_question(tmp_path, preserve_equations):
+    conn = FakeConnection()
+    assert pg_sink.copy_questions(conn, sample_records(tmp_path, preserve_equations=preserve_equations)) == SAMPLE_MCQS
+    assert len(conn.rows) == SAMPLE_MCQS
+    answers = {row[ANSWER_INDEX] for row in conn.rows}
+    # MCQs ৫ and ৪১ have no answer, and build_mcq_row maps the two "ক" of
+    # MCQ ৩১'s answer ("3 একক") to "AA"
+    assert answers == {"", "A", "B", "C", "D", "AA"}
+
+
+def test_answer_text_is_loaded_as_its_letter():
+    record = {"Serial": "1", "Question": "x?", "OptionA": "$1$", "OptionB": "$x + 1$",
+              "OptionC": "$2$", "OptionD": "$3$", "Answer": "$x + 1$"}
+    assert pg_sink.question_row(record)[ANSWER_INDEX] == "B"
+
+
+def test_oversized_row_is_skipped():
+    records = [{"Serial": str(serial), "Question": "x?", "OptionA": "1", "OptionB": "2", "OptionC": "3",
+                "OptionD": "4", "Answer": "ক"} for serial in range(1, 4)]
+    records[1]["Answer"] = "an answer matching no option"
+    conn = FakeConnection()
+    handler = logging.handlers.BufferingHandler(10)
+    pg_sink.log.addHandler(handler)
+    try:
+        assert pg_sink.copy_questions(conn, records) == 2
+    finally:
+        pg_sink.log.removeHandler(handler)
+    assert [row[0] for row in conn.rows] == ["1", "3"]
+    [warning] = [record.getMessage() for record in handler.buffer]
+    assert warning.startswith("Skipping MCQ 2: answer 'an answer matching no option' is longer than the 10 characters")
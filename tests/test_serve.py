@@ -0,0 +1,125 @@
+"""
+Round trips through the --serve protocol of bk/docx_to_mcq.py, as used by
+bk/routes/docxUpload.js: the requests are written to a server process with
+one worker and the native reader (no pandoc needed), stdin is closed, and
+every answer is read until the server exits.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BK_DIR, SAMPLE_DOCX
+
+SERVER = [sys.executable, os.path.join(BK_DIR, "docx_to_mcq.py"), "--serve", "--workers", "1", "--engine", "native"]
+SAMPLE_MCQS = 61
+
+
+def job(client_id, docx_file=SAMPLE_DOCX, **extra):
+    return {"id": client_id, "docx_file": docx_file, "class_name": "Class", "subject_name": "Subject", **extra}
+
+
+def serve(requests, *args):
+    """The server's stdout for requests (dicts, or raw lines), one per line."""
+    lines = [request if isinstance(request, str) else json.dumps(request) for request in requests]
+    result = subprocess.run(SERVER + list(args), input="\n".join(lines) + "\n", capture_output=True,
+                            encoding="utf-8", timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def answers_by_id(messages):
+    """The answers with a client id, in order, keyed by that id."""
+    answers = {}
+    for message in messages:
+        if "id" in message:
+            answers.setdefault(message["id"], []).append(message)
+    return answers
+
+
+def test_serve_round_trip():
+    output = serve([
+        job(1),
+        job("two", class_name="Other"),
+        job(3, docx_file=os.path.join(BK_DIR, "missing.docx")),
+    ])
+    messages = [json.loads(line) for line in output.splitlines()]
+    assert messages[0] == {"ready": True, "workers": 1}
+    answers = answers_by_id(messages[1:])
+    assert sorted(answers, key=str) == [1, 3, "two"]
+
+    [result] = answers[1]
+    assert len(result["mcqs"]) == SAMPLE_MCQS
+    assert result["metrics"]["counters"]["questions"] == SAMPLE_MCQS
+    assert {mcq["Class"] for mcq in result["mcqs"]} == {"Class"}
+    [other] = answers["two"]
+    assert [mcq["Question"] for mcq in other["mcqs"]] == [mcq["Question"] for mcq in result["mcqs"]]
+    assert {mcq["Class"] for mcq in other["mcqs"]} == {"Other"}
+
+    [failed] = answers[3]
+    assert failed["error"].startswith("Error processing DOCX file")
+
+
+def test_serve_invalid_requests():
+    output = serve([
+        "not json",
+        {"id": 1},
+    ])
+    messages = [json.loads(line) for line in output.splitlines()]
+    assert messages[0] == {"ready": True, "workers": 1}
+    assert len(messages) == 3
+    for message in messages[1:]:
+        assert message["id"] is None
+        assert message["error"].startswith("Invalid request: ")
+
+
+def test_serve_events_status_and_cancel():
+    output = serve([
+        job(1, events=True),
+        # Waits for job 1 on the only worker, so it is still queued
+        job("two", events=True),
+        {"status": "two"},
+        {"cancel": "two"},
+        {"cancel": "missing"},
+        {"status": "missing"},
+    ])
+    answers = answers_by_id(json.loads(line) for line in output.splitlines())
+
+    *events, result = answers[1]
+    assert events == [{"id": 1, "state": "queued"}, {"id": 1, "state": "running"}]
+    assert len(result["mcqs"]) == SAMPLE_MCQS
+    assert answers["two"] == [
+        {"id": "two", "state": "queued"},
+        {"id": "two", "state": "queued", "position": 0},
+        {"id": "two", "error": "Conversion cancelled"},
+    ]
+    assert answers["missing"] == [{"id": "missing", "state": "unknown"}] * 2
+
+
+def test_serve_rejects_unhashable_ids():
+    output = serve([
+        job([1]),
+        {"status": {"id": 1}},
+        {"cancel": [1]},
+    ])
+    messages = [json.loads(line) for line in output.splitlines()]
+    assert len(messages) == 4
+    for message in messages[1:]:
+        assert message["id"] is None
+        assert message["error"].startswith("Invalid request: ")
+
+
+def test_serve_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+
+    output = subprocess.run(SERVER + ["--msgpack"], input=(json.dumps(job(1)) + "\n").encode("utf-8"),
+                            capture_output=True, timeout=120)
+    assert output.returncode == 0, output.stderr
+    ready, result = msgpack.Unpacker(io.BytesIO(output.stdout), raw=False)
+    assert ready == {"ready": True, "workers": 1}
+    assert len(result["mcqs"]) == SAMPLE_MCQS
+    images = [mcq["Ques_img"] for mcq in result["mcqs"] if mcq["Ques_img"]]
+    assert images and all(isinstance(image["data"], bytes) for image in images)
@@ -0,0 +1,147 @@
+"""
+The output writers of the desktop converter (MCQ2XLXS.py), on the records of
+the sample chapter read with the native reader.
+"""
+import base64
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+from conftest import SAMPLE_DOCX
+
+from image_cache import decode_data_url, save_image_blob
+
+SAMPLE_MCQS = 61
+
+
+@pytest.fixture(scope="module")
+def converter():
+    from MCQ2XLXS import DocxToExcelConverter
+
+    return DocxToExcelConverter(class_name="Ten", subject_name="Math", chapter_name="12", engine="native")
+
+
+@pytest.fixture(scope="module")
+def sample_records(converter, tmp_path_factory):
+    output_file = tmp_path_factory.mktemp("sample") / "sample.xlsx"
+    return list(converter.parse_docx(SAMPLE_DOCX, str(output_file)))
+
+
+def formula_record():
+    """A record whose text Excel would read as a formula."""
+    from MCQ2XLXS import MCQRecord
+
+    return MCQRecord(serial="1", question="-x + 1 = 0 হলে x কত?", option_a="-1", option_b="1",
+                     option_c="+2", option_d="=3", answer="খ")
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_columnar_round_trip(converter, sample_records, tmp_path, extension):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    output_file = str(tmp_path / f"sample{extension}")
+    assert converter.write_output(sample_records, output_file) == SAMPLE_MCQS
+    if extension == ".parquet":
+        table = pq.read_table(output_file)
+    else:
+        with pa.ipc.open_file(output_file) as reader:
+            table = reader.read_all()
+
+    assert table.column_names == converter.SHEET_HEADER
+    assert table.num_rows == SAMPLE_MCQS
+    image_indexes = {col_num - 1 for col_num in converter.SHEET_IMAGE_COLUMNS}
+    for row, expected in zip(table.to_pylist(), converter.iter_sheet_rows(sample_records)):
+        for col_idx, column in enumerate(converter.SHEET_HEADER):
+            if col_idx in image_indexes:
+                image = decode_data_url(expected[col_idx]) if expected[col_idx] else None
+                assert row[column] == (image[1] if image else None)
+            else:
+                assert row[column] == expected[col_idx]
+    assert any(row["Ques_img"] for row in table.to_pylist())
+
+
+def test_formula_guard_is_only_in_the_workbook(converter, tmp_path):
+    pytest.importorskip("pyarrow")
+    openpyxl = pytest.importorskip("openpyxl")
+    import pyarrow.parquet as pq
+
+    converter.write_output([formula_record()], str(tmp_path / "formula.parquet"))
+    [row] = pq.read_table(tmp_path / "formula.parquet").to_pylist()
+    assert (row["Question"], row["OptionA"], row["OptionC"], row["OptionD"]) == ("-x + 1 = 0 হলে x কত?", "-1", "+2", "=3")
+
+    converter.write_output([formula_record()], str(tmp_path / "formula.xlsx"))
+    sheet = openpyxl.load_workbook(tmp_path / "formula.xlsx", read_only=True)["MCQs"]
+    _, cells = sheet.iter_rows(values_only=True)
+    assert cells[6] == "'-x + 1 = 0 হলে x কত?"
+    assert cells[8:16:2] == ("'-1", "1", "'+2", "'=3")
+
+
+def test_workbook_rows_are_spooled_and_written(converter, sample_records, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    import MCQ2XLXS
+
+    spools = []
+    make_temporary_file = tempfile.TemporaryFile
+
+    def temporary_file():
+        spools.append(make_temporary_file())
+        return spools[-1]
+
+    monkeypatch.setattr(MCQ2XLXS.tempfile, "TemporaryFile", temporary_file)
+    excel_file = tmp_path / "sample.xlsx"
+    # Any iterable of records, consumed once
+    assert converter.write_to_excel(iter(sample_records), str(excel_file)) == SAMPLE_MCQS
+    # The prepared rows waited in a temporary file, closed once the workbook was saved
+    [spool] = spools
+    assert spool.closed
+
+    sheet = openpyxl.load_workbook(excel_file)["MCQs"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == converter.SHEET_HEADER
+    expected = [converter.excel_row(row) for row in converter.iter_sheet_rows(sample_records)]
+    assert [list(row) for row in rows[1:]] == [[value if value != "" else None for value in row] for row in expected]
+
+    assert sheet["A1"].style == converter.HEADER_STYLE and sheet["A1"].font.bold
+    for col_idx, _ in enumerate(converter.SHEET_HEADER, 1):
+        width = sheet.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width
+        if col_idx in converter.SHEET_IMAGE_COLUMNS:
+            assert width == 30
+        else:
+            assert width <= 50
+    question_cells = [row[6] for row in sheet.iter_rows(min_row=2) if row[6].value]
+    equations = [cell for cell in question_cells if "$" in cell.value]
+    assert equations and all(cell.style == converter.WRAPPED_EQUATION_STYLE for cell in equations)
+    assert all(cell.style == converter.WRAPPED_STYLE for cell in question_cells if "$" not in cell.value)
+
+
+def test_external_images_are_saved_once_by_content(sample_records, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    from MCQ2XLXS import DocxToExcelConverter
+
+    converter = DocxToExcelConverter(engine="native", external_images=True)
+    excel_file = tmp_path / "sample.xlsx"
+    [data_url] = {record.question_img for record in sample_records if record.question_img}
+    image_format, image = decode_data_url(data_url)
+    name = f"{hashlib.sha256(image).hexdigest()}.{image_format}"
+
+    for _ in range(2):
+        assert converter.write_to_excel(sample_records, str(excel_file)) == SAMPLE_MCQS
+        assert os.listdir(tmp_path / "sample_images") == [name]
+    assert (tmp_path / "sample_images" / name).read_bytes() == image
+
+    sheet = openpyxl.load_workbook(excel_file, read_only=True)["MCQs"]
+    rows = list(sheet.iter_rows(min_row=2, values_only=True))
+    assert [row[7] for row in rows] == [f"sample_images/{name}" if record.question_img else None
+                                        for record in sample_records]
+    assert not any(isinstance(value, str) and value.startswith("data:") for row in rows for value in row)
+
+
+def test_save_image_blob(tmp_path):
+    assert save_image_blob("", str(tmp_path / "blobs")) == ""
+    data_url = "data:image/png;base64," + base64.b64encode(b"\x89PNG not decoded").decode("ascii")
+    name = save_image_blob(data_url, str(tmp_path / "blobs"))
+    assert name == hashlib.sha256(b"\x89PNG not decoded").hexdigest() + ".png"
+    assert (tmp_path / "blobs" / name).read_bytes() == b"\x89PNG not decoded"